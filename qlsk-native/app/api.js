@@ -177,6 +177,12 @@ export const createHealthJournal = (data) => api.post("/journals/", data);
 
 export const getHealthJournals = () => api.get("/journals/");
 
+export const getHealthJournal = (id) => api.get(`/journals/${id}/`);
+
+// Tìm nhật ký theo nội dung trên server (không phân biệt dấu), trả về đoạn trích quanh từ khóa
+export const searchHealthJournals = (q, page = 1) =>
+  api.get("/journals/search/", { params: { q, page } });
+
 export const updateWaterIntake = (data) => {
   // Chuyển đổi ml sang lít
   const amountInLiters = parseFloat(data.amount) / 1000;
@@ -13,7 +13,12 @@ import {
 } from "react-native";
 import Icon from "react-native-vector-icons/MaterialCommunityIcons";
 import { useNavigation } from "@react-navigation/native";
-import { getHealthJournals, getWorkoutSessions } from "../api";
+import {
+  getHealthJournal,
+  getHealthJournals,
+  getWorkoutSessions,
+  searchHealthJournals,
+} from "../api";
 
 // Hàm định dạng ngày dd/MM/yyyy (không cộng +7h nữa)
 function formatDate(dateStr) {
@@ -37,6 +42,22 @@ function formatDateTime(dateStr) {
   return `${day}/${month}/${year} ${hour}:${minute}`;
 }
 
+// Nội dung nhật ký là HTML (CKEditor): đổi sang văn bản thường để hiển thị
+function htmlToText(html) {
+  if (!html) return "";
+  return html
+    .replace(/<\/(p|div|li|h[1-6]|tr|blockquote)>|<br\s*\/?>/gi, "\n")
+    .replace(/<[^>]+>/g, "")
+    .replace(/&nbsp;/g, " ")
+    .replace(/&lt;/g, "<")
+    .replace(/&gt;/g, ">")
+    .replace(/&quot;/g, '"')
+    .replace(/&#39;/g, "'")
+    .replace(/&amp;/g, "&")
+    .replace(/\n\s*\n+/g, "\n")
+    .trim();
+}
+
 export default function HealthJournalListScreen() {
   const [journals, setJournals] = useState([]);
   const [sessions, setSessions] = useState([]);
@@ -44,6 +65,14 @@ export default function HealthJournalListScreen() {
   const [searchDate, setSearchDate] = useState("");
   const [searchContent, setSearchContent] = useState("");
   const [filteredJournals, setFilteredJournals] = useState([]);
+  // Kết quả tìm theo nội dung từ server (null: không tìm theo nội dung)
+  const [searchResults, setSearchResults] = useState(null);
+  const [searchNextPage, setSearchNextPage] = useState(null);
+  const [searching, setSearching] = useState(false);
+  // Nội dung đầy đủ của các nhật ký đã mở, tải từ /journals/<id>/ khi chọn
+  const [expandedId, setExpandedId] = useState(null);
+  const [contents, setContents] = useState({});
+  const [loadingContentId, setLoadingContentId] = useState(null);
   const navigation = useNavigation();
 
   useEffect(() => {
@@ -68,10 +97,79 @@ export default function HealthJournalListScreen() {
     fetchData();
   }, []);
 
-  // Hàm tìm kiếm nhật ký
+  // Tìm theo nội dung trên server: danh sách chỉ có đoạn trích nên không lọc được ở client
+  useEffect(() => {
+    const query = searchContent.trim();
+    if (!query) {
+      setSearchResults(null);
+      setSearchNextPage(null);
+      return;
+    }
+    let cancelled = false;
+    // Chờ người dùng gõ xong mới gọi API
+    const timer = setTimeout(async () => {
+      try {
+        setSearching(true);
+        const res = await searchHealthJournals(query);
+        if (cancelled) return;
+        setSearchResults(res.data.results);
+        setSearchNextPage(res.data.next ? 2 : null);
+      } catch (err) {
+        if (!cancelled) {
+          setSearchResults([]);
+          setSearchNextPage(null);
+        }
+      } finally {
+        if (!cancelled) setSearching(false);
+      }
+    }, 400);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchContent]);
+
+  const loadMoreResults = async () => {
+    try {
+      setSearching(true);
+      const res = await searchHealthJournals(
+        searchContent.trim(),
+        searchNextPage
+      );
+      setSearchResults((results) => [...results, ...res.data.results]);
+      setSearchNextPage(res.data.next ? searchNextPage + 1 : null);
+    } catch (err) {
+      setSearchNextPage(null);
+    } finally {
+      setSearching(false);
+    }
+  };
+
+  // Chọn nhật ký: mở/đóng và tải nội dung đầy đủ (chỉ lần đầu)
+  const toggleJournal = async (id) => {
+    if (expandedId === id) {
+      setExpandedId(null);
+      return;
+    }
+    setExpandedId(id);
+    if (contents[id] !== undefined) return;
+    try {
+      setLoadingContentId(id);
+      const res = await getHealthJournal(id);
+      setContents((prev) => ({ ...prev, [id]: htmlToText(res.data.content) }));
+    } catch (err) {
+      setExpandedId(null);
+    } finally {
+      setLoadingContentId(null);
+    }
+  };
+
+  // Lọc theo ngày trên danh sách (hoặc kết quả tìm theo nội dung)
   useEffect(() => {
     const searchJournals = () => {
-      let filtered = [...journals];
+      let filtered = searchResults
+        ? searchResults.map((r) => ({ ...r, excerpt: r.snippet }))
+        : [...journals];
 
       // Tìm kiếm theo ngày
       if (searchDate) {
@@ -81,19 +179,11 @@ export default function HealthJournalListScreen() {
         );
       }
 
-      // Tìm kiếm theo nội dung
-      if (searchContent) {
-        const searchContentLower = searchContent.toLowerCase();
-        filtered = filtered.filter((journal) =>
-          journal.content.toLowerCase().includes(searchContentLower)
-        );
-      }
-
       setFilteredJournals(filtered);
     };
 
     searchJournals();
-  }, [searchDate, searchContent, journals]);
+  }, [searchDate, searchResults, journals]);
 
   // Lấy các session trong ngày
   const getSessionInfoByDate = (date) => {
@@ -166,7 +256,7 @@ export default function HealthJournalListScreen() {
       </View>
 
       <ScrollView style={styles.container}>
-        {loading ? (
+        {loading || (searching && !searchResults) ? (
           <ActivityIndicator size="large" color="#007AFF" />
         ) : filteredJournals.length === 0 ? (
           <Text style={{ color: "#888", textAlign: "center" }}>
@@ -181,7 +271,11 @@ export default function HealthJournalListScreen() {
               session && session.exercises ? session.exercises : [];
             const totalCalories = session ? session.total_calories : 0;
             return (
-              <View key={j.id} style={styles.journalItem}>
+              <TouchableOpacity
+                key={j.id}
+                style={styles.journalItem}
+                onPress={() => toggleJournal(j.id)}
+              >
                 <Text style={styles.journalDate}>
                   Ngày: {formatDate(j.date)}
                 </Text>
@@ -207,12 +301,37 @@ export default function HealthJournalListScreen() {
                 </Text>
                 <Text style={styles.journalLabel}>
                   Cảm nhận của bạn:
-                  <Text style={{ fontWeight: "400" }}> {j.content}</Text>
+                  <Text style={{ fontWeight: "400" }}>
+                    {" "}
+                    {expandedId === j.id && contents[j.id] !== undefined
+                      ? contents[j.id]
+                      : j.excerpt}
+                  </Text>
                 </Text>
-              </View>
+                {loadingContentId === j.id ? (
+                  <ActivityIndicator size="small" color="#007AFF" />
+                ) : (
+                  <Text style={styles.toggleText}>
+                    {expandedId === j.id ? "Thu gọn" : "Xem đầy đủ"}
+                  </Text>
+                )}
+              </TouchableOpacity>
             );
           })
         )}
+        {searchResults && searchNextPage && (
+          <TouchableOpacity
+            style={styles.loadMoreBtn}
+            onPress={loadMoreResults}
+            disabled={searching}
+          >
+            {searching ? (
+              <ActivityIndicator size="small" color="#007AFF" />
+            ) : (
+              <Text style={styles.toggleText}>Xem thêm kết quả</Text>
+            )}
+          </TouchableOpacity>
+        )}
       </ScrollView>
     </SafeAreaView>
   );
@@ -279,6 +398,15 @@ const styles = StyleSheet.create({
     color: "#333",
     fontSize: 14,
   },
+  toggleText: {
+    color: "#007AFF",
+    marginTop: 4,
+  },
+  loadMoreBtn: {
+    alignItems: "center",
+    paddingVertical: 10,
+    marginBottom: 30,
+  },
   searchContainer: {
     padding: 10,
     backgroundColor: "#fff",
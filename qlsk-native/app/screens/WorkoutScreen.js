@@ -140,7 +140,10 @@ export default function WorkoutScreen() {
       ) || currentExercise.calories_burned;
 
     try {
+      // Dòng bài tập trong buổi tập theo cùng thứ tự (phân biệt khi chọn trùng bài tập)
+      const workoutExercise = workoutSession.exercises?.[currentExerciseIndex];
       await completeExercise(workoutSession.id, {
+        workout_exercise_id: workoutExercise?.id,
         exercise_id: currentExercise.id,
         duration: actualDuration,
         calories_burned: caloriesBurned,
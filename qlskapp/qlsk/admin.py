@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Exercise, TrainingSchedule, TrainingSession, Reminder, HealthJournal, WorkoutSession, WorkoutExercise, HealthMetricsHistory, WaterSession, DietGoal, MealPlan, Meal
+from .models import User, Exercise, TrainingSchedule, TrainingSession, Reminder, HealthJournal, WorkoutSession, WorkoutExercise, HealthMetricsHistory, WaterSession, DietGoal, MealPlan, Meal, EmailOutbox, WorkoutTemplate, RecurringTrainingSchedule, ImageUpload
 
 
 # Tùy chỉnh tiêu đề và các thông tin trang quản trị
@@ -15,15 +15,19 @@ class UserAdmin(admin.ModelAdmin):
 
 @admin.register(Exercise)
 class ExerciseAdmin(admin.ModelAdmin):
-    list_display = ('name', 'duration', 'calories_burned', 'is_custom', 'user')
+    list_display = ('name', 'duration', 'calories_burned', 'met', 'is_custom', 'user')
     search_fields = ('name',)
     list_filter = ('is_custom',)
 
 @admin.register(TrainingSchedule)
 class TrainingScheduleAdmin(admin.ModelAdmin):
-    list_display = ('user', 'date', 'time')
+    list_display = ('user', 'date', 'time', 'recurrence')
     list_filter = ('date',)
 
+@admin.register(RecurringTrainingSchedule)
+class RecurringTrainingScheduleAdmin(admin.ModelAdmin):
+    list_display = ('user', 'time', 'weekdays', 'start_date', 'end_date')
+
 @admin.register(TrainingSession)
 class TrainingSessionAdmin(admin.ModelAdmin):
     list_display = ('schedule', 'exercise', 'custom_exercise_name', 'repetitions', 'duration')
@@ -48,6 +52,11 @@ class WorkoutSessionAdmin(admin.ModelAdmin):
 class WorkoutExerciseAdmin(admin.ModelAdmin):
     list_display = ('workout_session', 'exercise', 'duration', 'calories_burned', 'completed_at')
 
+@admin.register(WorkoutTemplate)
+class WorkoutTemplateAdmin(admin.ModelAdmin):
+    list_display = ('user', 'name', 'exercise_count', 'total_duration', 'base_calories', 'created_at')
+    search_fields = ('name',)
+
 @admin.register(HealthMetricsHistory)
 class HealthMetricsHistoryAdmin(admin.ModelAdmin):
     list_display = ('user', 'date', 'time', 'water_intake', 'steps', 'heart_rate')
@@ -72,3 +81,15 @@ class MealPlanAdmin(admin.ModelAdmin):
 class MealAdmin(admin.ModelAdmin):
     list_display = ('meal_plan', 'meal_type', 'name', 'calories')
     list_filter = ('meal_type',)
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email',)
+
+@admin.register(ImageUpload)
+class ImageUploadAdmin(admin.ModelAdmin):
+    list_display = ('model', 'object_id', 'field_name', 'status', 'attempts', 'next_attempt_at', 'processed_at')
+    list_filter = ('status', 'model')
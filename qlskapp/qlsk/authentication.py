@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from rest_framework.authentication import BaseAuthentication, SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .checks import is_shared_cache
+from .models import User
+
+# Các trường của User mà views/serializers thường dùng; các trường khác
+# (password, last_login, ...) được để deferred và chỉ tải khi thật sự truy cập.
+CACHED_USER_FIELDS = [
+    'id', 'username', 'email', 'first_name', 'last_name', 'role', 'height', 'weight',
+    'age', 'health_goal', 'bmi', 'expert_id', 'notified_expert',
+    'is_active', 'is_staff', 'is_superuser',
+]
+
+
+def user_cache_ttl():
+    """
+    post_save chỉ xóa được bản cache trong tiến trình hiện tại nếu cache là LocMemCache:
+    khi đó giữ TTL ngắn để thay đổi (khóa tài khoản, đổi role) tới các worker khác nhanh.
+    """
+    if is_shared_cache():
+        return settings.AUTH_USER_CACHE_TTL
+    return min(settings.AUTH_USER_CACHE_TTL, settings.AUTH_USER_LOCAL_CACHE_TTL)
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def invalidate_cached_users(user_ids):
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+def get_cached_user(user_id):
+    """Lấy User từ cache (không query), nếu chưa có thì đọc các trường cần thiết rồi lưu cache"""
+    values = cache.get(user_cache_key(user_id))
+    if values is None:
+        values = User.objects.filter(id=user_id).values(*CACHED_USER_FIELDS).first()
+        if values is None:
+            return None
+        cache.set(user_cache_key(user_id), values, user_cache_ttl())
+    # from_db đánh dấu các trường không có trong cache là deferred, nên save()
+    # chỉ ghi các trường đã tải và không ghi đè password bằng giá trị rỗng
+    field_names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    return User.from_db('default', field_names, [values[name] for name in field_names])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication nhưng lấy user từ cache thay vì query MySQL mỗi request"""
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Cần password hash để so sánh, dùng đường đi mặc định
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+
+class SchemeAuthentication(BaseAuthentication):
+    """
+    Chọn đúng một lớp xác thực theo từ khóa scheme của header Authorization thay vì
+    thử lần lượt JWT -> OAuth2 -> Session:
+    - Bearer <JWT> (3 phần ngăn bởi dấu chấm): CachedJWTAuthentication
+    - Bearer <token OAuth2>: OAuth2Authentication
+    - Không có header: SessionAuthentication
+    - Scheme khác (Basic, Token, ...): bỏ qua, để lớp xác thực/permission phía sau xử lý
+    """
+
+    def __init__(self):
+        self.jwt = CachedJWTAuthentication()
+        self.oauth2 = OAuth2Authentication()
+        self.session = SessionAuthentication()
+        self.bearer_keywords = {keyword.lower() for keyword in api_settings.AUTH_HEADER_TYPES} | {'bearer'}
+
+    def authenticate(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION')
+        if not header:
+            return self.session.authenticate(request)
+        parts = header.split()
+        if not parts:
+            # Header chỉ có khoảng trắng
+            return None
+        if parts[0].lower() not in self.bearer_keywords:
+            return None
+        if len(parts) == 2 and parts[1].count('.') != 2:
+            result = self.oauth2.authenticate(request)
+            if result is None:
+                raise AuthenticationFailed(_('Given token not valid for any token type'))
+            return result
+        return self.jwt.authenticate(request)
+
+    def authenticate_header(self, request):
+        return self.jwt.authenticate_header(request)
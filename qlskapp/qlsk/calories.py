@@ -0,0 +1,112 @@
+"""
+Tính calo tiêu thụ phía server.
+
+- Theo MET: kcal = MET * 3.5 * cân nặng(kg) / 200 * số phút
+- Khi có nhịp tim và tuổi: công thức Keytel (2005) không dùng VO2max,
+  lấy trung bình công thức nam/nữ vì User không lưu giới tính.
+
+Exercise chưa có MET thì suy ra MET từ calo gợi ý (tính cho người 70kg)
+và thời gian gợi ý của bài tập.
+"""
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import WorkoutExercise
+
+REFERENCE_WEIGHT_KG = 70
+
+
+def implied_met(calories_burned, duration_minutes):
+    """MET tương đương với calo gợi ý của Exercise cho người 70kg (số hoặc mảng NumPy)"""
+    return calories_burned * 200 / (3.5 * REFERENCE_WEIGHT_KG * duration_minutes)
+
+
+def exercise_met(exercise):
+    if exercise.met:
+        return exercise.met
+    if not exercise.duration:
+        return None
+    return implied_met(exercise.calories_burned, exercise.duration)
+
+
+def exercise_met_batch(met, suggested_calories, suggested_minutes):
+    """exercise_met cho mảng: MET của Exercise, thiếu thì suy ra từ calo/thời gian gợi ý; không xác định là NaN"""
+    import numpy as np
+
+    met = np.asarray(met, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        implied = implied_met(
+            np.asarray(suggested_calories, dtype=np.float64), np.asarray(suggested_minutes, dtype=np.float64),
+        )
+    implied[~np.isfinite(implied)] = np.nan
+    return np.where(np.isnan(met) | (met <= 0), implied, met)
+
+
+def keytel_per_minute(heart_rate, weight, age):
+    male = (-55.0969 + 0.6309 * heart_rate + 0.1988 * weight + 0.2017 * age) / 4.184
+    female = (-20.4022 + 0.4472 * heart_rate - 0.1263 * weight + 0.074 * age) / 4.184
+    return (male + female) / 2
+
+
+def calories_for(met, weight, duration_seconds, heart_rate=None, age=None):
+    """Đường tính cho một bài tập (dùng trong request)"""
+    weight = weight or REFERENCE_WEIGHT_KG
+    minutes = duration_seconds / 60
+    if heart_rate and age:
+        per_minute = keytel_per_minute(heart_rate, weight, age)
+    elif met:
+        per_minute = met * 3.5 * weight / 200
+    else:
+        return None
+    return max(0, round(per_minute * minutes))
+
+
+def calories_batch(met, weight, duration_seconds, heart_rate=None, age=None):
+    """
+    Đường tính vector hóa bằng NumPy cho nhiều bài tập một lúc.
+    Các tham số là mảng cùng độ dài; giá trị thiếu là NaN.
+    """
+    import numpy as np
+
+    met = np.asarray(met, dtype=np.float64)
+    weight = np.asarray(weight, dtype=np.float64)
+    weight = np.where(np.isnan(weight) | (weight <= 0), REFERENCE_WEIGHT_KG, weight)
+    minutes = np.asarray(duration_seconds, dtype=np.float64) / 60
+    per_minute = met * 3.5 * weight / 200
+    if heart_rate is not None and age is not None:
+        heart_rate = np.asarray(heart_rate, dtype=np.float64)
+        age = np.asarray(age, dtype=np.float64)
+        has_hr = ~np.isnan(heart_rate) & ~np.isnan(age) & (heart_rate > 0) & (age > 0)
+        per_minute = np.where(has_hr, keytel_per_minute(heart_rate, weight, age), per_minute)
+    calories = np.rint(np.clip(per_minute * minutes, 0, None))
+    # MET không xác định (NaN) -> -1 để bên gọi giữ nguyên giá trị cũ
+    return np.where(np.isnan(calories), -1, calories).astype(np.int64)
+
+
+def scale_calories(calories, weight):
+    """Quy đổi calo gợi ý (cho người 70kg) theo cân nặng người dùng"""
+    if not weight:
+        return calories
+    return round(calories * weight / REFERENCE_WEIGHT_KG)
+
+
+def exercise_calories(exercise, user, duration_seconds, heart_rate=None, reported=0):
+    """Calo của một bài tập đã hoàn thành; không tính được thì dùng giá trị client gửi"""
+    if exercise is None or not duration_seconds:
+        return reported
+    calories = calories_for(
+        exercise_met(exercise), user.weight, duration_seconds,
+        heart_rate=heart_rate, age=user.age,
+    )
+    return reported if calories is None else calories
+
+
+def session_calories_sum():
+    """Biểu thức SUM(calories_burned) của các bài tập thuộc buổi tập (dùng trong UPDATE/annotate)"""
+    calories = (
+        WorkoutExercise.objects.filter(workout_session=OuterRef('pk'))
+        .values('workout_session')
+        .annotate(total=Sum('calories_burned'))
+        .values('total')
+    )
+    return Coalesce(Subquery(calories), 0)
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+# Backend cache chỉ sống trong một tiến trình: mỗi worker gunicorn có bản riêng
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def cache_backend(alias='default', caches=None):
+    """Backend thật của cache `alias` (bỏ qua lớp bọc InstrumentedCache); caches mặc định là settings.CACHES"""
+    config = (settings.CACHES if caches is None else caches).get(alias, {})
+    backend = config.get('BACKEND', '')
+    if backend == 'qlsk.metrics.InstrumentedCache':
+        backend = config.get('OPTIONS', {}).get('BACKEND', '')
+    return backend
+
+
+def is_shared_cache(alias='default', caches=None):
+    return cache_backend(alias, caches) not in PROCESS_LOCAL_CACHE_BACKENDS
+
+
+def replica_cache_error(databases, caches, replica_alias):
+    """
+    Thông báo lỗi nếu bật replica mà cache chỉ sống trong từng tiến trình: đánh dấu
+    "vừa ghi, đọc từ primary" (qlsk/replicas.py) không tới được worker khác, request
+    đọc tiếp theo rơi vào worker khác sẽ đọc replica và không thấy dữ liệu vừa ghi.
+    """
+    if replica_alias not in databases or is_shared_cache(caches=caches):
+        return None
+    return (
+        f'Replica "{replica_alias}" được cấu hình nhưng cache mặc định ({cache_backend(caches=caches)}) '
+        'chỉ sống trong từng tiến trình: đọc sau khi ghi có thể không thấy dữ liệu vừa ghi.'
+    )
+
+
+@register(deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Giới hạn tần suất OTP (qlsk/ratelimit.py) đếm trong cache và cache user của JWT
+    (qlsk/authentication.py) được xóa qua cache: cần cache dùng chung.
+    """
+    if is_shared_cache():
+        return []
+    return [Warning(
+        f'Cache mặc định ({cache_backend()}) chỉ sống trong từng tiến trình: '
+        'giới hạn tần suất OTP bị nhân lên theo số worker và cache user của JWT chỉ dùng TTL ngắn '
+        '(AUTH_USER_LOCAL_CACHE_TTL).',
+        hint='Đặt CACHE_BACKEND=django.core.cache.backends.redis.RedisCache và CACHE_LOCATION=redis://...',
+        id='qlsk.W001',
+    )]
+
+
+@register()
+def check_replica_cache(app_configs, **kwargs):
+    message = replica_cache_error(settings.DATABASES, settings.CACHES, settings.DATABASE_REPLICA_ALIAS)
+    if message is None:
+        return []
+    return [Error(
+        message,
+        hint='Đặt CACHE_BACKEND=django.core.cache.backends.redis.RedisCache và CACHE_LOCATION=redis://... '
+             'hoặc bỏ DB_REPLICA_HOST.',
+        id='qlsk.E001',
+    )]
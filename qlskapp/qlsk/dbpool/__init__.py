@@ -0,0 +1,7 @@
+"""
+Backend MySQL có connection pool trong tiến trình (ENGINE = 'qlsk.dbpool').
+
+Django chỉ có pool sẵn cho PostgreSQL; với MySQL, khi chạy ASGI không nên giữ kết nối
+theo luồng (CONN_MAX_AGE) nên kết nối được mượn từ pool ở đầu request và trả lại khi
+Django đóng kết nối (CONN_MAX_AGE = 0). Cấu hình trong DATABASES[alias]['POOL'].
+"""
@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from qlsk.mysql import base as mysql
+
+DEFAULT_POOL = {
+    # Số kết nối tối đa mỗi tiến trình
+    'MAX_SIZE': 10,
+    # Số giây chờ khi pool đã hết kết nối rảnh
+    'TIMEOUT': 10,
+    # Đóng và mở lại kết nối đã dùng quá số giây này (nhỏ hơn wait_timeout của MySQL)
+    'RECYCLE': 3600,
+    # Ping trước khi dùng lại kết nối đã rảnh quá số giây này
+    'PING_AFTER': 30,
+}
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Pool các kết nối DB-API dùng chung giữa các luồng của một tiến trình"""
+
+    def __init__(self, max_size, timeout, recycle, ping_after):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        # LIFO: ưu tiên kết nối vừa trả lại, kết nối ít dùng sẽ hết hạn và được đóng
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        # Số kết nối thật đã mở (để đo/benchmark)
+        self.opened = 0
+        # id(kết nối) -> thời điểm mở
+        self._opened_at = {}
+        # id các kết nối đã chạy init_connection_state
+        self.initialized = set()
+
+    def acquire(self, connect, ping):
+        while True:
+            try:
+                conn, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open_or_wait(connect)
+                if conn is not None:
+                    return conn
+                continue
+            now = time.monotonic()
+            if now - self._opened_at[id(conn)] > self.recycle:
+                self.discard(conn)
+                continue
+            if now - released_at > self.ping_after and not ping(conn):
+                self.discard(conn)
+                continue
+            return conn
+
+    def _open_or_wait(self, connect):
+        with self._lock:
+            can_open = self._size < self.max_size
+            if can_open:
+                self._size += 1
+        if can_open:
+            try:
+                conn = connect()
+            except BaseException:
+                with self._lock:
+                    self._size -= 1
+                raise
+            self._opened_at[id(conn)] = time.monotonic()
+            self.opened += 1
+            return conn
+        try:
+            conn, released_at = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f'Không lấy được kết nối DB sau {self.timeout} giây (pool {self.max_size} kết nối)')
+        # Trả lại để vòng lặp của acquire kiểm tra hạn dùng/ping
+        self._idle.put((conn, released_at))
+        return None
+
+    def release(self, conn):
+        self._idle.put((conn, time.monotonic()))
+
+    def discard(self, conn):
+        self._opened_at.pop(id(conn), None)
+        self.initialized.discard(id(conn))
+        with self._lock:
+            self._size -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(settings_dict):
+    key = (settings_dict['HOST'], settings_dict['PORT'], settings_dict['NAME'], settings_dict['USER'])
+    with _pools_lock:
+        if key not in _pools:
+            options = {**DEFAULT_POOL, **settings_dict.get('POOL', {})}
+            _pools[key] = ConnectionPool(
+                int(options['MAX_SIZE']), float(options['TIMEOUT']),
+                float(options['RECYCLE']), float(options['PING_AFTER']),
+            )
+        return _pools[key]
+
+
+class PooledConnectionMixin:
+    """
+    Mượn kết nối từ pool khi Django connect() và trả lại khi close().
+    Kết nối đang dở transaction hoặc đã lỗi thì đóng hẳn thay vì trả lại.
+    """
+
+    def check_settings(self):
+        super().check_settings()
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured(
+                'Backend có pool cần CONN_MAX_AGE = 0 để trả kết nối về pool sau mỗi request.'
+            )
+
+    @property
+    def pool(self):
+        return get_pool(self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        return self.pool.acquire(
+            lambda: super(PooledConnectionMixin, self).get_new_connection(conn_params),
+            self.ping_connection,
+        )
+
+    def ping_connection(self, conn):
+        try:
+            conn.ping()
+            return True
+        except Exception:
+            return False
+
+    def init_connection_state(self):
+        # Các lệnh SET chỉ cần chạy một lần cho mỗi kết nối thật
+        if id(self.connection) in self.pool.initialized:
+            return
+        super().init_connection_state()
+        self.pool.initialized.add(id(self.connection))
+
+    def _close(self):
+        conn = self.connection
+        if conn is None:
+            return
+        reusable = (
+            not self.in_atomic_block and self.get_autocommit()
+            # Lỗi như IntegrityError không làm hỏng kết nối, chỉ kiểm tra lại khi có lỗi
+            and (not self.errors_occurred or self.is_usable())
+        )
+        if reusable:
+            self.pool.release(conn)
+        else:
+            self.pool.discard(conn)
+
+
+class DatabaseWrapper(PooledConnectionMixin, mysql.DatabaseWrapper):
+    pass
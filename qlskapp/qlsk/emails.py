@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .job_queue import LeasedQueue
+from .models import EmailOutbox
+
+MAX_ATTEMPTS = 5
+REDACTED_BODY = '[đã xóa]'
+LEASE_SECONDS = 300  # Email 'sending' quá thời gian này được coi như worker đã chết
+
+email_queue = LeasedQueue(EmailOutbox, 'sending', LEASE_SECONDS)
+
+
+def queue_email(subject, body, to_email, from_email=None, sensitive=False):
+    """
+    Thêm email vào hàng đợi, worker send_queued_emails sẽ gửi sau.
+    sensitive=True (body chứa OTP): body bị xóa ngay khi gửi xong hoặc khi hết hạn.
+    """
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        to_email=to_email,
+        from_email=from_email,
+        sensitive=sensitive,
+    )
+
+
+def claim_pending_emails(batch_size, now=None):
+    """Nhận một lô email đến hạn (chuyển sang 'sending'), trả về (danh sách email, hạn thuê)"""
+    return email_queue.claim(batch_size, now)
+
+
+def send_pending_emails(batch_size=50, max_attempts=MAX_ATTEMPTS, connection=None):
+    """
+    Gửi một lô email đến hạn qua một kết nối SMTP duy nhất.
+    SMTP chạy ngoài transaction (không giữ khóa dòng), mỗi email được ghi kết quả riêng.
+    Trả về (số email đã gửi, số email lỗi).
+    """
+    now = timezone.now()
+    batch, lease_until = claim_pending_emails(batch_size, now)
+    if not batch:
+        return 0, 0
+
+    sent, failed = 0, 0
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # Không mở được SMTP: hoãn cả lô theo backoff
+        for email in batch:
+            email_queue.mark_failed(email, e, max_attempts, now, lease_until)
+        return 0, len(batch)
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email or settings.DEFAULT_FROM_EMAIL,
+                [email.to_email],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                email_queue.mark_failed(email, e, max_attempts, timezone.now(), lease_until)
+                failed += 1
+            else:
+                _mark_sent(email, lease_until)
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _mark_sent(email, lease_until):
+    email.status = 'sent'
+    email.attempts += 1
+    email.sent_at = timezone.now()
+    email.last_error = None
+    fields = {'status': email.status, 'attempts': F('attempts') + 1, 'sent_at': email.sent_at, 'last_error': None}
+    if email.sensitive:
+        email.body = fields['body'] = REDACTED_BODY
+    email_queue.update_claimed(email, lease_until, **fields)
+
+
+def redact_sensitive_emails(before):
+    """
+    Xóa body của email nhạy cảm tạo trước `before` (OTP đã hết hạn).
+    Email chưa gửi được thì bỏ luôn: mã trong đó không còn dùng được.
+    Email đang gửi ('sending') để worker xử lý, body bị xóa khi gửi xong.
+    Trả về số email đã xóa body.
+    """
+    expired = EmailOutbox.objects.filter(sensitive=True, created_at__lt=before).exclude(body=REDACTED_BODY)
+    dropped = expired.filter(status='pending').update(
+        status='failed', body=REDACTED_BODY, last_error='Hết hạn trước khi gửi được',
+    )
+    return dropped + expired.exclude(status='sending').update(body=REDACTED_BODY)
@@ -0,0 +1,151 @@
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import track_http
+
+GOOGLE_ISSUERS = ['accounts.google.com', 'https://accounts.google.com']
+DEFAULT_CERTS_TTL = 3600  # Dùng khi Google không trả về Cache-Control max-age
+REFRESH_MARGIN = 300  # Làm mới nền khi còn dưới 5 phút là hết hạn
+MIN_REFRESH_INTERVAL = 60  # Không tải lại quá 1 lần/phút khi gặp kid lạ
+
+_MAX_AGE_RE = re.compile(r'max-age\s*=\s*(\d+)', re.I)
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def http_session():
+    """
+    Session requests dùng chung, giữ kết nối keep-alive (chứng chỉ Google, Graph API).
+    requests và google.auth chỉ được import khi cần để khởi động nhanh.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+    return _http_session
+
+
+def parse_max_age(cache_control, default=DEFAULT_CERTS_TTL):
+    """Lấy max-age (giây) từ header Cache-Control"""
+    match = _MAX_AGE_RE.search(cache_control or '')
+    return int(match.group(1)) if match else default
+
+
+class GoogleCertCache:
+    """
+    Cache chứng chỉ công khai của Google để xác thực ID token cục bộ.
+    - TTL lấy theo Cache-Control max-age của phản hồi.
+    - Chỉ một luồng tải chứng chỉ tại một thời điểm; các luồng khác dùng bản cũ.
+    - Gần hết hạn thì làm mới ở luồng nền, request hiện tại không phải chờ.
+    """
+
+    def __init__(self, certs_url, session=None, timeout=5):
+        self.certs_url = certs_url
+        self._session = session
+        self.timeout = timeout
+        self._certs = None
+        self._expires_at = 0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        # Khóa riêng cho cờ _refreshing: _lock bị giữ suốt lúc tải chứng chỉ
+        self._state_lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def session(self):
+        return self._session or http_session()
+
+    def _fetch(self):
+        from google.auth import exceptions
+
+        with track_http('google'):
+            response = self.session.get(self.certs_url, timeout=self.timeout)
+        if response.status_code != 200:
+            raise exceptions.TransportError(
+                f'Không tải được chứng chỉ Google, status {response.status_code}'
+            )
+        ttl = parse_max_age(response.headers.get('Cache-Control'))
+        self._certs = response.json()
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + ttl
+        return self._certs
+
+    def refresh(self, min_interval=0):
+        """Tải lại chứng chỉ đồng bộ (các luồng chờ cùng một lần tải)"""
+        with self._lock:
+            if (self._certs is not None and self._fetched_at is not None
+                    and time.monotonic() - self._fetched_at < min_interval):
+                return self._certs
+            return self._fetch()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            # Giữ bản cũ, lần gọi sau sẽ thử lại
+            pass
+        finally:
+            with self._state_lock:
+                self._refreshing = False
+
+    def _start_background_refresh(self):
+        """Chỉ một luồng nền được tạo dù nhiều request cùng thấy chứng chỉ sắp hết hạn"""
+        with self._state_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def get_certs(self):
+        now = time.monotonic()
+        if self._certs is None or now >= self._expires_at:
+            with self._lock:
+                # Luồng khác có thể vừa tải xong trong lúc chờ khóa
+                if self._certs is None or time.monotonic() >= self._expires_at:
+                    return self._fetch()
+                return self._certs
+        if now >= self._expires_at - REFRESH_MARGIN:
+            self._start_background_refresh()
+        return self._certs
+
+
+google_certs = GoogleCertCache(settings.GOOGLE_CERTS_URL)
+
+
+def verify_google_id_token(token, audience=None, cache=None):
+    """
+    Thay cho id_token.verify_oauth2_token: kiểm tra chữ ký bằng chứng chỉ đã cache,
+    không tạo transport mới và không tải lại chứng chỉ mỗi lần đăng nhập.
+    audience mặc định là GOOGLE_ID_TOKEN_AUDIENCE, không có thì CLIENT_ID_GOOGLE;
+    không cấu hình cả hai thì từ chối (không bao giờ bỏ qua kiểm tra aud).
+    """
+    from google.auth import exceptions, jwt
+
+    if audience is None:
+        audience = settings.GOOGLE_ID_TOKEN_AUDIENCE or settings.CLIENT_ID_GOOGLE
+    if not audience:
+        raise exceptions.GoogleAuthError('Chưa cấu hình GOOGLE_CLIENT_ID để kiểm tra audience')
+    cache = cache or google_certs
+    certs = cache.get_certs()
+    key_id = jwt.decode_header(token).get('kid')
+    if key_id and key_id not in certs:
+        # Google đã xoay khóa trước khi cache hết hạn
+        certs = cache.refresh(min_interval=MIN_REFRESH_INTERVAL)
+    idinfo = jwt.decode(token, certs=certs, audience=audience)
+    if idinfo.get('iss') not in GOOGLE_ISSUERS:
+        raise exceptions.GoogleAuthError(
+            f"Wrong issuer. 'iss' should be one of the following: {GOOGLE_ISSUERS}"
+        )
+    return idinfo
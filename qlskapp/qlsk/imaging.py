@@ -0,0 +1,27 @@
+"""
+Xử lý ảnh bằng Pillow, chạy trong process pool nên module này không import Django.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+
+def render_webp_variants(path, max_dimension, thumbnail_size, quality=80):
+    """
+    Tạo bản WebP đã thu nhỏ (cạnh dài tối đa max_dimension) và thumbnail vuông
+    thumbnail_size từ ảnh gốc. Trả về (đường dẫn ảnh, đường dẫn thumbnail).
+    """
+    base = os.path.splitext(path)[0]
+    full_path = base + '.full.webp'
+    thumbnail_path = base + '.thumb.webp'
+    with Image.open(path) as image:
+        # Xoay ảnh theo EXIF (ảnh chụp từ điện thoại)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        full = image.copy()
+        full.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        full.save(full_path, 'WEBP', quality=quality, method=4)
+        thumbnail = ImageOps.fit(image, (thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+        thumbnail.save(thumbnail_path, 'WEBP', quality=quality, method=4)
+    return full_path, thumbnail_path
@@ -0,0 +1,74 @@
+"""
+Hàng đợi công việc trên một bảng (EmailOutbox, ImageUpload): nhận theo lô với hạn thuê,
+chỉ ghi kết quả khi còn giữ lần nhận, gửi lại theo backoff khi lỗi.
+
+Bảng cần các cột status ('pending', trạng thái đang xử lý, 'failed'), attempts,
+last_error và next_attempt_at.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+BACKOFF_BASE_SECONDS = 30  # 30s, 60s, 120s, ...
+BACKOFF_MAX_SECONDS = 3600
+
+
+def backoff_delay(attempts):
+    """Thời gian chờ trước lần thử lại thứ `attempts` (tăng gấp đôi, có giới hạn)"""
+    return min(BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), BACKOFF_MAX_SECONDS)
+
+
+class LeasedQueue:
+    def __init__(self, model, claimed_status, lease_seconds):
+        self.model = model
+        self.claimed_status = claimed_status
+        self.lease_seconds = lease_seconds
+
+    def claim(self, batch_size, now=None):
+        """
+        Nhận một lô việc đến hạn trong một transaction ngắn: chuyển sang claimed_status với
+        hạn thuê (next_attempt_at = now + lease_seconds). Worker chết giữa chừng thì hết hạn
+        thuê việc được nhận lại. Trả về (danh sách việc, hạn thuê).
+        """
+        now = now or timezone.now()
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        with transaction.atomic():
+            # skip_locked để nhiều worker chạy song song không nhận trùng
+            batch = list(
+                self.model.objects.select_for_update(skip_locked=True)
+                .filter(status__in=['pending', self.claimed_status], next_attempt_at__lte=now)
+                .order_by('next_attempt_at', 'id')[:batch_size]
+            )
+            if batch:
+                self.model.objects.filter(pk__in=[job.pk for job in batch]).update(
+                    status=self.claimed_status, next_attempt_at=lease_until,
+                )
+        return batch, lease_until
+
+    def update_claimed(self, job, lease_until, **fields):
+        """
+        Chỉ ghi nếu việc vẫn thuộc lần nhận này (claimed_status với đúng hạn thuê):
+        worker chậm quá hạn thuê không ghi đè kết quả của worker đã nhận lại việc.
+        Trả về số dòng đã ghi (0 nếu đã mất lần nhận).
+        """
+        return self.model.objects.filter(
+            pk=job.pk, status=self.claimed_status, next_attempt_at=lease_until,
+        ).update(**fields)
+
+    def mark_failed(self, job, error, max_attempts, now, lease_until):
+        """Hẹn thử lại theo backoff, hết lượt thì chuyển sang 'failed'. Trả về như update_claimed"""
+        job.attempts += 1
+        job.last_error = str(error)
+        if job.attempts >= max_attempts:
+            job.status = 'failed'
+            job.next_attempt_at = now
+        else:
+            job.status = 'pending'
+            job.next_attempt_at = now + timedelta(seconds=backoff_delay(job.attempts))
+        return self.update_claimed(
+            job, lease_until,
+            status=job.status, attempts=F('attempts') + 1, last_error=job.last_error,
+            next_attempt_at=job.next_attempt_at,
+        )
@@ -0,0 +1,318 @@
+"""
+Benchmark tải cho API (lệnh benchmark_load): dân số người dùng giả lập và lưu lượng
+mô phỏng vòng lặp polling của app mobile, gọi thẳng WSGIHandler trong tiến trình nên
+chạy được hoàn toàn cục bộ với SQLite hoặc MySQL local.
+
+- Dân số: chuyên gia, user là client của chuyên gia, nhiều năm buổi tập, lượt uống nước
+  và chỉ số sức khỏe. Tài khoản có tiền tố POPULATION_PREFIX để dùng lại hoặc xóa.
+- Lưu lượng theo từng phút mô phỏng: bước chân mỗi phút, nhắc nhở mỗi 2 phút, thỉnh thoảng
+  mở dashboard (nhiều API cùng lúc) và tạo thực đơn với LLM giả (không gọi OpenAI).
+"""
+import json
+import math
+import random
+import statistics
+import threading
+import time as time_module
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import views
+from .models import (
+    DietGoal, Exercise, HealthMetricsHistory, Meal, MealPlan, RecurringTrainingSchedule, Reminder, User,
+    WaterSession, WorkoutExercise, WorkoutSession,
+)
+
+POPULATION_PREFIX = 'loadtest-'
+EMAIL_DOMAIN = 'loadtest.invalid'
+BATCH_SIZE = 1000
+
+# Phản hồi mẫu của LLM, đúng định dạng parse_chatgpt_response đọc được
+FAKE_MEAL_PLAN = """Thực đơn giảm cân
+Thực đơn ít tinh bột, nhiều rau.
+Calo: 1800, Protein: 120g, Carbs: 150g, Fat: 60g
+Bữa sáng
+- Tên món: Yến mạch
+- Calo: 400
+Bữa trưa
+- Tên món: Cơm gạo lứt
+- Calo: 600
+Bữa tối
+- Tên món: Salad gà
+- Calo: 500
+Bữa phụ
+- Tên món: Sữa chua
+- Calo: 300
+"""
+
+EXERCISES = [
+    ('Chạy bộ', 30, 300, 9.8), ('Đạp xe', 45, 400, 7.5), ('Bơi lội', 30, 350, 8.0),
+    ('Hít đất', 10, 80, 8.0), ('Plank', 5, 30, 4.0), ('Squat', 10, 90, 5.0),
+    ('Yoga', 40, 150, 2.5), ('Nhảy dây', 15, 200, 12.3),
+]
+
+
+def population_users():
+    return User.objects.filter(username__startswith=POPULATION_PREFIX)
+
+
+def delete_population():
+    population_users().delete()
+    Exercise.objects.filter(name__startswith=POPULATION_PREFIX).delete()
+
+
+def _ids(queryset):
+    # MySQL không trả về ID sau bulk_create nên đọc lại theo thứ tự tạo
+    return list(queryset.order_by('id').values_list('id', flat=True))
+
+
+def seed_population(users, experts, days, seed=0, log=None):
+    """Tạo dân số giả lập, trả về số dòng đã tạo theo bảng"""
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    counts = defaultdict(int)
+    password = make_password(None)
+
+    with transaction.atomic():
+        Exercise.objects.bulk_create(
+            Exercise(name=f'{POPULATION_PREFIX}{name}', description='', duration=duration,
+                     calories_burned=calories, met=met)
+            for name, duration, calories, met in EXERCISES
+        )
+        exercise_ids = _ids(Exercise.objects.filter(name__startswith=POPULATION_PREFIX))
+        User.objects.bulk_create(
+            User(username=f'{POPULATION_PREFIX}expert-{i}', email=f'expert-{i}@{EMAIL_DOMAIN}',
+                 role='expert', password=password)
+            for i in range(experts)
+        )
+        expert_ids = _ids(population_users().filter(role='expert'))
+        User.objects.bulk_create(
+            (
+                User(username=f'{POPULATION_PREFIX}user-{i}', email=f'user-{i}@{EMAIL_DOMAIN}', password=password,
+                     expert_id=expert_ids[i % len(expert_ids)] if expert_ids else None, notified_expert=True,
+                     height=rng.randint(150, 190), weight=rng.randint(45, 100), age=rng.randint(18, 65))
+                for i in range(users)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        user_ids = _ids(population_users().filter(role='user'))
+        counts['users'] = len(user_ids) + len(expert_ids)
+
+    for n, user_id in enumerate(user_ids):
+        # Mỗi user một transaction để không giữ khóa quá lâu trên MySQL
+        with transaction.atomic():
+            _seed_user(user_id, exercise_ids, today, days, rng, counts)
+        if log and (n + 1) % 10 == 0:
+            log(f'Đã tạo dữ liệu cho {n + 1}/{len(user_ids)} user')
+    return dict(counts)
+
+
+def _seed_user(user_id, exercise_ids, today, days, rng, counts):
+    sessions, start_times, water, metrics = [], [], [], []
+    for offset in range(days, 0, -1):
+        day = today - timedelta(days=offset)
+        # Tập khoảng 3 buổi mỗi tuần
+        if rng.random() < 3 / 7:
+            sessions.append(WorkoutSession(user_id=user_id, is_completed=True))
+            started = datetime.combine(day, time(rng.randint(5, 20), rng.randint(0, 59)))
+            start_times.append((started, started + timedelta(minutes=rng.randint(20, 90))))
+        cups = rng.randint(4, 10)
+        water.extend(WaterSession(user_id=user_id, date=day, amount=0.25) for _ in range(cups))
+        metrics.append(HealthMetricsHistory(
+            user_id=user_id, date=day, water_intake=cups * 0.25,
+            steps=rng.randint(1000, 15000), heart_rate=rng.randint(55, 95),
+        ))
+
+    WorkoutSession.objects.bulk_create(sessions, batch_size=BATCH_SIZE)
+    sessions = list(WorkoutSession.objects.filter(user_id=user_id).order_by('id'))
+    # start_time là auto_now_add nên ghi lại thời điểm thật sau khi tạo
+    for session, (started, ended) in zip(sessions, start_times):
+        session.start_time, session.end_time = started, ended
+    workout_exercises = []
+    for session in sessions:
+        for exercise_id in rng.sample(exercise_ids, min(3, len(exercise_ids))):
+            calories = rng.randint(50, 300)
+            session.total_calories += calories
+            workout_exercises.append(WorkoutExercise(
+                workout_session=session, exercise_id=exercise_id, duration=rng.randint(300, 1800),
+                calories_burned=calories, heart_rate=rng.randint(100, 160),
+            ))
+    WorkoutSession.objects.bulk_update(sessions, ['start_time', 'end_time', 'total_calories'], batch_size=500)
+    WorkoutExercise.objects.bulk_create(workout_exercises, batch_size=BATCH_SIZE)
+    WaterSession.objects.bulk_create(water, batch_size=BATCH_SIZE)
+    HealthMetricsHistory.objects.bulk_create(metrics, batch_size=BATCH_SIZE)
+
+    RecurringTrainingSchedule.objects.create(
+        user_id=user_id, time=time(18), weekdays=0b0010101, start_date=today - timedelta(days=days),
+    )
+    Reminder.objects.bulk_create([
+        Reminder(user_id=user_id, reminder_type='water', time=time(9), message='Uống nước'),
+        Reminder(user_id=user_id, reminder_type='exercise', time=time(18), message='Tập luyện'),
+        Reminder(user_id=user_id, reminder_type='rest', time=time(22), message='Đi ngủ'),
+    ])
+    goal = DietGoal.objects.create(user_id=user_id, goal_type='weight_loss', target_weight=60)
+    plan = MealPlan.objects.create(
+        user_id=user_id, diet_goal=goal, title='Thực đơn', description='', total_calories=1800,
+        protein=120, carbs=150, fat=60,
+    )
+    Meal.objects.bulk_create(
+        Meal(meal_plan=plan, meal_type=meal_type, name=meal_type, description='', calories=450, protein=30,
+             carbs=40, fat=15, ingredients='', instructions='')
+        for meal_type in ('breakfast', 'lunch', 'dinner', 'snack')
+    )
+
+    counts['workout_sessions'] += len(sessions)
+    counts['workout_exercises'] += len(workout_exercises)
+    counts['water_sessions'] += len(water)
+    counts['health_metrics'] += len(metrics)
+    counts['reminders'] += 3
+    counts['meal_plans'] += 1
+
+
+class Request:
+    def __init__(self, endpoint, method, path, data=None):
+        # endpoint: nhãn để gom kết quả (không chứa id, tham số)
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.data = data
+
+
+DASHBOARD = [
+    Request('GET calendar/', 'get', '/api/calendar/'),
+    Request('GET health-metrics/get/', 'get', '/api/health-metrics/get/'),
+    Request('GET water/analytics/', 'get', '/api/water/analytics/?window=7d'),
+    Request('GET training-statistics/', 'get', '/api/training-statistics/?mode=week'),
+    Request('GET workout-sessions/', 'get', '/api/workout-sessions/'),
+]
+
+
+def build_traffic(user_ids, minutes, dashboard_rate, meal_plan_rate, seed=0):
+    """
+    Danh sách (giây mô phỏng, user_id, Request) theo thứ tự thời gian. Mỗi thiết bị lệch
+    pha ngẫu nhiên trong phút để các request không dồn vào cùng một giây.
+    """
+    rng = random.Random(seed)
+    events = []
+    for user_id in user_ids:
+        phase = rng.uniform(0, 60)
+        steps = rng.randint(0, 5000)
+        for minute in range(minutes):
+            at = minute * 60 + phase
+            steps += rng.randint(0, 120)
+            events.append((at, user_id, Request('POST health-metrics/steps/', 'post', '/api/health-metrics/steps/', {'steps': steps})))
+            if minute % 2 == 0:
+                events.append((at + 1, user_id, Request('GET reminders/', 'get', '/api/reminders/')))
+            if rng.random() < dashboard_rate:
+                opened = at + rng.uniform(0, 59)
+                events.extend((opened, user_id, request) for request in DASHBOARD)
+            if rng.random() < meal_plan_rate:
+                events.append((at + rng.uniform(0, 59), user_id, Request('POST meal-plans/generate/', 'post', '/api/meal-plans/generate/', {})))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def fake_llm(latency):
+    """Thay generate_nutrition_plan: chờ `latency` giây như gọi API thật rồi trả về thực đơn mẫu"""
+    def generate(prompt):
+        time_module.sleep(latency)
+        return FAKE_MEAL_PLAN
+    return generate
+
+
+def percentile(sorted_values, q):
+    """Percentile kiểu nearest-rank trên danh sách đã sắp xếp"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(q * len(sorted_values)) - 1, 0)]
+
+
+def run_traffic(events, tokens, concurrency, llm_latency):
+    """
+    Phát lại events nhanh nhất có thể bằng `concurrency` luồng (mỗi luồng như một worker
+    WSGI). Trả về (thời gian chạy, {endpoint: [(ms, status), ...]}).
+    """
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    results = defaultdict(list)
+    lock = threading.Lock()
+    queue = iter(events)
+
+    def call(user_id, request):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {tokens[user_id]}'}
+        if request.method == 'get':
+            wsgi_request = factory.get(request.path, **headers)
+        else:
+            wsgi_request = factory.post(request.path, data=json.dumps(request.data), content_type='application/json', **headers)
+        started = time_module.perf_counter()
+        status = []
+        response = handler(wsgi_request.environ, lambda code, response_headers: status.append(code))
+        try:
+            # Đọc hết body (kể cả response dạng stream như calendar)
+            for _ in response:
+                pass
+        finally:
+            # close() phát request_finished -> đóng/trả kết nối DB như khi chạy thật
+            response.close()
+        return (time_module.perf_counter() - started) * 1000, int(status[0].split()[0])
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    event = next(queue, None)
+                if event is None:
+                    return
+                _, user_id, request = event
+                elapsed, status = call(user_id, request)
+                with lock:
+                    results[request.endpoint].append((elapsed, status))
+        finally:
+            connections.close_all()
+
+    with mock.patch.object(views, 'generate_nutrition_plan', fake_llm(llm_latency)):
+        started = time_module.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(worker) for _ in range(concurrency)]:
+                future.result()
+        duration = time_module.perf_counter() - started
+    return duration, results
+
+
+def summarize(duration, results):
+    endpoints = {}
+    total = errors = 0
+    for endpoint, samples in sorted(results.items()):
+        timings = sorted(ms for ms, _ in samples)
+        failed = sum(1 for _, status in samples if status >= 400)
+        total += len(samples)
+        errors += failed
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'errors': failed,
+            'throughput_rps': round(len(samples) / duration, 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+        }
+    return {
+        'duration_s': round(duration, 3),
+        'requests': total,
+        'errors': errors,
+        'throughput_rps': round(total / duration, 2) if duration else 0,
+        'endpoints': endpoints,
+    }
+
+
+def access_tokens(user_ids):
+    return {user_id: str(RefreshToken.for_user(User(id=user_id)).access_token) for user_id in user_ids}
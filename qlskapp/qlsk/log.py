@@ -0,0 +1,41 @@
+"""
+Log có cấu trúc: mỗi dòng là một JSON (message + các trường truyền qua extra=...).
+
+Log INFO/DEBUG được lấy mẫu theo LOG_SAMPLE_RATE (hoặc extra={'sample_rate': ...} của từng
+lần ghi) để các log xuất hiện theo từng request không làm ngập log khi tải cao;
+WARNING trở lên luôn được ghi.
+"""
+import json
+import logging
+import random
+
+# Thuộc tính có sẵn của LogRecord, không đưa vào JSON
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sample_rate'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                data[key] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = getattr(record, 'sample_rate', self.rate)
+        return rate >= 1 or random.random() < rate
@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from qlsk.authentication import SchemeAuthentication
+from qlsk.checks import cache_backend
+from qlsk.metrics import collect_stats
+from qlsk.models import User
+
+MODES = {
+    # Chuỗi mặc định trước đây: JWT -> OAuth2 -> Session, JWT đọc User từ DB mỗi request
+    'chain': lambda: [JWTAuthentication(), OAuth2Authentication(), SessionAuthentication()],
+    # SchemeAuthentication: một lớp theo scheme, User lấy từ cache
+    'scheme': lambda: [SchemeAuthentication()],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Đo thời gian xác thực một request có Bearer JWT (p50/p95, số câu SQL) với chuỗi '
+        'JWT -> OAuth2 -> Session so với SchemeAuthentication + cache user.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Số request đo mỗi chế độ')
+        parser.add_argument('--warmup', type=int, default=100, help='Số request chạy trước, không tính')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+
+    def handle(self, *args, **options):
+        # User thử được tạo trong transaction và rollback khi đo xong
+        with transaction.atomic():
+            user = User.objects.create(username='benchmark-auth', email='benchmark-auth@example.com')
+            header = f'Bearer {RefreshToken.for_user(user).access_token}'
+            factory = APIRequestFactory()
+
+            for mode in options['modes']:
+                authenticators = MODES[mode]()
+                cache.clear()
+
+                def authenticate():
+                    request = Request(factory.get('/api/calendar/', HTTP_AUTHORIZATION=header), authenticators=authenticators)
+                    started = time.perf_counter()
+                    assert request.user.pk == user.pk
+                    return (time.perf_counter() - started) * 1000
+
+                for _ in range(options['warmup']):
+                    authenticate()
+                with collect_stats() as stats:
+                    timings = sorted(authenticate() for _ in range(options['requests']))
+                self.stdout.write(
+                    f'{mode:8} p50 {statistics.median(timings):7.3f} ms  '
+                    f'p95 {timings[int(len(timings) * 0.95) - 1]:7.3f} ms  '
+                    f'SQL/request {stats.sql_count / options["requests"]:.2f}'
+                )
+            self.stdout.write(f'(cache: {cache_backend()}, DB: {connection.vendor})')
+            transaction.set_rollback(True)
@@ -0,0 +1,94 @@
+import statistics
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from qlsk import loadtest, views
+from qlsk.metrics import instrument_queries
+
+
+def run_in_thread_closing(func):
+    """Cách cũ để so sánh: đóng mọi kết nối của luồng phụ sau mỗi tác vụ"""
+    try:
+        with instrument_queries():
+            return func()
+    finally:
+        connections.close_all()
+
+
+MODES = ['sequential', 'parallel', 'parallel-close']
+
+
+class Command(BaseCommand):
+    help = (
+        'Đo độ trễ GET /api/calendar/ và số kết nối DB mở mới mỗi request: chạy tuần tự '
+        '(CALENDAR_QUERY_WORKERS=1), song song với kết nối được giữ trong luồng phụ, và song song '
+        'nhưng đóng kết nối sau mỗi tác vụ. Dùng một user của dân số giả lập (benchmark_load).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Số request mỗi chế độ')
+        parser.add_argument('--warmup', type=int, default=20, help='Số request chạy trước, không tính')
+        parser.add_argument('--days', type=int, default=31, help='Khoảng ngày của lịch (tối đa 93)')
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+
+    def handle(self, *args, **options):
+        seeded = not loadtest.population_users().filter(role='user').exists()
+        if seeded:
+            self.stdout.write('Tạo dân số giả lập nhỏ (1 user, 365 ngày), xóa khi đo xong')
+            loadtest.seed_population(1, 0, 365)
+        user = loadtest.population_users().filter(role='user').order_by('id').first()
+        token = str(RefreshToken.for_user(user).access_token)
+        end = timezone.now().date()
+        start = end - timedelta(days=options['days'] - 1)
+        handler = WSGIHandler()
+        factory = RequestFactory()
+
+        def call():
+            request = factory.get(
+                '/api/calendar/', {'from': start.isoformat(), 'to': end.isoformat()},
+                HTTP_AUTHORIZATION=f'Bearer {token}',
+            )
+            started = time.perf_counter()
+            response = handler(request.environ, lambda status, headers: None)
+            b''.join(response)
+            # close() phát request_finished -> kết nối của luồng request được xử lý như khi chạy thật
+            response.close()
+            return (time.perf_counter() - started) * 1000
+
+        opened = []
+        connection_created.connect(lambda **kwargs: opened.append(1), weak=False, dispatch_uid='benchmark-calendar')
+        try:
+            for mode in options['modes']:
+                workers = 1 if mode == 'sequential' else max(settings.CALENDAR_QUERY_WORKERS, 2)
+                patch = (
+                    mock.patch.object(views, 'run_in_thread', run_in_thread_closing)
+                    if mode == 'parallel-close' else nullcontext()
+                )
+                with override_settings(CALENDAR_QUERY_WORKERS=workers), patch:
+                    for _ in range(options['warmup']):
+                        call()
+                    opened.clear()
+                    timings = sorted(call() for _ in range(options['requests']))
+                self.stdout.write(
+                    f'{mode:15} p50 {statistics.median(timings):7.2f} ms  '
+                    f'p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms  '
+                    f'kết nối mới/request {len(opened) / options["requests"]:.2f}'
+                )
+        finally:
+            connection_created.disconnect(dispatch_uid='benchmark-calendar')
+            if seeded:
+                loadtest.delete_population()
+        self.stdout.write(
+            f'(DB: {connections["default"].vendor}, CONN_MAX_AGE {connections["default"].settings_dict["CONN_MAX_AGE"]})'
+        )
@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from qlsk.calories import calories_batch, calories_for, exercise_met_batch, implied_met
+
+
+class Command(BaseCommand):
+    help = (
+        'Đo tốc độ tính calo: đường vector hóa NumPy (recompute_calories) so với đường tính '
+        'từng bài tập trong request, trên dữ liệu giả lập (không dùng database). '
+        'Tốc độ backfill thực tế (gồm đọc/ghi DB) do recompute_calories --dry-run in ra.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Số bài tập giả lập cho đường vector hóa')
+        parser.add_argument('--calls', type=int, default=200_000, help='Số lần gọi đường tính từng bài tập')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        rows = options['rows']
+        # Một nửa Exercise không có MET (suy ra từ calo gợi ý), một phần ba có nhịp tim
+        met = np.where(rng.random(rows) < 0.5, rng.uniform(2, 12, rows), np.nan)
+        suggested_calories = rng.integers(20, 400, rows).astype(np.float64)
+        suggested_minutes = rng.integers(5, 60, rows).astype(np.float64)
+        weight = rng.uniform(45, 110, rows)
+        age = rng.integers(16, 70, rows).astype(np.float64)
+        duration = rng.integers(60, 3600, rows).astype(np.float64)
+        heart_rate = np.where(rng.random(rows) < 1 / 3, rng.integers(90, 180, rows), np.nan)
+
+        started = time.perf_counter()
+        calories_batch(
+            exercise_met_batch(met, suggested_calories, suggested_minutes), weight, duration,
+            heart_rate=heart_rate, age=age,
+        )
+        batch_seconds = time.perf_counter() - started
+
+        calls = min(options['calls'], rows)
+        scalar_args = [
+            (
+                float(met[i]) if not np.isnan(met[i]) else implied_met(float(suggested_calories[i]), float(suggested_minutes[i])),
+                float(weight[i]), float(duration[i]),
+                None if np.isnan(heart_rate[i]) else float(heart_rate[i]), float(age[i]),
+            )
+            for i in range(calls)
+        ]
+        started = time.perf_counter()
+        for m, w, d, hr, a in scalar_args:
+            calories_for(m, w, d, heart_rate=hr, age=a)
+        scalar_seconds = time.perf_counter() - started
+
+        self.stdout.write(f'{"NumPy (calories_batch)":28} {rows / batch_seconds:14,.0f} dòng/s ({rows:,} dòng)')
+        self.stdout.write(f'{"Từng bài tập (calories_for)":28} {calls / scalar_seconds:14,.0f} lần/s ({calls:,} lần)')
@@ -0,0 +1,83 @@
+import json
+import statistics
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+from django.test import RequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from qlsk.dbpool.base import get_pool
+from qlsk.models import User
+
+MODES = ['per-request', 'persistent', 'pool']
+
+
+class Command(BaseCommand):
+    help = (
+        'Đo độ trễ request khi mở kết nối DB mới mỗi request, giữ kết nối (CONN_MAX_AGE) '
+        'và dùng pool (qlsk.dbpool). Request đi qua WSGIHandler nên kết nối được đóng/trả '
+        'lại cuối mỗi request như khi chạy thật.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Số request mỗi chế độ')
+        parser.add_argument('--warmup', type=int, default=20, help='Số request chạy trước, không tính')
+        parser.add_argument('--path', default='/api/health-metrics/steps/', help='API được gọi (POST)')
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+
+    def handle(self, *args, **options):
+        original = connections['default']
+        engine = original.settings_dict['ENGINE']
+        base_engine = 'qlsk.mysql' if engine == 'qlsk.dbpool' else engine
+        user = User.objects.create(username='benchmark-db-connections', email='benchmark-db@example.com')
+        token = str(RefreshToken.for_user(user).access_token)
+        handler = WSGIHandler()
+        factory = RequestFactory()
+
+        def call():
+            request = factory.post(
+                options['path'], data=json.dumps({'steps': 1000}), content_type='application/json',
+                HTTP_AUTHORIZATION=f'Bearer {token}',
+            )
+            started = time.perf_counter()
+            response = handler(request.environ, lambda status, headers: None)
+            # close() phát request_finished -> Django đóng hoặc trả kết nối như khi chạy thật
+            response.close()
+            return (time.perf_counter() - started) * 1000
+
+        opened = []
+        connection_created.connect(lambda **kwargs: opened.append(1), weak=False, dispatch_uid='benchmark-db')
+        try:
+            for mode in options['modes']:
+                if mode == 'pool' and original.vendor != 'mysql':
+                    self.stdout.write(f'{mode:12} bỏ qua: pool chỉ hỗ trợ MySQL (đang dùng {base_engine})')
+                    continue
+                settings_dict = dict(original.settings_dict)
+                if mode == 'pool':
+                    settings_dict.update(ENGINE='qlsk.dbpool', CONN_MAX_AGE=0)
+                else:
+                    settings_dict.update(ENGINE=base_engine, CONN_MAX_AGE=0 if mode == 'per-request' else 600)
+                connections['default'].close()
+                connections['default'] = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'default')
+                for _ in range(options['warmup']):
+                    call()
+                opened.clear()
+                pool_opened = get_pool(settings_dict).opened if mode == 'pool' else 0
+                timings = sorted(call() for _ in range(options['requests']))
+                connects = (get_pool(settings_dict).opened - pool_opened) if mode == 'pool' else len(opened)
+                self.stdout.write(
+                    f'{mode:12} p50 {statistics.median(timings):7.2f} ms  '
+                    f'p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms  '
+                    f'mean {statistics.mean(timings):7.2f} ms  kết nối mới {connects}'
+                )
+                connections['default'].close()
+                if mode == 'pool':
+                    get_pool(settings_dict).close_all()
+        finally:
+            connection_created.disconnect(dispatch_uid='benchmark-db')
+            connections['default'] = original
+            user.delete()
@@ -0,0 +1,69 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from qlsk.models import HealthJournal, User
+from qlsk.search import journal_summary
+from qlsk.serializers import HealthJournalSerializer
+from qlsk.views import HealthJournalViewSet
+
+PARAGRAPH = (
+    '<p>Hôm nay tập <strong>chạy bộ</strong> 5km, nhịp tim ổn định, cảm thấy khỏe. '
+    'Ăn sáng đủ chất, uống 2 lít nước, ngủ 7 tiếng.</p>'
+    '<p><img alt="" src="/media/uploads/2025/01/01/anh-tap-luyen.jpg" style="height:480px; width:640px" /></p>'
+)
+
+
+class Command(BaseCommand):
+    help = 'Đo kích thước và thời gian trả về danh sách nhật ký (nội dung đầy đủ so với đoạn trích)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=5000, help='Số nhật ký của tài khoản thử')
+        parser.add_argument('--paragraphs', type=int, default=8, help='Số đoạn HTML mỗi nhật ký')
+        parser.add_argument('--repeat', type=int, default=5, help='Số lần đo mỗi chế độ')
+
+    def handle(self, *args, **options):
+        # Dữ liệu thử được tạo trong transaction và rollback khi đo xong
+        with transaction.atomic():
+            user = User.objects.create(username='benchmark-journal-list', email='benchmark@example.com')
+            content = PARAGRAPH * options['paragraphs']
+            search_text, excerpt, word_count = journal_summary(content)
+            HealthJournal.objects.bulk_create(
+                [
+                    HealthJournal(
+                        user=user, content=content, search_text=search_text,
+                        excerpt=excerpt, word_count=word_count,
+                    )
+                    for _ in range(options['entries'])
+                ],
+                batch_size=1000,
+            )
+
+            def full_list():
+                # Cách cũ: trả về toàn bộ HTML của mọi nhật ký
+                journals = HealthJournal.objects.filter(user=user)
+                return JSONRenderer().render(HealthJournalSerializer(journals, many=True).data)
+
+            factory = APIRequestFactory()
+            view = HealthJournalViewSet.as_view({'get': 'list'})
+
+            def summary_list():
+                request = factory.get('/api/journals/')
+                force_authenticate(request, user=user)
+                return view(request).render().content
+
+            for name, func in [('full', full_list), ('summary', summary_list)]:
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    body = func()
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f'{name:8} {len(body) / 1024:10,.1f} KB  '
+                    f'median {statistics.median(timings):8.1f} ms  min {min(timings):8.1f} ms'
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,118 @@
+import json
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from qlsk import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark tải: tạo dân số giả lập (nếu chưa có) rồi phát lại lưu lượng kiểu app mobile '
+        '(bước chân mỗi phút, nhắc nhở mỗi 2 phút, mở dashboard, tạo thực đơn với LLM giả). '
+        'Kết quả theo từng API (throughput, p50/p95/p99) ghi ra JSON để so sánh giữa các lần chạy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Số user của dân số giả lập')
+        parser.add_argument('--experts', type=int, default=5, help='Số chuyên gia (user chia đều làm client)')
+        parser.add_argument('--days', type=int, default=730, help='Số ngày dữ liệu quá khứ mỗi user')
+        parser.add_argument('--reseed', action='store_true', help='Xóa và tạo lại dân số giả lập')
+        parser.add_argument('--delete', action='store_true', help='Chỉ xóa dân số giả lập rồi thoát')
+        parser.add_argument('--active-users', type=int, default=None, help='Số user gửi request (mặc định: tất cả)')
+        parser.add_argument('--minutes', type=int, default=10, help='Số phút lưu lượng mô phỏng')
+        parser.add_argument('--concurrency', type=int, default=4, help='Số luồng gửi request song song')
+        parser.add_argument('--dashboard-rate', type=float, default=0.1, help='Xác suất mở dashboard mỗi phút mỗi user')
+        parser.add_argument('--meal-plan-rate', type=float, default=0.01, help='Xác suất tạo thực đơn mỗi phút mỗi user')
+        parser.add_argument('--llm-latency', type=float, default=0.5, help='Số giây LLM giả trả lời')
+        parser.add_argument('--seed', type=int, default=0, help='Seed ngẫu nhiên (cùng seed -> cùng dữ liệu và lưu lượng)')
+        parser.add_argument('--output', default='-', help='File JSON kết quả (mặc định in ra stdout)')
+        parser.add_argument('--baseline', help='File JSON của lần chạy trước để so sánh p95')
+
+    def handle(self, *args, **options):
+        if options['delete']:
+            loadtest.delete_population()
+            self.stderr.write('Đã xóa dân số giả lập')
+            return
+
+        if settings.DEBUG:
+            # DEBUG giữ mọi câu SQL trong connection.queries: số đo chậm hơn khi chạy thật
+            self.stderr.write(self.style.WARNING('DEBUG=True: kết quả không đại diện cho production'))
+
+        population = loadtest.population_users().filter(role='user')
+        if options['reseed'] or not population.exists():
+            loadtest.delete_population()
+            self.stderr.write(
+                f'Tạo dân số giả lập: {options["users"]} user, {options["experts"]} chuyên gia, {options["days"]} ngày'
+            )
+            created = loadtest.seed_population(
+                options['users'], options['experts'], options['days'], seed=options['seed'], log=self.stderr.write,
+            )
+            self.stderr.write('Đã tạo: ' + ', '.join(f'{table} {count}' for table, count in created.items()))
+        user_ids = list(population.order_by('id').values_list('id', flat=True))
+        if not user_ids:
+            raise CommandError('Dân số giả lập không có user nào (--users phải lớn hơn 0)')
+        user_ids = user_ids[:options['active_users']]
+
+        events = loadtest.build_traffic(
+            user_ids, options['minutes'], options['dashboard_rate'], options['meal_plan_rate'], seed=options['seed'],
+        )
+        self.stderr.write(
+            f'Phát lại {len(events)} request của {len(user_ids)} user ({options["minutes"]} phút mô phỏng), '
+            f'{options["concurrency"]} luồng'
+        )
+        duration, results = loadtest.run_traffic(
+            events, loadtest.access_tokens(user_ids), options['concurrency'], options['llm_latency'],
+        )
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'engine': connection.settings_dict['ENGINE'],
+                'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                'debug': settings.DEBUG,
+            },
+            'config': {
+                key: options[key] for key in (
+                    'users', 'experts', 'days', 'minutes', 'concurrency', 'dashboard_rate',
+                    'meal_plan_rate', 'llm_latency', 'seed',
+                )
+            } | {'active_users': len(user_ids)},
+            **loadtest.summarize(duration, results),
+        }
+        self.print_table(report, self.load_baseline(options['baseline']))
+
+        data = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output'] == '-':
+            self.stdout.write(data)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(data + '\n')
+            self.stderr.write(f'Đã ghi kết quả vào {options["output"]}')
+
+    def load_baseline(self, path):
+        if not path:
+            return {}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('endpoints', {})
+
+    def print_table(self, report, baseline):
+        # Bảng ghi ra stderr để stdout chỉ có JSON (có thể chuyển tiếp sang file/jq)
+        self.stderr.write(
+            f'\n{report["requests"]} request trong {report["duration_s"]:.1f} s: '
+            f'{report["throughput_rps"]:.1f} req/s, {report["errors"]} lỗi'
+        )
+        self.stderr.write(f'{"API":32} {"số req":>7} {"lỗi":>5} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8}')
+        for endpoint, row in report['endpoints'].items():
+            line = (
+                f'{endpoint:32} {row["requests"]:7} {row["errors"]:5} {row["throughput_rps"]:8.1f} '
+                f'{row["p50_ms"]:8.1f} {row["p95_ms"]:8.1f} {row["p99_ms"]:8.1f}'
+            )
+            if endpoint in baseline:
+                before = baseline[endpoint]['p95_ms']
+                line += f'  p95 {(row["p95_ms"] - before) / before * 100:+.0f}% so với baseline' if before else ''
+            self.stderr.write(line)
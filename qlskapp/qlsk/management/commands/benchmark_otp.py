@@ -0,0 +1,84 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from qlsk.models import PasswordResetOTP
+from qlsk.otp import consume_otp, create_otp, hash_otp, purge_otps
+
+# Email của dữ liệu thử, dùng để dọn sau khi đo
+BENCHMARK_DOMAIN = 'benchmark-otp.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        'Đo tra cứu OTP (consume_otp) trên bảng PasswordResetOTP lớn và tốc độ purge_expired_otps. '
+        'Dữ liệu thử được chèn theo lô (commit từng lô) và bị xóa khi đo xong; bước purge cũng xóa '
+        'các OTP hết hạn thật như cron purge_expired_otps.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Số OTP cũ (đã hết hạn/đã dùng) chèn vào bảng')
+        parser.add_argument('--emails', type=int, default=100_000, help='Số email khác nhau của dữ liệu thử')
+        parser.add_argument('--lookups', type=int, default=1000, help='Số lần consume_otp được đo')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Số dòng mỗi lô khi chèn và khi purge')
+
+    def handle(self, *args, **options):
+        try:
+            self.seed(options['rows'], options['emails'], options['batch_size'])
+            self.measure_lookups(options['lookups'], options['emails'])
+            self.measure_purge(options['batch_size'])
+        finally:
+            PasswordResetOTP.objects.filter(email__endswith='@' + BENCHMARK_DOMAIN).delete()
+
+    def email(self, i):
+        return f'user{i}@{BENCHMARK_DOMAIN}'
+
+    def seed(self, rows, emails, batch_size):
+        now = timezone.now()
+        started = time.perf_counter()
+        for start in range(0, rows, batch_size):
+            PasswordResetOTP.objects.bulk_create([
+                PasswordResetOTP(
+                    email=self.email(i % emails),
+                    otp_hash=hash_otp(self.email(i % emails), f'{i % 1000000:06d}'),
+                    expires_at=now - timedelta(days=1 + i % 30),
+                    is_used=i % 2 == 0,
+                )
+                for i in range(start, min(start + batch_size, rows))
+            ])
+        self.stdout.write(f'Chèn {rows:,} OTP cũ trong {time.perf_counter() - started:.1f} s')
+
+    def measure_lookups(self, lookups, emails):
+        plan = PasswordResetOTP.objects.filter(
+            email=self.email(0), otp_hash=hash_otp(self.email(0), '000000'), is_used=False,
+            expires_at__gt=timezone.now(),
+        ).explain()
+        self.stdout.write(f'Kế hoạch truy vấn ({connection.vendor}):\n{plan}')
+
+        hits, misses = [], []
+        for i in range(lookups):
+            email = self.email((i * 7919) % emails)
+            otp = create_otp(email)
+            # Mã sai (dò mã) rồi mã đúng
+            for code, timings in (('999999' if otp != '999999' else '000000', misses), (otp, hits)):
+                started = time.perf_counter()
+                consume_otp(email, code)
+                timings.append((time.perf_counter() - started) * 1000)
+        for name, timings in (('mã sai', misses), ('mã đúng', hits)):
+            timings.sort()
+            self.stdout.write(
+                f'consume_otp {name:8} p50 {statistics.median(timings):7.2f} ms  '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms  max {timings[-1]:7.2f} ms'
+            )
+
+    def measure_purge(self, batch_size):
+        started = time.perf_counter()
+        deleted = purge_otps(batch_size=batch_size, grace_minutes=0)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'purge_otps: xóa {deleted:,} dòng trong {elapsed:.1f} s ({deleted / max(elapsed, 1e-9):,.0f} dòng/s)'
+        )
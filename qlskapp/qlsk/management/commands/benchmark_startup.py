@@ -0,0 +1,60 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Khởi động WSGI như worker gunicorn/uwsgi rồi nạp URLconf như request đầu tiên (import views)
+WSGI_COLD_START = (
+    'from qlskapp.wsgi import application\n'
+    'from django.urls import get_resolver\n'
+    'get_resolver().url_patterns\n'
+)
+IMPORT_TIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|\s+(\S+)$')
+
+
+class Command(BaseCommand):
+    help = 'Đo thời gian khởi động: manage.py check và WSGI cold start (mỗi lần một tiến trình Python mới)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Số lần đo mỗi mục')
+        parser.add_argument('--top', type=int, default=15, help='Số module import chậm nhất cần liệt kê (0: không liệt kê)')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'qlskapp.settings')}
+        cwd = str(settings.BASE_DIR)
+        targets = [
+            ('manage.py check', [sys.executable, 'manage.py', 'check']),
+            ('wsgi cold start', [sys.executable, '-c', WSGI_COLD_START]),
+        ]
+        for name, command in targets:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                subprocess.run(command, cwd=cwd, env=env, check=True, capture_output=True)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{name:16} median {statistics.median(timings):8.1f} ms  min {min(timings):8.1f} ms'
+            )
+        if options['top']:
+            self.stdout.write('\nPackage import chậm nhất khi WSGI cold start:')
+            for micros, package in self.slowest_imports(cwd, env, options['top']):
+                self.stdout.write(f'{micros / 1000:8.1f} ms  {package}')
+
+    def slowest_imports(self, cwd, env, top):
+        """Cộng thời gian import (self) theo package cấp cao nhất: django, openai, numpy, qlsk..."""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WSGI_COLD_START],
+            cwd=cwd, env=env, check=True, capture_output=True, text=True,
+        )
+        totals = {}
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME_RE.match(line)
+            if match:
+                package = match.group(3).split('.')[0]
+                totals[package] = totals.get(package, 0) + int(match.group(1))
+        return sorted(((micros, package) for package, micros in totals.items()), reverse=True)[:top]
@@ -0,0 +1,66 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from qlsk.metrics import collect_stats
+from qlsk.models import User
+from qlsk.serializers import UserSerializer
+from qlsk.views import UserViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Đo kích thước, số câu SQL và thời gian của GET /api/users/: toàn bộ hồ sơ như trước '
+        '(UserSerializer, COUNT khách hàng cho từng user) so với danh sách gọn và ?fields=profile'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Số user thử')
+        parser.add_argument('--experts', type=int, default=100, help='Số chuyên gia trong số user thử')
+        parser.add_argument('--repeat', type=int, default=5, help='Số lần đo mỗi chế độ')
+
+    def handle(self, *args, **options):
+        # Dữ liệu thử được tạo trong transaction và rollback khi đo xong
+        with transaction.atomic():
+            experts = User.objects.bulk_create([
+                User(username=f'benchmark-expert-{i}', email=f'expert{i}@example.com', role='expert',
+                     height=170, weight=65, age=35)
+                for i in range(options['experts'])
+            ])
+            User.objects.bulk_create(
+                [
+                    User(username=f'benchmark-user-{i}', email=f'user{i}@example.com', role='user',
+                         height=165, weight=60, age=30, bmi=22.0, health_goal='maintain',
+                         expert=experts[i % len(experts)] if experts else None)
+                    for i in range(options['users'] - options['experts'])
+                ],
+                batch_size=1000,
+            )
+
+            def full_list():
+                # Cách cũ: mọi trường của mọi user, num_clients đếm bằng một query cho mỗi user
+                return JSONRenderer().render(UserSerializer(User.objects.all(), many=True).data)
+
+            factory = APIRequestFactory()
+            view = UserViewSet.as_view({'get': 'list'})
+
+            def api_list(query=''):
+                return lambda: view(factory.get('/api/users/' + query)).render().content
+
+            modes = [('full', full_list), ('lean', api_list()), ('profile', api_list('?fields=profile'))]
+            for name, func in modes:
+                timings = []
+                for _ in range(options['repeat']):
+                    with collect_stats() as stats:
+                        started = time.perf_counter()
+                        body = func()
+                        timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f'{name:8} {len(body) / 1024:10,.1f} KB  {stats.sql_count:6} SQL  '
+                    f'median {statistics.median(timings):8.1f} ms  min {min(timings):8.1f} ms'
+                )
+            transaction.set_rollback(True)
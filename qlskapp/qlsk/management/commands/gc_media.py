@@ -0,0 +1,31 @@
+import time
+
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand
+
+from qlsk.storage import ContentAddressedStorage, collect_cas_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        'Xóa ảnh trong cas/ (ContentAddressedStorage) không còn đối tượng nào tham chiếu, '
+        'ví dụ ảnh cũ sau khi đổi ảnh hoặc xóa bài tập (chạy định kỳ bằng cron)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age-hours', type=float, default=24,
+            help='Chỉ xóa file không đổi trong số giờ này (tránh xóa ảnh worker vừa lưu)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ đếm, không xóa')
+
+    def handle(self, *args, **options):
+        storage = storages['media']
+        if not isinstance(storage, ContentAddressedStorage):
+            self.stdout.write('Media storage không phải ContentAddressedStorage, không có gì để dọn')
+            return
+        deleted, size = collect_cas_garbage(
+            storage, time.time() - options['min_age_hours'] * 3600, dry_run=options['dry_run'],
+        )
+        action = 'Sẽ xóa' if options['dry_run'] else 'Đã xóa'
+        self.stdout.write(f'{action} {deleted} file không còn được dùng ({size / 1024 / 1024:.1f} MB)')
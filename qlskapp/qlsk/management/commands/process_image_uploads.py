@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from qlsk.uploads import MAX_ATTEMPTS, process_pending_uploads
+
+
+class Command(BaseCommand):
+    help = 'Xử lý hàng đợi ảnh upload (WebP, thumbnail, lưu vào media storage)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Số ảnh xử lý song song mỗi lô')
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS, help='Số lần thử trước khi đánh dấu failed')
+        parser.add_argument('--loop', action='store_true', help='Chạy liên tục như một worker')
+        parser.add_argument('--interval', type=float, default=2.0, help='Số giây nghỉ khi hàng đợi rỗng (với --loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            done, failed = process_pending_uploads(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+            )
+            if done or failed:
+                self.stdout.write(f'Đã xử lý {done} ảnh, lỗi {failed} ảnh')
+            if not options['loop']:
+                break
+            if done + failed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from qlsk.emails import redact_sensitive_emails
+from qlsk.otp import purge_otps
+
+
+class Command(BaseCommand):
+    help = 'Xóa các OTP đặt lại mật khẩu đã hết hạn và nội dung email OTP trong hàng đợi (chạy định kỳ bằng cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Số dòng xóa mỗi lần')
+        parser.add_argument('--grace-minutes', type=int, default=60, help='Chỉ xóa OTP đã hết hạn quá số phút này')
+
+    def handle(self, *args, **options):
+        deleted = purge_otps(batch_size=options['batch_size'], grace_minutes=options['grace_minutes'])
+        self.stdout.write(f'Đã xóa {deleted} OTP hết hạn')
+        # Mã OTP dạng rõ chỉ còn trong body email: xóa khi mã đã hết hạn
+        redacted = redact_sensitive_emails(timezone.now() - timedelta(minutes=settings.OTP_EXPIRY_MINUTES))
+        self.stdout.write(f'Đã xóa nội dung {redacted} email OTP')
@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from qlsk.calories import calories_batch, exercise_met_batch, session_calories_sum
+from qlsk.models import WorkoutExercise, WorkoutSession
+
+
+class Command(BaseCommand):
+    help = 'Tính lại calo của các WorkoutExercise đã lưu theo MET/nhịp tim (backfill)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Số dòng đọc/ghi mỗi lô')
+        parser.add_argument('--user-id', type=int, help='Chỉ tính lại cho một user')
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ tính, không ghi database')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = WorkoutExercise.objects.filter(duration__gt=0).order_by('id')
+        if options['user_id']:
+            queryset = queryset.filter(workout_session__user_id=options['user_id'])
+
+        started = time.perf_counter()
+        compute_seconds = 0
+        processed = changed = 0
+        session_ids = set()
+        last_id = 0
+        while True:
+            rows = list(queryset.filter(id__gt=last_id).values_list(
+                'id', 'workout_session_id', 'duration', 'heart_rate', 'calories_burned',
+                'exercise__met', 'exercise__calories_burned', 'exercise__duration',
+                'workout_session__user__weight', 'workout_session__user__age',
+            )[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            processed += len(rows)
+
+            compute_started = time.perf_counter()
+            # None -> NaN để xử lý vector hóa
+            data = np.array(rows, dtype=np.float64)
+            ids, sessions, duration, heart_rate, old_calories = data[:, 0], data[:, 1], data[:, 2], data[:, 3], data[:, 4]
+            met = exercise_met_batch(data[:, 5], data[:, 6], data[:, 7])
+            weight, age = data[:, 8], data[:, 9]
+            new_calories = calories_batch(met, weight, duration, heart_rate=heart_rate, age=age)
+            mask = (new_calories >= 0) & (new_calories != old_calories)
+            compute_seconds += time.perf_counter() - compute_started
+
+            if not mask.any():
+                continue
+            changed += int(mask.sum())
+            session_ids.update(sessions[mask].astype(np.int64).tolist())
+            if options['dry_run']:
+                continue
+            updates = [
+                WorkoutExercise(id=int(row_id), calories_burned=int(calories))
+                for row_id, calories in zip(ids[mask], new_calories[mask])
+            ]
+            with transaction.atomic():
+                WorkoutExercise.objects.bulk_update(updates, ['calories_burned'], batch_size=1000)
+
+        if not options['dry_run']:
+            # Đối soát lại tổng calo của các buổi tập bị thay đổi
+            session_ids = sorted(session_ids)
+            for i in range(0, len(session_ids), batch_size):
+                WorkoutSession.objects.filter(id__in=session_ids[i:i + batch_size]).update(
+                    total_calories=session_calories_sum()
+                )
+
+        total_seconds = time.perf_counter() - started
+        self.stdout.write(
+            f'Đã xử lý {processed} dòng, thay đổi {changed} dòng, {len(session_ids)} buổi tập '
+            f'trong {total_seconds:.2f}s'
+        )
+        if processed and compute_seconds:
+            self.stdout.write(
+                f'Tốc độ tính (NumPy): {processed / compute_seconds:,.0f} dòng/s, '
+                f'toàn bộ: {processed / total_seconds:,.0f} dòng/s'
+            )
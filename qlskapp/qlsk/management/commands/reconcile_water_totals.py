@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from qlsk.water import find_water_mismatches, fix_water_mismatches
+
+
+class Command(BaseCommand):
+    help = 'Kiểm tra (và sửa) tổng nước theo ngày trong HealthMetricsHistory so với các WaterSession'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Chỉ kiểm tra số ngày gần nhất (0 = tất cả)')
+        parser.add_argument('--user-id', type=int, help='Chỉ kiểm tra một user')
+        parser.add_argument('--fix', action='store_true', help='Sửa các dòng bị lệch mà không hạ tổng đã lưu')
+
+    def handle(self, *args, **options):
+        start_date = None
+        if options['days']:
+            start_date = timezone.now().date() - timedelta(days=options['days'] - 1)
+        mismatches = find_water_mismatches(start_date=start_date, user_id=options['user_id'])
+        for user_id, day, current, total in mismatches:
+            self.stdout.write(f'user={user_id} date={day}: đang lưu {current}, tổng WaterSession {total}')
+        if options['fix'] and mismatches:
+            raised, backfilled = fix_water_mismatches(mismatches)
+            self.stdout.write(f'Đã nâng tổng {raised} dòng, thêm {backfilled} WaterSession bù cho dữ liệu cũ')
+        else:
+            self.stdout.write(f'Có {len(mismatches)} dòng bị lệch')
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from qlsk.emails import MAX_ATTEMPTS, send_pending_emails
+
+
+class Command(BaseCommand):
+    help = 'Gửi các email trong hàng đợi EmailOutbox (OTP, thông báo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Số email gửi qua một kết nối SMTP')
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS, help='Số lần thử trước khi đánh dấu failed')
+        parser.add_argument('--loop', action='store_true', help='Chạy liên tục như một worker')
+        parser.add_argument('--interval', type=float, default=2.0, help='Số giây nghỉ khi hàng đợi rỗng (với --loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_pending_emails(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+            )
+            if sent or failed:
+                self.stdout.write(f'Đã gửi {sent} email, lỗi {failed} email')
+            if not options['loop']:
+                break
+            # Còn email đến hạn thì gửi tiếp ngay, không thì nghỉ
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,140 @@
+"""
+Phục vụ file trong MEDIA_ROOT (ảnh ContentAddressedStorage, file ckeditor, ảnh local cũ)
+với ETag/Last-Modified (304) và HTTP Range (206) để app tải ảnh nhanh, kể cả khi offline
+với Cloudinary.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import cas_digest
+
+RANGE_RE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    """Khoảng bytes đúng cú pháp nhưng nằm ngoài file (416)"""
+
+
+def parse_range(header, size):
+    """
+    (start, end) của một khoảng bytes=start-end. None nếu header sai cú pháp hoặc không
+    hỗ trợ (nhiều khoảng): bỏ qua Range và trả về cả file (RFC 9110). Khoảng nằm ngoài
+    file thì raise RangeNotSatisfiable.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.group('start'), match.group('end')
+    if start:
+        start = int(start)
+        if end and int(end) < start:
+            # bytes=500-100 là sai cú pháp, không phải khoảng ngoài file
+            return None
+        if start >= size:
+            raise RangeNotSatisfiable
+        end = min(int(end), size - 1) if end else size - 1
+    elif end:
+        # bytes=-500: 500 byte cuối
+        if int(end) == 0 or size == 0:
+            raise RangeNotSatisfiable
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        return None
+    return start, end
+
+
+def _range_file(f, length):
+    remaining = length
+    try:
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _is_pending_upload(full_path):
+    """
+    File ảnh gốc chờ xử lý: trong IMAGE_UPLOAD_PENDING_DIR (có thể bị cấu hình nằm trong
+    MEDIA_ROOT) hoặc MEDIA_ROOT/pending/ (vị trí mặc định cũ, có thể còn file chưa xử lý)
+    """
+    full_path = os.path.realpath(full_path)
+    for directory in (settings.IMAGE_UPLOAD_PENDING_DIR, os.path.join(settings.MEDIA_ROOT, 'pending')):
+        directory = os.path.realpath(directory)
+        if os.path.commonpath([full_path, directory]) == directory:
+            return True
+    return False
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(full_path) or _is_pending_upload(full_path):
+        raise Http404
+
+    digest = cas_digest(path)
+    # File cas/ có nội dung cố định theo tên: ETag là sha256, cache vĩnh viễn
+    etag = f'"{digest}"' if digest else f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    cache_control = 'public, max-age=31536000, immutable' if digest else 'public, max-age=3600'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type, encoding = mimetypes.guess_type(full_path)
+        content_type = content_type or 'application/octet-stream'
+        byte_range = None
+        range_header = request.headers.get('Range')
+        if range_header and _if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(range_header, stat.st_size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+        if response is None and byte_range:
+            start, end = byte_range
+            f = open(full_path, 'rb')
+            f.seek(start)
+            response = FileResponse(_range_file(f, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(end - start + 1)
+        elif response is None:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+            response['Content-Length'] = str(stat.st_size)
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _if_range_matches(request, etag, last_modified):
+    """If-Range: chỉ trả về một phần khi file chưa đổi so với bản client đang có"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and last_modified <= since
@@ -0,0 +1,347 @@
+"""
+Đo hiệu năng theo request, gom theo tên URL (resolver_match.view_name):
+thời gian xử lý, số câu SQL và thời gian SQL (connection.execute_wrapper),
+cache hit/miss (InstrumentedCache) và thời gian gọi HTTP ra ngoài (track_http).
+
+- /metrics trả về số liệu dạng text của Prometheus (số liệu của từng tiến trình).
+- Request chậm hơn SLOW_REQUEST_MS được ghi log kèm các câu SQL đã gom theo dạng (fingerprint).
+"""
+import hmac
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('qlsk.performance')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Giữ tối đa bấy nhiêu câu SQL mỗi request để in khi request chậm
+MAX_RECORDED_QUERIES = 1000
+
+_current = ContextVar('qlsk_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        # Các luồng phụ (calendar) ghi chung vào một RequestStats
+        self._lock = threading.Lock()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.queries = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.http_count = Counter()
+        self.http_time = Counter()
+
+    def add_query(self, sql, duration):
+        with self._lock:
+            self.sql_count += 1
+            self.sql_time += duration
+            if len(self.queries) < MAX_RECORDED_QUERIES:
+                self.queries.append((sql, duration))
+
+    def add_cache(self, hits, misses):
+        with self._lock:
+            self.cache_hits += hits
+            self.cache_misses += misses
+
+    def add_http(self, service, duration):
+        with self._lock:
+            self.http_count[service] += 1
+            self.http_time[service] += duration
+
+
+class Registry:
+    """Số liệu cộng dồn trong tiến trình, theo nhãn"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        # (route,) -> [số lần theo bucket..., tổng, số lượng]
+        self.histograms = {}
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self.counters[(name, labels)] += value
+
+    def observe(self, labels, seconds):
+        with self._lock:
+            histogram = self.histograms.setdefault(labels, [0] * len(DURATION_BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters), {k: list(v) for k, v in self.histograms.items()}
+
+
+registry = Registry()
+
+COUNTERS = {
+    'qlsk_http_requests_total': ('counter', 'Số request theo route, method, status'),
+    'qlsk_db_queries_total': ('counter', 'Số câu SQL theo route'),
+    'qlsk_db_query_duration_seconds_total': ('counter', 'Tổng thời gian SQL theo route'),
+    'qlsk_cache_hits_total': ('counter', 'Số lần đọc cache trúng theo route'),
+    'qlsk_cache_misses_total': ('counter', 'Số lần đọc cache trượt theo route'),
+    'qlsk_outbound_http_requests_total': ('counter', 'Số lần gọi HTTP ra ngoài theo route, dịch vụ'),
+    'qlsk_outbound_http_duration_seconds_total': ('counter', 'Tổng thời gian gọi HTTP ra ngoài theo route, dịch vụ'),
+}
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - started)
+
+
+@contextmanager
+def instrument_queries():
+    """Đếm SQL trên mọi database của luồng hiện tại (gọi lại trong luồng phụ)"""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(_record_query))
+        yield
+
+
+@contextmanager
+def collect_stats():
+    """
+    Đo SQL/cache/HTTP của một đoạn code ngoài request (benchmark, lệnh quản trị).
+    Không phụ thuộc DEBUG hay giới hạn 9000 câu của connection.queries_log.
+    """
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        with instrument_queries():
+            yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def track_http(service):
+    """Bao quanh một lần gọi HTTP ra ngoài (Google, Facebook, OpenAI...)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None:
+            stats.add_http(service, duration)
+        else:
+            # Gọi ngoài request (luồng nền)
+            registry.inc('qlsk_outbound_http_requests_total', (('route', '<background>'), ('service', service)))
+            registry.inc('qlsk_outbound_http_duration_seconds_total', (('route', '<background>'), ('service', service)), duration)
+
+
+_MISSING = object()
+
+
+class InstrumentedCache(BaseCache):
+    """
+    Bọc cache backend thật (OPTIONS['BACKEND']) để đếm hit/miss của request hiện tại.
+    Các thao tác khác chuyển thẳng cho backend thật.
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        backend = options.pop('BACKEND')
+        params = {**params, 'OPTIONS': options}
+        super().__init__(params)
+        self._cache = import_string(backend)(location, params)
+
+    @staticmethod
+    def _record(hits, misses):
+        stats = _current.get()
+        if stats is not None:
+            stats.add_cache(hits, misses)
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._record(0, 1)
+            return default
+        self._record(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self._cache.get_many(keys, version=version)
+        self._record(len(values), len(keys) - len(values))
+        return values
+
+    def has_key(self, key, version=None):
+        return self._cache.has_key(key, version=version)
+
+    def add(self, *args, **kwargs):
+        return self._cache.add(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        return self._cache.set(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        return self._cache.set_many(*args, **kwargs)
+
+    def touch(self, *args, **kwargs):
+        return self._cache.touch(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._cache.delete(*args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        return self._cache.delete_many(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        return self._cache.incr(*args, **kwargs)
+
+    def decr(self, *args, **kwargs):
+        return self._cache.decr(*args, **kwargs)
+
+    def clear(self):
+        return self._cache.clear()
+
+    def close(self, **kwargs):
+        return self._cache.close(**kwargs)
+
+
+_NUMBER_RE = re.compile(r'\b\d+(\.\d+)?\b')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST_RE = re.compile(r'\(\s*(%s|\?)(\s*,\s*(%s|\?))+\s*\)')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def query_fingerprint(sql):
+    """Dạng chung của câu SQL: bỏ giá trị cụ thể, gộp IN (%s, %s, ...) để các câu giống nhau gom lại"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACES_RE.sub(' ', sql).strip()
+
+
+def top_fingerprints(queries, limit=5):
+    grouped = {}
+    for sql, duration in queries:
+        fingerprint = query_fingerprint(sql)
+        count, total = grouped.get(fingerprint, (0, 0.0))
+        grouped[fingerprint] = (count + 1, total + duration)
+    ranked = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    return [
+        {'fingerprint': fingerprint, 'count': count, 'ms': round(total * 1000, 2)}
+        for fingerprint, (count, total) in ranked
+    ]
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    # view_name: tên URL (kèm namespace), route không đặt tên thì là đường dẫn của view
+    return match.view_name if match is not None else '<unmatched>'
+
+
+class RequestMetricsMiddleware:
+    """Đặt đầu MIDDLEWARE để đo toàn bộ thời gian xử lý request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with instrument_queries():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+        self.record(request, response, stats, duration)
+        return response
+
+    def record(self, request, response, stats, duration):
+        route = route_name(request)
+        labels = (('route', route),)
+        registry.inc('qlsk_http_requests_total', labels + (('method', request.method), ('status', str(response.status_code))))
+        registry.observe(labels, duration)
+        registry.inc('qlsk_db_queries_total', labels, stats.sql_count)
+        registry.inc('qlsk_db_query_duration_seconds_total', labels, stats.sql_time)
+        registry.inc('qlsk_cache_hits_total', labels, stats.cache_hits)
+        registry.inc('qlsk_cache_misses_total', labels, stats.cache_misses)
+        for service, count in stats.http_count.items():
+            service_labels = labels + (('service', service),)
+            registry.inc('qlsk_outbound_http_requests_total', service_labels, count)
+            registry.inc('qlsk_outbound_http_duration_seconds_total', service_labels, stats.http_time[service])
+
+        if duration * 1000 >= settings.SLOW_REQUEST_MS:
+            logger.warning('slow request', extra={
+                'route': route,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 1),
+                'sql_count': stats.sql_count,
+                'sql_ms': round(stats.sql_time * 1000, 1),
+                'cache_hits': stats.cache_hits,
+                'cache_misses': stats.cache_misses,
+                'http_ms': round(sum(stats.http_time.values()) * 1000, 1),
+                'top_queries': top_fingerprints(stats.queries),
+            })
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def render_metrics():
+    counters, histograms = registry.snapshot()
+    lines = []
+    for name, (kind, help_text) in COUNTERS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_format_labels(labels)} {value:g}')
+    name = 'qlsk_http_request_duration_seconds'
+    lines.append(f'# HELP {name} Thời gian xử lý request theo route')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, histogram in sorted(histograms.items()):
+        for bound, count in zip(DURATION_BUCKETS, histogram):
+            lines.append(f'{name}_bucket{_format_labels(labels + (("le", f"{bound:g}"),))} {count}')
+        lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {histogram[-1]}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {histogram[-2]:g}')
+        lines.append(f'{name}_count{_format_labels(labels)} {histogram[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    # Chỉ Prometheus (Authorization: Bearer <METRICS_TOKEN>) đọc được; chưa đặt token thì
+    # chỉ mở khi DEBUG (prod.py bắt buộc đặt token)
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def delete_plaintext_otps(apps, schema_editor):
+    # OTP cũ lưu mã dạng rõ và không thể xác nhận theo bản băm nữa
+    apps.get_model('qlsk', 'PasswordResetOTP').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0030_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_plaintext_otps, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='passwordresetotp',
+            name='otp',
+        ),
+        migrations.AddField(
+            model_name='passwordresetotp',
+            name='expires_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='passwordresetotp',
+            name='otp_hash',
+            field=models.CharField(default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='passwordresetotp',
+            index=models.Index(fields=['email', 'otp_hash', 'is_used', 'expires_at'], name='qlsk_passwo_email_87ccc1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passwordresetotp',
+            index=models.Index(fields=['expires_at'], name='qlsk_passwo_expires_cbfe2f_idx'),
+        ),
+    ]
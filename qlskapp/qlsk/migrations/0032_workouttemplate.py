@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0031_passwordresetotp_hash_expiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('exercise_count', models.IntegerField(default=0)),
+                ('total_duration', models.IntegerField(default=0)),
+                ('base_calories', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workout_templates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkoutTemplateExercise',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.IntegerField(default=0)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='qlsk.exercise')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='qlsk.workouttemplate')),
+            ],
+            options={
+                'ordering': ['order', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0032_workouttemplate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='met',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workoutexercise',
+            name='heart_rate',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
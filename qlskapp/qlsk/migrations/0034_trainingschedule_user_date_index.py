@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0033_exercise_met_workoutexercise_heart_rate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trainingschedule',
+            index=models.Index(fields=['user', 'date'], name='qlsk_traini_user_id_3b452b_idx'),
+        ),
+    ]
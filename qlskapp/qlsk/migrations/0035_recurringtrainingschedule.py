@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0034_trainingschedule_user_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringTrainingSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('time', models.TimeField()),
+                ('weekdays', models.PositiveSmallIntegerField(help_text='Bitmask các thứ trong tuần, bit 0 = Thứ 2 ... bit 6 = Chủ nhật')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_training_schedules', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='trainingschedule',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='schedules', to='qlsk.recurringtrainingschedule'),
+        ),
+        migrations.AddConstraint(
+            model_name='trainingschedule',
+            constraint=models.UniqueConstraint(fields=('recurrence', 'date'), name='unique_recurrence_date'),
+        ),
+    ]
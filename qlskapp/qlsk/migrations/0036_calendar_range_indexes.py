@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0035_recurringtrainingschedule'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='healthmetricshistory',
+            index=models.Index(fields=['user', 'date'], name='qlsk_health_user_id_79c32d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watersession',
+            index=models.Index(fields=['user', 'date'], name='qlsk_waters_user_id_770b20_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutsession',
+            index=models.Index(fields=['user', 'start_time'], name='qlsk_workou_user_id_3b48dd_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:16
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_days(apps, schema_editor):
+    # Gộp các dòng trùng (user, date) trước khi thêm ràng buộc unique
+    HealthMetricsHistory = apps.get_model('qlsk', 'HealthMetricsHistory')
+    duplicates = (
+        HealthMetricsHistory.objects.values('user_id', 'date')
+        .annotate(n=Count('id')).filter(n__gt=1)
+    )
+    for row in duplicates:
+        rows = list(
+            HealthMetricsHistory.objects.filter(user_id=row['user_id'], date=row['date']).order_by('-time', '-id')
+        )
+        keep = rows[0]
+        keep.water_intake = max(r.water_intake for r in rows)
+        keep.steps = max(r.steps for r in rows)
+        keep.heart_rate = next((r.heart_rate for r in rows if r.heart_rate is not None), None)
+        keep.save(update_fields=['water_intake', 'steps', 'heart_rate'])
+        HealthMetricsHistory.objects.filter(id__in=[r.id for r in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0036_calendar_range_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_days, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='healthmetricshistory',
+            name='qlsk_health_user_id_79c32d_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='healthmetricshistory',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_health_metrics_user_date'),
+        ),
+    ]
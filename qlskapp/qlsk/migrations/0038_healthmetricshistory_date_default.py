@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:18
+
+import qlsk.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0037_healthmetrics_unique_user_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='healthmetricshistory',
+            name='date',
+            field=models.DateField(default=qlsk.models.today),
+        ),
+    ]
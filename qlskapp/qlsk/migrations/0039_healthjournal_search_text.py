@@ -0,0 +1,94 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:24
+
+import html
+import re
+import unicodedata
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# Bản sao cố định của qlsk.search tại thời điểm migration: migration không import code ứng dụng
+FTS_TABLE = 'qlsk_healthjournal_fts'
+MYSQL_INDEX = 'qlsk_healthjournal_search_ft'
+BATCH_SIZE = 500
+
+_whitespace = re.compile(r'\s+')
+_block_tag = re.compile(r'</?(p|div|br|li|h[1-6]|tr|td|blockquote)\b[^>]*>', re.IGNORECASE)
+
+
+def fold_char(char):
+    if char in 'đĐ':
+        return 'd'
+    base = unicodedata.normalize('NFD', char)[0].lower()
+    return base if len(base) == 1 else char
+
+
+def to_search_text(content):
+    text = strip_tags(_block_tag.sub(' ', content or ''))
+    text = _whitespace.sub(' ', html.unescape(text)).strip()
+    return ''.join(fold_char(char) for char in text)
+
+
+def fill_search_text(apps, schema_editor):
+    # Duyệt theo từng lô id tăng dần, không nạp toàn bộ nhật ký vào bộ nhớ
+    HealthJournal = apps.get_model('qlsk', 'HealthJournal')
+    last_id = 0
+    while True:
+        journals = list(
+            HealthJournal.objects.filter(id__gt=last_id).only('id', 'content').order_by('id')[:BATCH_SIZE]
+        )
+        if not journals:
+            break
+        for journal in journals:
+            journal.search_text = to_search_text(journal.content)
+        HealthJournal.objects.bulk_update(journals, ['search_text'])
+        last_id = journals[-1].id
+
+
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"search_text, content='qlsk_healthjournal', content_rowid='id')",
+    f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON qlsk_healthjournal BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON qlsk_healthjournal BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+    f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON qlsk_healthjournal BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+MYSQL_CREATE = [f'ALTER TABLE qlsk_healthjournal ADD FULLTEXT INDEX {MYSQL_INDEX} (search_text)']
+MYSQL_DROP = [f'ALTER TABLE qlsk_healthjournal DROP INDEX {MYSQL_INDEX}']
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0038_healthmetricshistory_date_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healthjournal',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(
+            run_for_vendor({'mysql': MYSQL_CREATE, 'sqlite': SQLITE_CREATE}),
+            run_for_vendor({'mysql': MYSQL_DROP, 'sqlite': SQLITE_DROP}),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:28
+
+import html
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# Bản sao cố định của qlsk.search tại thời điểm migration: migration không import code ứng dụng
+FTS_TABLE = 'qlsk_healthjournal_fts'
+EXCERPT_LENGTH = 200
+BATCH_SIZE = 500
+
+_whitespace = re.compile(r'\s+')
+_block_tag = re.compile(r'</?(p|div|br|li|h[1-6]|tr|td|blockquote)\b[^>]*>', re.IGNORECASE)
+
+
+def html_to_text(content):
+    text = strip_tags(_block_tag.sub(' ', content or ''))
+    return _whitespace.sub(' ', html.unescape(text)).strip()
+
+
+def truncate_words(text, length):
+    if len(text) <= length:
+        return text
+    cut = text.rfind(' ', 0, length)
+    return text[:cut if cut > 0 else length].rstrip() + '…'
+
+
+def fill_summary(apps, schema_editor):
+    # Duyệt theo từng lô id tăng dần, không nạp toàn bộ nhật ký vào bộ nhớ
+    HealthJournal = apps.get_model('qlsk', 'HealthJournal')
+    last_id = 0
+    while True:
+        journals = list(
+            HealthJournal.objects.filter(id__gt=last_id).only('id', 'content').order_by('id')[:BATCH_SIZE]
+        )
+        if not journals:
+            break
+        for journal in journals:
+            text = html_to_text(journal.content)
+            journal.excerpt = truncate_words(text, EXCERPT_LENGTH)
+            journal.word_count = len(text.split())
+        HealthJournal.objects.bulk_update(journals, ['excerpt', 'word_count'])
+        last_id = journals[-1].id
+
+
+# SQLite tạo lại bảng khi thêm cột NOT NULL nên mất các trigger đồng bộ FTS5;
+# bỏ chỉ mục trước và tạo lại sau khi thêm cột (MySQL không cần)
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"search_text, content='qlsk_healthjournal', content_rowid='id')",
+    f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON qlsk_healthjournal BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON qlsk_healthjournal BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+    f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON qlsk_healthjournal BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for sql in statements:
+                schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0039_healthjournal_search_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(SQLITE_DROP), run_on_sqlite(SQLITE_CREATE)),
+        migrations.AddField(
+            model_name='healthjournal',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='healthjournal',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_summary, migrations.RunPython.noop),
+        migrations.RunPython(run_on_sqlite(SQLITE_CREATE), run_on_sqlite(SQLITE_DROP)),
+    ]
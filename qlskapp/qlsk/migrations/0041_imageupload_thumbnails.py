@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0040_healthjournal_excerpt_word_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='thumbnails/exercises/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='trainingsession',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='thumbnails/training_sessions/%Y/%m/'),
+        ),
+        migrations.CreateModel(
+            name='ImageUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('field_name', models.CharField(max_length=50)),
+                ('path', models.CharField(max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='qlsk_imageu_status_1f3bfc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:26
+
+import qlsk.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0041_imageupload_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exercise',
+            name='image',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=qlsk.storage.media_storage, upload_to='exercises/'),
+        ),
+        migrations.AlterField(
+            model_name='exercise',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, max_length=255, null=True, storage=qlsk.storage.media_storage, upload_to='thumbnails/exercises/'),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='image',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=qlsk.storage.media_storage, upload_to='meals/'),
+        ),
+        migrations.AlterField(
+            model_name='trainingsession',
+            name='image',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=qlsk.storage.media_storage, upload_to='training_sessions/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='trainingsession',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, max_length=255, null=True, storage=qlsk.storage.media_storage, upload_to='thumbnails/training_sessions/'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-19 22:55
+
+from django.db import migrations, models
+
+
+def redact_queued_otps(apps, schema_editor):
+    # Email OTP đã có trong hàng đợi: đánh dấu nhạy cảm, xóa body của email đã gửi
+    EmailOutbox = apps.get_model('qlsk', 'EmailOutbox')
+    otp_emails = EmailOutbox.objects.filter(subject='Mã OTP đặt lại mật khẩu')
+    otp_emails.update(sensitive=True)
+    otp_emails.filter(status__in=['sent', 'failed']).update(body='[đã xóa]')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0043_emailoutbox_sending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='sensitive',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(redact_queued_otps, migrations.RunPython.noop),
+    ]
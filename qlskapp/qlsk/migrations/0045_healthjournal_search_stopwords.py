@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-19 23:10
+
+from django.db import migrations
+
+MYSQL_INDEX = 'qlsk_healthjournal_search_ft'
+
+# Danh sách stopword mặc định của InnoDB (tiếng Anh) chứa nhiều âm tiết tiếng Việt đã bỏ dấu
+# (com = cơm, the = thể/thế, ...): các từ này không được lập chỉ mục nên không bao giờ tìm thấy.
+# Stopword gắn với FULLTEXT index lúc tạo, nên tạo lại index khi đã tắt stopword trong phiên.
+CREATE_WITHOUT_STOPWORDS = [
+    f'ALTER TABLE qlsk_healthjournal DROP INDEX {MYSQL_INDEX}',
+    'SET SESSION innodb_ft_enable_stopword = OFF',
+    f'ALTER TABLE qlsk_healthjournal ADD FULLTEXT INDEX {MYSQL_INDEX} (search_text)',
+    'SET SESSION innodb_ft_enable_stopword = @@GLOBAL.innodb_ft_enable_stopword',
+]
+CREATE_WITH_STOPWORDS = [
+    f'ALTER TABLE qlsk_healthjournal DROP INDEX {MYSQL_INDEX}',
+    f'ALTER TABLE qlsk_healthjournal ADD FULLTEXT INDEX {MYSQL_INDEX} (search_text)',
+]
+
+
+def run_on_mysql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'mysql':
+            for sql in statements:
+                schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qlsk', '0044_emailoutbox_sensitive'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_mysql(CREATE_WITHOUT_STOPWORDS), run_on_mysql(CREATE_WITH_STOPWORDS)),
+    ]
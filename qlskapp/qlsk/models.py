@@ -1,8 +1,11 @@
 from ckeditor.fields import RichTextField
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import get_user_model
-from cloudinary.models import CloudinaryField
+from django.utils import timezone
+from datetime import timedelta
+from .storage import media_storage
 
 # Custom User Model
 class User(AbstractUser):
@@ -37,20 +40,58 @@ class Exercise(models.Model):
     repetitions = models.IntegerField(null=True, blank=True)  # Số lần lặp
     duration = models.IntegerField()  # Thời gian gợi ý (phút)
     calories_burned = models.IntegerField()  # Lượng calo tiêu thụ gợi ý
+    met = models.FloatField(null=True, blank=True)  # Chỉ số MET, dùng để tính calo theo cân nặng
     is_custom = models.BooleanField(default=False)  # True nếu là bài tập cá nhân
     user = models.ForeignKey('User', on_delete=models.CASCADE, null=True, blank=True, related_name='custom_exercises')  # User tạo bài tập cá nhân
-    image = CloudinaryField('image', blank=True, null=True)  # Ảnh bài tập gợi ý hoặc cá nhân
+    image = models.ImageField(upload_to="exercises/", storage=media_storage, max_length=255, blank=True, null=True)  # Ảnh bài tập gợi ý hoặc cá nhân
+    thumbnail = models.ImageField(upload_to="thumbnails/exercises/", storage=media_storage, max_length=255, null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.name
 
 
+# Recurring Training Schedule Model (Lịch tập lặp lại theo thứ trong tuần)
+class RecurringTrainingSchedule(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="recurring_training_schedules")
+    time = models.TimeField()  # Giờ tập luyện
+    weekdays = models.PositiveSmallIntegerField(help_text="Bitmask các thứ trong tuần, bit 0 = Thứ 2 ... bit 6 = Chủ nhật")
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)  # null = lặp lại không giới hạn
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Recurring schedule for {self.user.username} from {self.start_date}"
+
+    def occurrences(self, start, end):
+        """Sinh lần lượt các ngày tập trong khoảng [start, end], không lưu database"""
+        start = max(start, self.start_date)
+        if self.end_date:
+            end = min(end, self.end_date)
+        day = start
+        while day <= end:
+            if self.weekdays & (1 << day.weekday()):
+                yield day
+            day += timedelta(days=1)
+
+
 # Training Schedule Model (Lịch tập luyện cá nhân)
 class TrainingSchedule(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="training_schedules")
     date = models.DateField()  # Ngày tập luyện
     time = models.TimeField()  # Giờ tập luyện
     created_at = models.DateTimeField(auto_now_add=True)  # Thời gian tạo lịch
+    # Lịch lặp lại sinh ra dòng này (chỉ tạo khi gắn TrainingSession vào một lần tập)
+    recurrence = models.ForeignKey(
+        RecurringTrainingSchedule, on_delete=models.SET_NULL, null=True, blank=True, related_name="schedules"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['recurrence', 'date'], name='unique_recurrence_date'),
+        ]
 
     def __str__(self):
         return f"Schedule for {self.user.username} on {self.date}"
@@ -64,7 +105,8 @@ class TrainingSession(models.Model):
     repetitions = models.IntegerField(null=True, blank=True)  # Số lần lặp
     duration = models.IntegerField(null=True, blank=True)  # Thời gian thực hiện (phút)
     feedback = models.TextField(null=True, blank=True) 
-    image = models.ImageField(upload_to="training_sessions/%Y/%m/", null=True, blank=True)  # Ảnh bài tập tự thêm
+    image = models.ImageField(upload_to="training_sessions/%Y/%m/", storage=media_storage, max_length=255, null=True, blank=True)  # Ảnh bài tập tự thêm
+    thumbnail = models.ImageField(upload_to="thumbnails/training_sessions/", storage=media_storage, max_length=255, null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"Session in {self.schedule} - {self.exercise or self.custom_exercise_name}"
@@ -95,6 +137,11 @@ class HealthJournal(models.Model):
     date = models.DateField(auto_now_add=True)
     content = RichTextField()
     workout_session = models.ForeignKey('WorkoutSession', on_delete=models.SET_NULL, null=True, blank=True)
+    # Nội dung dạng văn bản thường, bỏ dấu, dùng cho tìm kiếm (cập nhật khi lưu)
+    search_text = models.TextField(blank=True, default='', editable=False)
+    # Đoạn trích và số từ cho danh sách nhật ký (cập nhật khi lưu)
+    excerpt = models.CharField(max_length=255, blank=True, default='', editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"Journal Entry for {self.user.username} on {self.date}"
@@ -102,10 +149,75 @@ class HealthJournal(models.Model):
 
 class PasswordResetOTP(models.Model):
     email = models.EmailField()
-    otp = models.CharField(max_length=6)
+    otp_hash = models.CharField(max_length=64)  # HMAC-SHA256 của mã OTP, không lưu mã gốc
     created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(default=timezone.now)
     is_used = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Tra cứu OTP theo khóa ghép khi xác nhận
+            models.Index(fields=['email', 'otp_hash', 'is_used', 'expires_at']),
+            # Dọn OTP hết hạn (purge_expired_otps)
+            models.Index(fields=['expires_at']),
+        ]
+
+# Email Outbox Model (Hàng đợi email gửi nền, view chỉ cần thêm bản ghi)
+class EmailOutbox(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),  # Đã được worker nhận, next_attempt_at là hạn thuê
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, null=True, blank=True)
+    to_email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)  # Số lần đã thử gửi
+    last_error = models.TextField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # Thời điểm được thử gửi lại
+    # Nội dung chứa bí mật (OTP): bị xóa khỏi body sau khi gửi hoặc khi hết hạn
+    sensitive = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Email to {self.to_email}: {self.subject} ({self.status})"
+
+# Image Upload Model (Hàng đợi xử lý ảnh upload: thu nhỏ, tạo thumbnail, đẩy lên nơi lưu trữ)
+class ImageUpload(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    model = models.CharField(max_length=100)  # app_label.model_name của đối tượng nhận ảnh
+    object_id = models.BigIntegerField()
+    field_name = models.CharField(max_length=50)
+    path = models.CharField(max_length=500)  # File gốc đang chờ xử lý trên ổ đĩa
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Image for {self.model} #{self.object_id}.{self.field_name} ({self.status})"
+
 # Workout Session Model (Lưu trữ quá trình tập luyện theo thời gian thực)
 class WorkoutSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="workout_sessions")
@@ -115,6 +227,11 @@ class WorkoutSession(models.Model):
     exercises = models.ManyToManyField(Exercise, through='WorkoutExercise')
     is_completed = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'start_time']),
+        ]
+
     def __str__(self):
         username = self.user.username if self.user else "Unknown User"
         start_time_str = self.start_time.strftime("%Y-%m-%d %H:%M:%S") if self.start_time else "Unknown Time"
@@ -132,6 +249,7 @@ class WorkoutExercise(models.Model):
     )
     duration = models.IntegerField(default=0)  # Thời gian thực hiện (giây)
     calories_burned = models.IntegerField(default=0)  # Calo tiêu thụ thực tế
+    heart_rate = models.IntegerField(null=True, blank=True)  # Nhịp tim trung bình khi tập (nếu có)
     completed_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -144,9 +262,54 @@ class WorkoutExercise(models.Model):
         except Exception:
             return f"WorkoutExercise {self.id}"
 
+# Workout Template Model (Mẫu buổi tập được lưu lại để dùng nhiều lần)
+class WorkoutTemplate(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="workout_templates")
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Tóm tắt tính sẵn từ các bài tập để liệt kê mẫu chỉ cần một query
+    exercise_count = models.IntegerField(default=0)
+    total_duration = models.IntegerField(default=0)  # Tổng thời gian gợi ý (phút)
+    base_calories = models.IntegerField(default=0)  # Tổng calo gợi ý (cho người 70kg)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Template {self.name} of {self.user.username}"
+
+    @classmethod
+    def refresh_summaries(cls, template_ids):
+        """Tính lại tóm tắt của các mẫu trong một câu UPDATE (dùng khi Exercise thay đổi)"""
+        items = WorkoutTemplateExercise.objects.filter(template=models.OuterRef('pk')).order_by().values('template')
+
+        def summary(aggregate):
+            return Coalesce(models.Subquery(items.annotate(value=aggregate).values('value')), 0)
+
+        cls.objects.filter(pk__in=template_ids).update(
+            exercise_count=summary(models.Count('id')),
+            total_duration=summary(models.Sum('exercise__duration')),
+            base_calories=summary(models.Sum('exercise__calories_burned')),
+        )
+
+# Workout Template Exercise Model (Bài tập trong mẫu, theo thứ tự)
+class WorkoutTemplateExercise(models.Model):
+    template = models.ForeignKey(WorkoutTemplate, on_delete=models.CASCADE, related_name="items")
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE)
+    order = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['order', 'id']
+
+    def __str__(self):
+        return f"{self.exercise.name} in {self.template.name}"
+
+def today():
+    return timezone.now().date()
+
 class HealthMetricsHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="health_metrics_history")
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=today)  # Không dùng auto_now_add để có thể ghi lại tổng của ngày cũ
     time = models.TimeField(auto_now_add=True)
     water_intake = models.FloatField(default=0)  # Lượng nước uống (lít)
     steps = models.IntegerField(default=0)  # Số bước đi
@@ -154,6 +317,10 @@ class HealthMetricsHistory(models.Model):
 
     class Meta:
         ordering = ['-date', '-time']
+        # Mỗi user một dòng mỗi ngày, tổng nước được cộng dồn bằng UPDATE
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_health_metrics_user_date'),
+        ]
 
     def __str__(self):
         return f"Health metrics of {self.user.username} at {self.date} {self.time}"
@@ -164,6 +331,11 @@ class WaterSession(models.Model):
     time = models.TimeField(auto_now_add=True)
     amount = models.FloatField()  # Đơn vị: lít
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date']),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.date} - {self.amount}L"
 
@@ -217,7 +389,7 @@ class Meal(models.Model):
     fat = models.FloatField()      # gram
     ingredients = models.TextField()  # Danh sách nguyên liệu
     instructions = models.TextField()  # Hướng dẫn chế biến
-    image = CloudinaryField('image', blank=True, null=True)
+    image = models.ImageField(upload_to="meals/", storage=media_storage, max_length=255, blank=True, null=True)
 
     def __str__(self):
         return f"{self.get_meal_type_display()}: {self.name}"
\ No newline at end of file
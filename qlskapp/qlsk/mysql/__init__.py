@@ -0,0 +1,5 @@
+"""
+Backend MySQL (ENGINE = 'qlsk.mysql'): backend mysql của Django chạy trên PyMySQL.
+Thay cho pymysql.install_as_MySQLdb() trong settings: PyMySQL chỉ được import khi
+có database dùng backend này (chạy với SQLite hay các lệnh không cần MySQL thì không).
+"""
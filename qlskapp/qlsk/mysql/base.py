@@ -0,0 +1,5 @@
+import pymysql
+
+pymysql.install_as_MySQLdb()
+
+from django.db.backends.mysql.base import DatabaseWrapper  # noqa: E402,F401
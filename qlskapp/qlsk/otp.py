@@ -0,0 +1,71 @@
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PasswordResetOTP
+from .ratelimit import TokenBucket
+
+# Giới hạn gửi OTP theo email và theo IP, giới hạn nhập OTP theo email
+send_otp_email_bucket = TokenBucket('otp-send-email', *settings.OTP_SEND_RATE_PER_EMAIL)
+send_otp_ip_bucket = TokenBucket('otp-send-ip', *settings.OTP_SEND_RATE_PER_IP)
+confirm_otp_bucket = TokenBucket('otp-confirm-email', *settings.OTP_CONFIRM_RATE_PER_EMAIL)
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def hash_otp(email, otp):
+    """HMAC theo SECRET_KEY, không lưu mã OTP dạng rõ trong database"""
+    message = f'{normalize_email(email)}:{otp}'.encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def create_otp(email):
+    """Tạo mã OTP 6 số, lưu bản băm và trả về mã để gửi cho người dùng"""
+    otp = f'{secrets.randbelow(1000000):06d}'
+    PasswordResetOTP.objects.create(
+        email=normalize_email(email),
+        otp_hash=hash_otp(email, otp),
+        expires_at=timezone.now() + timedelta(minutes=settings.OTP_EXPIRY_MINUTES),
+    )
+    return otp
+
+
+def consume_otp(email, otp):
+    """
+    Kiểm tra và đánh dấu đã dùng OTP. Tra cứu theo index (email, otp_hash).
+    Trả về True nếu hợp lệ; các OTP khác của email này cũng bị vô hiệu hóa.
+    """
+    email = normalize_email(email)
+    now = timezone.now()
+    otp_obj = PasswordResetOTP.objects.filter(
+        email=email, otp_hash=hash_otp(email, otp), is_used=False, expires_at__gt=now
+    ).only('id').first()
+    if not otp_obj:
+        return False
+    # UPDATE có điều kiện để hai request đồng thời không dùng cùng một mã
+    used = PasswordResetOTP.objects.filter(pk=otp_obj.pk, is_used=False).update(is_used=True)
+    if not used:
+        return False
+    PasswordResetOTP.objects.filter(email=email, is_used=False).update(is_used=True)
+    return True
+
+
+def purge_otps(batch_size=10000, grace_minutes=60):
+    """Xóa OTP đã hết hạn (kể cả đã dùng) theo từng lô để không khóa bảng lâu"""
+    cutoff = timezone.now() - timedelta(minutes=grace_minutes)
+    deleted = 0
+    while True:
+        ids = list(
+            PasswordResetOTP.objects.filter(expires_at__lt=cutoff)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        deleted += PasswordResetOTP.objects.filter(id__in=ids).delete()[0]
+    return deleted
@@ -0,0 +1,77 @@
+import math
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class TokenBucket:
+    """
+    Token bucket lưu trong Django cache: chứa tối đa `capacity` token, hồi 1 token mỗi
+    `refill_seconds` giây, mỗi lần gọi tốn 1 token. Không có ranh giới cửa sổ nên không
+    thể dồn 2 * capacity request quanh thời điểm chuyển cửa sổ.
+    Trạng thái (số token, thời điểm cập nhật) được đọc-tính-ghi trong một khóa ngắn tạo
+    bằng cache.add (nguyên tử trên Redis/Memcached/LocMem) để hai request không cùng
+    tiêu một token. Nhiều worker/tiến trình phải dùng chung một cache (Redis, Memcached)
+    thì giới hạn mới có hiệu lực trên toàn hệ thống; LocMemCache chỉ giới hạn trong từng tiến trình.
+    """
+
+    LOCK_TIMEOUT = 2  # giây, khóa tự hết hạn nếu tiến trình giữ khóa chết
+    LOCK_WAIT = 1.0  # giây chờ khóa tối đa, quá thì coi như bị chặn
+    LOCK_POLL = 0.005
+
+    def __init__(self, name, capacity, refill_seconds):
+        self.name = name
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+
+    def _cache_key(self, key):
+        return f'ratelimit:{self.name}:{key}'
+
+    @contextmanager
+    def _locked(self, key):
+        lock_key = f'{self._cache_key(key)}:lock'
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.LOCK_WAIT
+        while not cache.add(lock_key, token, self.LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                yield False
+                return
+            time.sleep(self.LOCK_POLL)
+        try:
+            yield True
+        finally:
+            # Không xóa khóa của request khác nếu khóa của mình đã hết hạn
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def allow(self, key, now=None):
+        """Trả về (được phép hay không, số giây cần chờ nếu bị chặn)"""
+        with self._locked(key) as locked:
+            if not locked:
+                return False, 1
+            now = time.time() if now is None else now
+            cache_key = self._cache_key(key)
+            tokens, updated_at = cache.get(cache_key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + max(now - updated_at, 0) / self.refill_seconds)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Sau capacity * refill_seconds giây bucket đã đầy lại, hết hạn cũng như đầy
+            cache.set(cache_key, (tokens, now), math.ceil(self.capacity * self.refill_seconds) + 1)
+        if allowed:
+            return True, 0
+        return False, math.ceil((1 - tokens) * self.refill_seconds)
+
+    def reset(self, key):
+        cache.delete(self._cache_key(key))
+
+
+def get_client_ip(request):
+    if getattr(settings, 'RATELIMIT_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
@@ -0,0 +1,169 @@
+"""
+Đọc từ replica cho các API thống kê và danh sách.
+
+- ReplicaRouter: mọi truy vấn mặc định vào 'default' (primary). Chỉ trong các view
+  có ReplicaReadMixin / @reads_from_replica, truy vấn đọc mới chuyển sang
+  DATABASES[DATABASE_REPLICA_ALIAS]; ghi luôn vào primary.
+- Read-your-writes: sau khi user tự ghi (POST/PUT/PATCH/DELETE thành công),
+  ReplicaStickinessMiddleware đặt cookie và đánh dấu trong cache theo user
+  (client dùng token có thể không giữ cookie) trong REPLICA_STICKY_SECONDS;
+  trong thời gian đó mọi lần đọc của user đi vào primary. Đánh dấu phải thấy được từ
+  mọi worker nên bật replica thì bắt buộc dùng cache chung (system check qlsk.E001,
+  settings/prod.py dừng khi khởi động).
+- Replica trễ hơn REPLICA_MAX_LAG_SECONDS hoặc không kết nối được thì đọc từ primary.
+  Kết quả kiểm tra được nhớ REPLICA_LAG_CHECK_SECONDS giây trong mỗi tiến trình.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+# Alias dùng cho truy vấn đọc của request hiện tại (None: primary)
+_read_alias = ContextVar('qlsk_read_alias', default=None)
+# alias -> (thời điểm kiểm tra, replica dùng được hay không)
+_replica_health = {}
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Luôn trả về alias cụ thể: nếu trả None, Django dùng alias của instance
+        # trong hints và các truy vấn quan hệ của object đọc từ replica sẽ dính replica
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primary và replica chứa cùng dữ liệu
+        return True
+
+
+def replica_configured():
+    return settings.DATABASE_REPLICA_ALIAS in settings.DATABASES
+
+
+def replica_lag(alias):
+    """Số giây replica trễ so với primary; None nếu replication đang lỗi"""
+    connection = connections[alias]
+    connection.ensure_connection()
+    if connection.vendor != 'mysql':
+        # SQLite (chạy thử với 2 file database) không có replication để đo
+        return 0.0
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute('SHOW REPLICA STATUS')
+        except DatabaseError:
+            # MySQL < 8.0.22
+            cursor.execute('SHOW SLAVE STATUS')
+        row = cursor.fetchone()
+        if row is None:
+            # Server không phải replica (ví dụ trỏ thẳng vào primary khi dev)
+            return 0.0
+        status = dict(zip([column[0] for column in cursor.description], row))
+    lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+    return None if lag is None else float(lag)
+
+
+def replica_available():
+    alias = settings.DATABASE_REPLICA_ALIAS
+    if alias not in settings.DATABASES:
+        return False
+    now = time.monotonic()
+    checked = _replica_health.get(alias)
+    if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_SECONDS:
+        return checked[1]
+    try:
+        lag = replica_lag(alias)
+    except DatabaseError as e:
+        logger.warning('Không kết nối được replica %s: %s', alias, e)
+        lag = None
+    healthy = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+    if not healthy and lag is not None:
+        logger.warning('Replica %s trễ %.1f giây, đọc từ primary', alias, lag)
+    _replica_health[alias] = (now, healthy)
+    return healthy
+
+
+def sticky_cache_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def wrote_recently(request):
+    """User vừa ghi dữ liệu nên phải đọc từ primary để thấy thay đổi của chính mình"""
+    if request.COOKIES.get(settings.REPLICA_STICKY_COOKIE):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and cache.get(sticky_cache_key(user.pk)))
+
+
+def choose_read_alias(request):
+    if request.method not in SAFE_METHODS or not replica_configured():
+        return None
+    if wrote_recently(request) or not replica_available():
+        return None
+    return settings.DATABASE_REPLICA_ALIAS
+
+
+@contextmanager
+def read_from_replica(request):
+    token = _read_alias.set(choose_read_alias(request))
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def reads_from_replica(func):
+    """Cho function view (@api_view): đặt dưới @api_view/@permission_classes"""
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        with read_from_replica(request):
+            return func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """
+    Cho APIView/ViewSet: các request GET của action trong replica_actions
+    (None: mọi action) đọc từ replica. Chọn replica sau bước xác thực để biết user.
+    """
+    replica_actions = None
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _read_alias.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.replica_actions is None or getattr(self, 'action', None) in self.replica_actions:
+            _read_alias.set(choose_read_alias(request))
+
+
+class ReplicaStickinessMiddleware:
+    """Đánh dấu user vừa ghi để các lần đọc sau trong REPLICA_STICKY_SECONDS đi vào primary"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method in SAFE_METHODS or response.status_code >= 400 or not replica_configured():
+            return response
+        seconds = settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(settings.REPLICA_STICKY_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+        # DRF gán user đã xác thực (JWT/OAuth2) lại vào request của Django
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            cache.set(sticky_cache_key(user.pk), True, seconds)
+        return response
@@ -0,0 +1,142 @@
+"""
+Tìm kiếm toàn văn trong nhật ký sức khỏe.
+
+HealthJournal.search_text lưu nội dung đã bỏ HTML, chữ thường, bỏ dấu tiếng Việt
+(cập nhật khi lưu). Việc bỏ dấu giữ nguyên độ dài chuỗi nên vị trí tìm thấy trong
+search_text cũng là vị trí trong văn bản gốc, dùng để cắt đoạn trích.
+
+- MySQL: FULLTEXT index trên search_text, MATCH ... AGAINST (BOOLEAN MODE); từ ngắn hơn
+  innodb_ft_min_token_size (SEARCH_MYSQL_MIN_TOKEN_SIZE) không có trong index nên lọc bằng LIKE
+- SQLite: bảng ảo FTS5 qlsk_healthjournal_fts (đồng bộ bằng trigger), xếp hạng bm25
+- Database khác: LIKE trên search_text
+"""
+import html
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import strip_tags
+
+from .models import HealthJournal
+
+FTS_TABLE = 'qlsk_healthjournal_fts'
+SNIPPET_LENGTH = 160
+EXCERPT_LENGTH = 200
+
+_whitespace = re.compile(r'\s+')
+_block_tag = re.compile(r'</?(p|div|br|li|h[1-6]|tr|td|blockquote)\b[^>]*>', re.IGNORECASE)
+_word = re.compile(r'\w+')
+
+
+def fold_char(char):
+    """Bỏ dấu một ký tự, luôn trả về đúng một ký tự"""
+    if char in 'đĐ':
+        return 'd'
+    base = unicodedata.normalize('NFD', char)[0].lower()
+    return base if len(base) == 1 else char
+
+
+def html_to_text(content):
+    # Thẻ khối (đoạn, xuống dòng, ...) được thay bằng khoảng trắng để không dính chữ
+    text = strip_tags(_block_tag.sub(' ', content or ''))
+    return _whitespace.sub(' ', html.unescape(text)).strip()
+
+
+def fold_text(text):
+    return ''.join(fold_char(char) for char in text)
+
+
+def to_search_text(content):
+    return fold_text(html_to_text(content))
+
+
+def truncate_words(text, length):
+    """Cắt văn bản tối đa length ký tự (không cắt giữa từ), thêm … nếu bị cắt"""
+    if len(text) <= length:
+        return text
+    cut = text.rfind(' ', 0, length)
+    return text[:cut if cut > 0 else length].rstrip() + '…'
+
+
+def journal_summary(content):
+    """(search_text, đoạn trích, số từ) của nội dung nhật ký"""
+    text = html_to_text(content)
+    return fold_text(text), truncate_words(text, EXCERPT_LENGTH), len(text.split())
+
+
+def query_terms(query):
+    return _word.findall(fold_text(query or ''))
+
+
+def mysql_match_terms(terms):
+    """
+    Chia các từ cần tìm trên MySQL: (chuỗi AGAINST cho các từ có trong FULLTEXT index,
+    các từ ngắn hơn innodb_ft_min_token_size không được lập chỉ mục, phải lọc bằng LIKE)
+    """
+    min_size = settings.SEARCH_MYSQL_MIN_TOKEN_SIZE
+    indexed = [term for term in terms if len(term) >= min_size]
+    short = [term for term in terms if len(term) < min_size]
+    return ' '.join(f'+{term}*' for term in indexed), short
+
+
+def starts_word(term):
+    """search_text có một từ bắt đầu bằng term (như tìm tiền tố term* của FULLTEXT)"""
+    return Q(search_text__startswith=term) | Q(search_text__contains=f' {term}')
+
+
+def search_journals(user, query):
+    """Queryset nhật ký của user khớp với tất cả các từ trong query, đã sắp xếp theo độ liên quan"""
+    terms = query_terms(query)
+    journals = HealthJournal.objects.filter(user=user)
+    if not terms:
+        return journals.none()
+    if connection.vendor == 'mysql':
+        against, short_terms = mysql_match_terms(terms)
+        for term in short_terms:
+            journals = journals.filter(starts_word(term))
+        if not against:
+            return journals.order_by('-date', '-id')
+        score = 'MATCH(search_text) AGAINST (%s IN BOOLEAN MODE)'
+        return (
+            journals.annotate(score=RawSQL(score, [against]))
+            .filter(score__gt=0)
+            .order_by('-score', '-date', '-id')
+        )
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # bm25 càng nhỏ càng liên quan
+        rank = (
+            f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = qlsk_healthjournal.id'
+        )
+        return (
+            journals.filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+            .annotate(score=RawSQL(rank, [match]))
+            .order_by('score', '-date', '-id')
+        )
+    for term in terms:
+        journals = journals.filter(search_text__contains=term)
+    return journals.order_by('-date', '-id')
+
+
+def make_snippet(content, query, length=SNIPPET_LENGTH):
+    """Đoạn trích quanh vị trí đầu tiên khớp với query"""
+    text = html_to_text(content)
+    folded = fold_text(text)
+    positions = [folded.find(term) for term in query_terms(query)]
+    positions = [p for p in positions if p >= 0]
+    start = max(min(positions) - length // 4, 0) if positions else 0
+    # Không cắt giữa một từ
+    if start > 0:
+        space = text.find(' ', start)
+        start = space + 1 if 0 <= space < start + 20 else start
+    snippet = text[start:start + length]
+    if start > 0:
+        snippet = '…' + snippet
+    if start + length < len(text):
+        snippet = snippet.rstrip() + '…'
+    return snippet
+
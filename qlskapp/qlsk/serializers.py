@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from .models import User, Exercise, TrainingSchedule, TrainingSession, Reminder, HealthJournal, WorkoutExercise, WorkoutSession, HealthMetricsHistory, WaterSession, DietGoal, Meal, MealPlan
+from .calories import scale_calories
+from .models import User, Exercise, TrainingSchedule, TrainingSession, Reminder, HealthJournal, WorkoutExercise, WorkoutSession, HealthMetricsHistory, WaterSession, DietGoal, Meal, MealPlan, WorkoutTemplate, WorkoutTemplateExercise, RecurringTrainingSchedule
 
 
-# User Serializer
+# User Serializer (profile đầy đủ)
 class UserSerializer(serializers.ModelSerializer):
     num_clients = serializers.SerializerMethodField()
     class Meta:
@@ -13,7 +14,18 @@ class UserSerializer(serializers.ModelSerializer):
             'email': {'required': True}
         }
 
+    def __init__(self, *args, **kwargs):
+        # fields=[...] để chỉ trả về một phần các trường (dùng cho ?fields=)
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
     def get_num_clients(self, obj):
+        # Dùng giá trị annotate sẵn nếu có để tránh query COUNT cho từng user
+        if hasattr(obj, 'num_clients_count'):
+            return obj.num_clients_count
         return obj.clients.count()
 
     def create(self, validated_data):
@@ -24,6 +36,12 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+# User List Serializer (gọn, dùng cho danh sách chuyên gia/khách hàng)
+class UserListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'role']
+
 # Exercise Serializer
 class ExerciseSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -48,14 +66,52 @@ class ExerciseSerializer(serializers.ModelSerializer):
 class TrainingScheduleSerializer(serializers.ModelSerializer):
     class Meta:
         model = TrainingSchedule
-        fields = ['id', 'user', 'date', 'time', 'created_at']
+        fields = ['id', 'user', 'date', 'time', 'created_at', 'recurrence']
+        read_only_fields = ['recurrence']
+
+class WeekdayMaskField(serializers.Field):
+    """Bitmask thứ trong tuần <-> danh sách thứ (0 = Thứ 2 ... 6 = Chủ nhật)"""
+
+    def to_representation(self, value):
+        return [day for day in range(7) if value & (1 << day)]
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            raise serializers.ValidationError('Cần danh sách thứ trong tuần, ví dụ [0, 2, 4].')
+        mask = 0
+        for day in data:
+            try:
+                day = int(day)
+            except (TypeError, ValueError):
+                raise serializers.ValidationError('Thứ trong tuần phải là số từ 0 đến 6.')
+            if not 0 <= day <= 6:
+                raise serializers.ValidationError('Thứ trong tuần phải là số từ 0 đến 6.')
+            mask |= 1 << day
+        return mask
+
+# Recurring Training Schedule Serializer
+class RecurringTrainingScheduleSerializer(serializers.ModelSerializer):
+    weekdays = WeekdayMaskField()
+
+    class Meta:
+        model = RecurringTrainingSchedule
+        fields = ['id', 'user', 'time', 'weekdays', 'start_date', 'end_date', 'created_at']
+        read_only_fields = ['user', 'created_at']
+
+    def validate(self, attrs):
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError({'end_date': 'Ngày kết thúc phải sau ngày bắt đầu.'})
+        return attrs
 
 # Training Session Serializer
 class TrainingSessionSerializer(serializers.ModelSerializer):
     image = serializers.ImageField(required=False, allow_null=True)
     class Meta:
         model = TrainingSession
-        fields = ['id', 'schedule', 'exercise', 'custom_exercise_name', 'repetitions', 'duration', 'feedback', 'image']
+        fields = ['id', 'schedule', 'exercise', 'custom_exercise_name', 'repetitions', 'duration', 'feedback', 'image', 'thumbnail']
+        read_only_fields = ['thumbnail']
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -80,8 +136,14 @@ class ReminderSerializer(serializers.ModelSerializer):
 class HealthJournalSerializer(serializers.ModelSerializer):
     class Meta:
         model = HealthJournal
-        fields = ['id', 'user', 'date', 'content', 'workout_session']
-        read_only_fields = ['user']
+        fields = ['id', 'user', 'date', 'content', 'excerpt', 'word_count', 'workout_session']
+        read_only_fields = ['user', 'excerpt', 'word_count']
+
+class HealthJournalListSerializer(serializers.ModelSerializer):
+    """Danh sách nhật ký: chỉ đoạn trích, nội dung đầy đủ lấy qua retrieve"""
+    class Meta:
+        model = HealthJournal
+        fields = ['id', 'user', 'date', 'excerpt', 'word_count', 'workout_session']
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
@@ -118,8 +180,8 @@ class WorkoutExerciseSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = WorkoutExercise
-        fields = ['id', 'exercise', 'exercise_name', 'exercise_image', 'duration', 'calories_burned', 'completed_at']
-        read_only_fields = ['duration', 'calories_burned', 'completed_at']
+        fields = ['id', 'exercise', 'exercise_name', 'exercise_image', 'duration', 'calories_burned', 'heart_rate', 'completed_at']
+        read_only_fields = ['duration', 'calories_burned', 'heart_rate', 'completed_at']
 
     def get_exercise_name(self, obj):
         try:
@@ -154,6 +216,35 @@ class WorkoutSessionSerializer(serializers.ModelSerializer):
         except Exception:
             return "Unknown User"
 
+# Workout Template Serializer (danh sách mẫu, chỉ dùng các trường tóm tắt)
+class WorkoutTemplateSerializer(serializers.ModelSerializer):
+    expected_calories = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WorkoutTemplate
+        fields = ['id', 'name', 'created_at', 'exercise_count', 'total_duration', 'base_calories', 'expected_calories']
+        read_only_fields = ['created_at', 'exercise_count', 'total_duration', 'base_calories']
+
+    def get_expected_calories(self, obj):
+        request = self.context.get('request')
+        weight = getattr(request.user, 'weight', None) if request else None
+        return scale_calories(obj.base_calories, weight)
+
+class WorkoutTemplateExerciseSerializer(serializers.ModelSerializer):
+    exercise_name = serializers.CharField(source='exercise.name', read_only=True)
+    duration = serializers.IntegerField(source='exercise.duration', read_only=True)
+    calories_burned = serializers.IntegerField(source='exercise.calories_burned', read_only=True)
+
+    class Meta:
+        model = WorkoutTemplateExercise
+        fields = ['order', 'exercise', 'exercise_name', 'duration', 'calories_burned']
+
+class WorkoutTemplateDetailSerializer(WorkoutTemplateSerializer):
+    items = WorkoutTemplateExerciseSerializer(many=True, read_only=True)
+
+    class Meta(WorkoutTemplateSerializer.Meta):
+        fields = WorkoutTemplateSerializer.Meta.fields + ['items']
+
 class HealthMetricsHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = HealthMetricsHistory
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_users
+from .models import HealthJournal, User
+from .search import journal_summary
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Xóa bản cache dùng cho xác thực JWT mỗi khi User thay đổi"""
+    invalidate_cached_users([instance.pk])
+
+
+@receiver(pre_save, sender=HealthJournal)
+def update_journal_text_fields(sender, instance, **kwargs):
+    """Cập nhật search_text, đoạn trích và số từ theo nội dung nhật ký"""
+    instance.search_text, instance.excerpt, instance.word_count = journal_summary(instance.content)
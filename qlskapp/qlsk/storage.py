@@ -0,0 +1,235 @@
+"""
+Nơi lưu ảnh (Exercise, Meal, TrainingSession, thumbnail) qua một interface Storage chung,
+chọn bằng STORAGES['media'] trong settings:
+
+- ContentAddressedStorage: ổ đĩa cục bộ, tên file là sha256 của nội dung
+  (cas/ab/cd/<sha256>.webp) nên ảnh trùng nhau chỉ lưu một lần.
+- CloudinaryStorage: đẩy ảnh lên Cloudinary, đọc lại qua URL phân phối (HTTP).
+
+Tên file cũ (ảnh local trước đây, ví dụ training_sessions/...) vẫn được phục vụ từ MEDIA_ROOT.
+File cas/ không còn được tham chiếu được xóa bằng lệnh gc_media.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage, storages
+from django.db.models import FileField
+from django.utils.deconstruct import deconstructible
+
+CAS_PREFIX = 'cas'
+CAS_NAME_RE = re.compile(r'^cas/[0-9a-f]{2}/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(\.\w+)?$')
+# Định dạng tên file của CloudinaryField cũ: image/upload/v123/public_id.jpg
+CLOUDINARY_NAME_RE = re.compile(
+    r'^(?P<resource_type>image|raw|video)/(?P<type>upload|private|authenticated)/'
+    r'(?:v(?P<version>\d+)/)?(?P<public_id>.+?)(?:\.(?P<format>[^./]+))?$'
+)
+CLOUDINARY_TIMEOUT = 30  # giây, cho mỗi lần tải file từ Cloudinary
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_SPOOL_SIZE = 5 * 1024 * 1024  # Lớn hơn thì ghi ra file tạm trên ổ đĩa
+
+
+def media_storage():
+    """Dùng làm storage= của các trường ảnh (callable để migration không phụ thuộc settings)"""
+    return storages['media']
+
+
+def file_digest(content):
+    content.seek(0)
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def cas_digest(name):
+    """sha256 của file trong ContentAddressedStorage (None nếu không phải tên dạng cas/)"""
+    match = CAS_NAME_RE.match(name or '')
+    return match.group('digest') if match else None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage đặt tên file theo sha256 nội dung, chia thư mục theo 2 cấp
+    (cas/ab/cd/...). Upload trùng nội dung trả về file đã có, không ghi lại.
+    Nội dung của một tên không bao giờ thay đổi nên có thể cache vĩnh viễn.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()[:10]
+        directory = self.path(CAS_PREFIX)
+        os.makedirs(directory, exist_ok=True)
+        # Ghi ra file tạm đồng thời tính sha256, sau đó đổi tên (atomic) vào đúng chỗ
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            hexdigest = digest.hexdigest()
+            name = f'{CAS_PREFIX}/{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{extension}'
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(tmp_path)
+                # File cũ vừa được dùng lại: cập nhật mtime để gc_media không xóa trong thời gian chờ
+                os.utime(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+    def delete(self, name):
+        # Một file có thể được nhiều đối tượng dùng chung nên không xóa theo từng đối tượng,
+        # file không còn ai dùng được xóa bằng lệnh gc_media (collect_cas_garbage)
+        if not cas_digest(name):
+            super().delete(name)
+
+
+def referenced_cas_names():
+    """Tên các file cas/ đang được trường ảnh/file của một đối tượng bất kỳ tham chiếu"""
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField):
+                names.update(
+                    model._base_manager.filter(**{f'{field.attname}__startswith': f'{CAS_PREFIX}/'})
+                    .values_list(field.attname, flat=True).iterator()
+                )
+    return names
+
+
+def collect_cas_garbage(storage, older_than, dry_run=False):
+    """
+    Xóa các file trong cas/ của ContentAddressedStorage không còn được tham chiếu.
+    Chỉ xóa file có mtime trước older_than (timestamp): ảnh worker vừa lưu nhưng chưa
+    commit tên vào database, hoặc vừa được dùng lại, không bị xóa nhầm.
+    Trả về (số file, tổng số byte).
+    """
+    referenced = referenced_cas_names()
+    deleted, size = 0, 0
+    for directory, _, files in os.walk(storage.path(CAS_PREFIX)):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            stat = os.stat(path)
+            if name in referenced or stat.st_mtime >= older_than:
+                continue
+            if not dry_run:
+                os.remove(path)
+            deleted += 1
+            size += stat.st_size
+    return deleted, size
+
+
+@deconstructible
+class CloudinaryStorage(Storage):
+    """
+    Lưu ảnh trên Cloudinary với public_id là sha256 nội dung (ảnh trùng không upload lại).
+    Tên lưu trong database giữ định dạng của CloudinaryField cũ nên dữ liệu cũ dùng tiếp được;
+    tên khác định dạng đó là file local cũ trong MEDIA_ROOT.
+    open()/size() của ảnh Cloudinary tải qua URL phân phối: không có file thì raise
+    FileNotFoundError, lỗi mạng hoặc HTTP khác raise OSError (requests.RequestException).
+    """
+
+    def __init__(self, cloud_name=None, api_key=None, api_secret=None, folder='qlsk'):
+        import cloudinary
+
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+        self.folder = folder
+        self.local = FileSystemStorage()
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        import cloudinary.uploader
+
+        public_id = f'{self.folder}/{file_digest(content)}'
+        result = cloudinary.uploader.upload(
+            content, public_id=public_id, overwrite=False, resource_type='image',
+        )
+        return (
+            f"{result['resource_type']}/{result['type']}/v{result['version']}/"
+            f"{result['public_id']}.{result['format']}"
+        )
+
+    def _get(self, name, method='get'):
+        import requests
+
+        response = requests.request(method, self.url(name), stream=True, timeout=CLOUDINARY_TIMEOUT)
+        if response.status_code == 404:
+            response.close()
+            raise FileNotFoundError(f'Không có file trên Cloudinary: {name}')
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+        return response
+
+    def _open(self, name, mode='rb'):
+        if not CLOUDINARY_NAME_RE.match(name):
+            return self.local.open(name, mode)
+        if mode != 'rb':
+            raise ValueError('File trên Cloudinary chỉ mở được để đọc (rb)')
+        f = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_SIZE)
+        try:
+            with self._get(name) as response:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        except BaseException:
+            f.close()
+            raise
+        f.seek(0)
+        return File(f, name=name)
+
+    def url(self, name):
+        match = CLOUDINARY_NAME_RE.match(name)
+        if not match:
+            return self.local.url(name)
+        import cloudinary.utils
+
+        url, _ = cloudinary.utils.cloudinary_url(
+            match.group('public_id'), resource_type=match.group('resource_type'),
+            type=match.group('type'), version=match.group('version'), format=match.group('format'),
+        )
+        return url
+
+    def exists(self, name):
+        # Không gọi API Cloudinary chỉ để kiểm tra
+        return bool(CLOUDINARY_NAME_RE.match(name)) or self.local.exists(name)
+
+    def delete(self, name):
+        # Ảnh dùng chung theo nội dung nên không xóa trên Cloudinary
+        if not CLOUDINARY_NAME_RE.match(name):
+            self.local.delete(name)
+
+    def size(self, name):
+        if not CLOUDINARY_NAME_RE.match(name):
+            return self.local.size(name)
+        with self._get(name, 'head') as response:
+            length = response.headers.get('Content-Length')
+        if length is not None:
+            return int(length)
+        with self.open(name) as f:
+            return f.size
+
+    def path(self, name):
+        return self.local.path(name)
+
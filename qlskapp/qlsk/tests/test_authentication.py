@@ -0,0 +1,85 @@
+"""
+SchemeAuthentication: chọn lớp xác thực theo scheme của header Authorization.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model, get_application_model
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ..authentication import SchemeAuthentication, get_cached_user, user_cache_ttl
+from ..models import User
+
+
+def oauth2_token(user, token='oauth2-access-token'):
+    application = get_application_model().objects.create(
+        name='test', user=user, client_type='confidential', authorization_grant_type='password',
+    )
+    get_access_token_model().objects.create(
+        user=user, application=application, token=token, scope='read write',
+        expires=timezone.now() + timedelta(hours=1),
+    )
+    return token
+
+
+class SchemeAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='auth-user', email='auth@example.com')
+        self.factory = APIRequestFactory()
+
+    def authenticate(self, header=None):
+        extra = {'HTTP_AUTHORIZATION': header} if header else {}
+        return SchemeAuthentication().authenticate(Request(self.factory.get('/api/users/', **extra)))
+
+    def test_bearer_jwt(self):
+        token = RefreshToken.for_user(self.user).access_token
+        user, _ = self.authenticate(f'Bearer {token}')
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_bearer_oauth2(self):
+        user, _ = self.authenticate(f'Bearer {oauth2_token(self.user)}')
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_invalid_bearer_token_rejected(self):
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate('Bearer not-a-token')
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate('Bearer a.b.c')
+
+    def test_other_schemes_fall_through(self):
+        for header in ('Token abc', 'Basic YTpi', 'Token a.b.c', 'Digest'):
+            self.assertIsNone(self.authenticate(header), header)
+
+    def test_blank_header_is_unauthenticated_not_error(self):
+        for header in (' ', '\t '):
+            self.assertIsNone(self.authenticate(header), repr(header))
+        response = self.client.get('/api/calendar/', HTTP_AUTHORIZATION='   ')
+        self.assertEqual(response.status_code, 401)
+
+    def test_other_scheme_is_unauthenticated_not_error(self):
+        response = self.client.get('/api/calendar/', HTTP_AUTHORIZATION='Token abc')
+        self.assertEqual(response.status_code, 401)
+        self.assertNotEqual(response.json().get('code'), 'token_not_valid')
+
+
+class CachedUserTtlTests(TestCase):
+    @override_settings(AUTH_USER_CACHE_TTL=60, AUTH_USER_LOCAL_CACHE_TTL=5)
+    def test_process_local_cache_uses_short_ttl(self):
+        self.assertEqual(user_cache_ttl(), 5)
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'qlsk.metrics.InstrumentedCache',
+            'OPTIONS': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'},
+        }}):
+            self.assertEqual(user_cache_ttl(), 60)
+
+    def test_cached_user_defers_password(self):
+        cache.clear()
+        user = User.objects.create_user(username='ttl-user', password='secret')
+        cached = get_cached_user(user.pk)
+        self.assertIn('password', cached.get_deferred_fields())
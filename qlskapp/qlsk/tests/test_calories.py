@@ -0,0 +1,38 @@
+"""
+Đường tính calo vector hóa (recompute_calories) phải cho cùng kết quả với đường tính trong request.
+"""
+import itertools
+import math
+
+from django.test import SimpleTestCase
+
+from ..calories import calories_batch, exercise_calories, exercise_met_batch
+from ..models import Exercise, User
+
+
+class CaloriesBatchParityTests(SimpleTestCase):
+    def test_batch_matches_scalar(self):
+        # recompute_calories chỉ tính lại các dòng có duration > 0
+        exercises = [
+            Exercise(met=6.0, calories_burned=100, duration=10),
+            Exercise(met=None, calories_burned=100, duration=10),
+            Exercise(met=0, calories_burned=150, duration=20),
+            Exercise(met=None, calories_burned=100, duration=0),
+        ]
+        users = [User(weight=82, age=30), User(weight=None, age=None), User(weight=55, age=None)]
+        cases = list(itertools.product(exercises, users, [45, 600, 1800], [None, 140]))
+
+        def nan(value):
+            return math.nan if value is None else value
+
+        met = exercise_met_batch(
+            [nan(e.met) for e, *_ in cases], [e.calories_burned for e, *_ in cases], [e.duration for e, *_ in cases],
+        )
+        batch = calories_batch(
+            met, [nan(u.weight) for _, u, *_ in cases], [d for *_, d, _ in cases],
+            heart_rate=[nan(hr) for *_, hr in cases], age=[nan(u.age) for _, u, *_ in cases],
+        )
+        for (exercise, user, duration, heart_rate), value in zip(cases, batch):
+            # -1: không tính được, recompute_calories giữ nguyên giá trị cũ (request dùng giá trị client gửi)
+            expected = exercise_calories(exercise, user, duration, heart_rate=heart_rate, reported=-1)
+            self.assertEqual(value, expected, (exercise.met, exercise.duration, user.weight, user.age, duration, heart_rate))
@@ -0,0 +1,103 @@
+"""
+Hàng đợi EmailOutbox: nhận email trong transaction ngắn, gửi SMTP ngoài transaction.
+"""
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection as db_connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from ..emails import LEASE_SECONDS, claim_pending_emails, email_queue, queue_email, send_pending_emails
+from ..models import EmailOutbox
+
+
+class FlakyBackend(EmailBackend):
+    """Backend locmem, lỗi khi gửi tới các địa chỉ trong `fail_for`"""
+
+    def __init__(self, fail_for=(), fail_open=False, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_for = set(fail_for)
+        self.fail_open = fail_open
+        self.seen = []
+
+    def open(self):
+        if self.fail_open:
+            raise ConnectionRefusedError('SMTP down')
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            self.seen.append((message.to[0], db_connection.in_atomic_block, self.row_status(message.to[0])))
+            if message.to[0] in self.fail_for:
+                raise OSError('550 mailbox unavailable')
+        return super().send_messages(messages)
+
+    @staticmethod
+    def row_status(to_email):
+        return EmailOutbox.objects.get(to_email=to_email).status
+
+
+class SendPendingEmailsTests(TestCase):
+    def test_sends_and_marks_each_row(self):
+        for i in range(3):
+            queue_email('OTP', f'body {i}', f'u{i}@example.com')
+        backend = FlakyBackend(fail_for={'u1@example.com'})
+
+        self.assertEqual(send_pending_emails(connection=backend), (2, 1))
+
+        self.assertEqual(len(mail.outbox), 2)
+        rows = {e.to_email: e for e in EmailOutbox.objects.all()}
+        self.assertEqual(rows['u0@example.com'].status, 'sent')
+        self.assertEqual(rows['u0@example.com'].attempts, 1)
+        self.assertIsNotNone(rows['u0@example.com'].sent_at)
+        failed = rows['u1@example.com']
+        self.assertEqual((failed.status, failed.attempts), ('pending', 1))
+        self.assertIn('550', failed.last_error)
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+        # Trong lúc gửi, email đã ở trạng thái 'sending'
+        self.assertEqual({status for _, _, status in backend.seen}, {'sending'})
+
+    def test_open_failure_backs_off_whole_batch(self):
+        queue_email('OTP', 'body', 'a@example.com')
+        self.assertEqual(send_pending_emails(connection=FlakyBackend(fail_open=True)), (0, 1))
+        email = EmailOutbox.objects.get()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertEqual(send_pending_emails(connection=FlakyBackend()), (0, 0))
+
+    def test_gives_up_after_max_attempts(self):
+        email = queue_email('OTP', 'body', 'a@example.com')
+        EmailOutbox.objects.filter(pk=email.pk).update(attempts=4)
+        send_pending_emails(connection=FlakyBackend(fail_for={'a@example.com'}), max_attempts=5)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 5))
+
+    def test_claimed_rows_are_skipped_until_lease_expires(self):
+        queue_email('OTP', 'body', 'a@example.com')
+        now = timezone.now()
+        batch, _ = claim_pending_emails(10, now)
+        self.assertEqual(len(batch), 1)
+        self.assertEqual(claim_pending_emails(10, now)[0], [])
+
+        # Worker đầu chết: hết hạn thuê thì worker khác nhận lại
+        later = now + timedelta(seconds=LEASE_SECONDS + 1)
+        self.assertEqual(len(claim_pending_emails(10, later)[0]), 1)
+
+    def test_stale_worker_does_not_overwrite_new_claim(self):
+        queue_email('OTP', 'body', 'a@example.com')
+        now = timezone.now()
+        (email,), stale_lease = claim_pending_emails(10, now)
+        claim_pending_emails(10, now + timedelta(seconds=LEASE_SECONDS + 1))
+
+        email_queue.mark_failed(email, OSError('timeout'), 5, now, stale_lease)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('sending', 0))
+
+
+class SendOutsideTransactionTests(TransactionTestCase):
+    def test_smtp_runs_outside_transaction(self):
+        queue_email('OTP', 'body', 'a@example.com')
+        backend = FlakyBackend()
+        self.assertEqual(send_pending_emails(connection=backend), (1, 0))
+        self.assertEqual(backend.seen, [('a@example.com', False, 'sending')])
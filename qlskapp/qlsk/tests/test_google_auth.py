@@ -0,0 +1,164 @@
+"""
+Xác thực Google ID token với một máy chủ chứng chỉ giả chạy cục bộ.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..google_auth import GoogleCertCache, verify_google_id_token
+
+CLIENT_ID = 'client-id.apps.googleusercontent.com'
+
+
+def make_key(common_name):
+    """(signer PEM private key, chứng chỉ x509 PEM) tự ký"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+    now = datetime.now(dt_timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    )
+    return private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class FakeKeyServer:
+    """Máy chủ HTTP trả về {kid: chứng chỉ} với Cache-Control max-age, đếm số lần tải"""
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self.keys = {}
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                body = json.dumps({kid: cert for kid, (_, cert) in server.keys.items()}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Cache-Control', f'public, max-age={server.max_age}')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/certs'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def add_key(self, kid):
+        self.keys[kid] = make_key(kid)
+
+    def token(self, kid, audience=CLIENT_ID, issuer='https://accounts.google.com'):
+        from google.auth import crypt, jwt
+
+        signer = crypt.RSASigner.from_string(self.keys[kid][0], key_id=kid)
+        now = int(time.time())
+        return jwt.encode(signer, {
+            'iss': issuer, 'aud': audience, 'email': 'a@example.com', 'iat': now, 'exp': now + 600,
+        }).decode()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@override_settings(CLIENT_ID_GOOGLE=CLIENT_ID, GOOGLE_ID_TOKEN_AUDIENCE=None)
+class VerifyGoogleIdTokenTests(SimpleTestCase):
+    def setUp(self):
+        import requests
+
+        self.server = FakeKeyServer(max_age=3600)
+        self.server.add_key('k1')
+        self.session = requests.Session()
+        self.cache = GoogleCertCache(self.server.url, session=self.session)
+        self.clock = 1000.0
+        patcher = mock.patch('qlsk.google_auth.time.monotonic', side_effect=lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.server.close)
+        self.addCleanup(self.session.close)
+
+    def verify(self, token, **kwargs):
+        return verify_google_id_token(token, cache=self.cache, **kwargs)
+
+    def test_valid_token_uses_cached_certs(self):
+        for _ in range(3):
+            self.assertEqual(self.verify(self.server.token('k1'))['email'], 'a@example.com')
+        self.assertEqual(self.server.requests, 1)
+
+    def test_audience_defaults_to_client_id(self):
+        from google.auth import exceptions
+
+        with self.assertRaises(ValueError):
+            self.verify(self.server.token('k1', audience='other-client'))
+        with override_settings(CLIENT_ID_GOOGLE=None), self.assertRaises(exceptions.GoogleAuthError):
+            self.verify(self.server.token('k1'))
+
+    def test_wrong_issuer_rejected(self):
+        from google.auth import exceptions
+
+        with self.assertRaises(exceptions.GoogleAuthError):
+            self.verify(self.server.token('k1', issuer='https://evil.example.com'))
+
+    def test_certs_refetched_after_max_age(self):
+        self.server.max_age = 120
+        self.verify(self.server.token('k1'))
+        self.assertEqual(self.cache._expires_at - self.cache._fetched_at, 120)
+
+        self.clock = self.cache._expires_at + 1
+        self.verify(self.server.token('k1'))
+        self.assertEqual(self.server.requests, 2)
+
+    def test_unknown_kid_forces_refresh(self):
+        self.verify(self.server.token('k1'))
+        self.server.add_key('k2')
+
+        # Trong MIN_REFRESH_INTERVAL: không tải lại, kid lạ bị từ chối
+        self.clock += 10
+        with self.assertRaises(ValueError):
+            self.verify(self.server.token('k2'))
+        self.assertEqual(self.server.requests, 1)
+
+        # Sau MIN_REFRESH_INTERVAL: tải lại ngay dù chứng chỉ chưa hết hạn
+        self.clock += 60
+        self.assertEqual(self.verify(self.server.token('k2'))['email'], 'a@example.com')
+        self.assertEqual(self.server.requests, 2)
+
+    def test_single_background_refresh_near_expiry(self):
+        self.verify(self.server.token('k1'))
+        self.clock = self.cache._expires_at - 10
+        started, done = threading.Event(), threading.Event()
+
+        def slow_refresh():
+            started.set()
+            done.wait(5)
+
+        with mock.patch.object(self.cache, '_background_refresh', side_effect=slow_refresh) as refresh:
+            threads = [threading.Thread(target=self.cache.get_certs) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertTrue(started.wait(5))
+            done.set()
+        self.assertEqual(refresh.call_count, 1)
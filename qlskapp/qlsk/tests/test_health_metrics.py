@@ -0,0 +1,112 @@
+"""
+Chỉ số trong ngày (bước chân, nhịp tim) không được ghi đè tổng nước đang được cộng dồn;
+lượng nước không hợp lệ bị từ chối; đối soát tổng nước không làm mất dữ liệu cũ.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import HealthMetricsHistory, User, WaterSession
+from ..water import _increment_daily_total, find_water_mismatches, fix_water_mismatches, record_water
+
+
+@contextmanager
+def water_increment_after_first_read(user, amount):
+    """
+    Giả lập request uống nước chen vào giữa: ngay sau câu SQL đầu tiên trên bảng
+    HealthMetricsHistory của request đang chạy, cộng `amount` vào tổng nước của ngày.
+    """
+    injected = []
+
+    def wrapper(execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if not injected and 'qlsk_healthmetricshistory' in sql:
+            injected.append(sql)
+            _increment_daily_total(user, timezone.now().date(), amount)
+        return result
+
+    with connection.execute_wrapper(wrapper):
+        yield injected
+
+
+class DailyMetricsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='metrics-user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def today_row(self):
+        return HealthMetricsHistory.objects.get(user=self.user, date=timezone.now().date())
+
+    def test_steps_keep_concurrent_water_increment(self):
+        record_water(self.user, 1.0)
+        with water_increment_after_first_read(self.user, 0.5) as injected:
+            response = self.client.post('/api/health-metrics/steps/', {'steps': 4200}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(injected)
+        row = self.today_row()
+        self.assertEqual((row.steps, row.water_intake), (4200, 1.5))
+
+    def test_heart_rate_keeps_concurrent_water_increment(self):
+        record_water(self.user, 0.25)
+        with water_increment_after_first_read(self.user, 0.5):
+            self.client.post('/api/health-metrics/heart-rate/', {'heart_rate': 72}, format='json')
+        row = self.today_row()
+        self.assertEqual((row.heart_rate, row.water_intake), (72, 0.75))
+
+    def test_creates_row_for_new_day(self):
+        response = self.client.post('/api/health-metrics/steps/', {'steps': 10}, format='json')
+        self.assertEqual(response.json()['steps'], 10)
+        row = self.today_row()
+        self.assertEqual((row.steps, row.water_intake, row.heart_rate), (10, 0, None))
+        self.client.post('/api/health-metrics/heart-rate/', {'heart_rate': 80}, format='json')
+        row = self.today_row()
+        self.assertEqual((row.steps, row.heart_rate), (10, 80))
+
+    def test_row_created_concurrently_by_water_request(self):
+        # Chưa có dòng: UPDATE không trúng dòng nào, lượt uống nước chen vào tạo dòng trước
+        # -> INSERT vi phạm unique (user, date) và phải quay về UPDATE
+        with water_increment_after_first_read(self.user, 0.5):
+            response = self.client.post('/api/health-metrics/steps/', {'steps': 300}, format='json')
+        self.assertEqual(response.status_code, 200)
+        row = self.today_row()
+        self.assertEqual((row.steps, row.water_intake), (300, 0.5))
+
+
+class WaterIntakeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='water-user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_rejects_non_finite_and_huge_amounts(self):
+        for amount in ['nan', 'inf', '-inf', '1e308', 0, -1]:
+            response = self.client.post('/api/health-metrics/water/', {'amount': amount}, format='json')
+            self.assertEqual(response.status_code, 400, amount)
+            response = self.client.post('/api/water-sessions/', {'amount': amount}, format='json')
+            self.assertEqual(response.status_code, 400, amount)
+        self.assertFalse(WaterSession.objects.exists())
+        self.assertFalse(HealthMetricsHistory.objects.exists())
+
+    def test_reconcile_keeps_legacy_totals(self):
+        today = timezone.now().date()
+        yesterday = today - timedelta(days=1)
+        # Dữ liệu cũ: tổng nước được cộng thẳng vào HealthMetricsHistory, không có WaterSession
+        HealthMetricsHistory.objects.create(user=self.user, date=yesterday, water_intake=1.5)
+        record_water(self.user, 0.25)
+        # Thiếu lượt cộng dồn: tổng WaterSession lớn hơn tổng đã lưu
+        WaterSession.objects.create(user=self.user, date=today, amount=0.5)
+
+        self.assertEqual(find_water_mismatches(user_id=self.user.id), [
+            (self.user.id, yesterday, 1.5, 0),
+            (self.user.id, today, 0.25, 0.75),
+        ])
+        self.assertEqual(fix_water_mismatches(find_water_mismatches(user_id=self.user.id)), (1, 1))
+        self.assertEqual(find_water_mismatches(user_id=self.user.id), [])
+        totals = dict(HealthMetricsHistory.objects.filter(user=self.user).values_list('date', 'water_intake'))
+        self.assertEqual(totals, {yesterday: 1.5, today: 0.75})
+        self.assertEqual(WaterSession.objects.get(user=self.user, date=yesterday).amount, 1.5)
@@ -0,0 +1,143 @@
+"""
+Phục vụ file media (Range), dọn file cas/ không còn được tham chiếu (gc_media) và đọc lại
+ảnh đã lưu trên Cloudinary.
+"""
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+import requests
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..media import RangeNotSatisfiable, parse_range
+from ..models import Exercise
+from ..storage import CloudinaryStorage
+
+MEDIA_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'media': {'BACKEND': 'qlsk.storage.ContentAddressedStorage'},
+}
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_invalid_header_ignored(self):
+        for header in ['bytes=abc', 'items=0-9', 'bytes=-', 'bytes=9-0', 'bytes=0-1,5-6', '']:
+            self.assertIsNone(parse_range(header, 100), header)
+
+    def test_unsatisfiable(self):
+        for header, size in [('bytes=100-', 100), ('bytes=-0', 100), ('bytes=0-9', 0)]:
+            with self.assertRaises(RangeNotSatisfiable, msg=header):
+                parse_range(header, size)
+
+
+class MediaTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root, STORAGES=MEDIA_STORAGES)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.storage = storages['media']
+
+
+class ServeMediaRangeTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.name = self.storage.save('x.jpg', ContentFile(b'0123456789'))
+
+    def get(self, range_header):
+        return self.client.get(f'/media/{self.name}', HTTP_RANGE=range_header)
+
+    def test_partial_content(self):
+        response = self.get('bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+
+    def test_malformed_range_returns_whole_file(self):
+        response = self.get('bytes=abc')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_range_outside_file(self):
+        response = self.get('bytes=50-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+
+class GarbageCollectMediaTests(MediaTestMixin, TestCase):
+    def save(self, content, age_hours):
+        name = self.storage.save('exercises/x.webp', ContentFile(content))
+        mtime = time.time() - age_hours * 3600
+        os.utime(self.storage.path(name), (mtime, mtime))
+        return name
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_deletes_only_old_unreferenced_files(self):
+        used = self.save(b'used', 48)
+        unused = self.save(b'unused', 48)
+        fresh = self.save(b'fresh', 1)
+        Exercise.objects.create(name='Squat', description='', duration=10, calories_burned=50, thumbnail=used)
+
+        self.assertIn('Sẽ xóa 1 file', self.gc('--dry-run'))
+        self.assertTrue(self.storage.exists(unused))
+        self.assertIn('Đã xóa 1 file', self.gc())
+        self.assertEqual(
+            [self.storage.exists(name) for name in (used, unused, fresh)], [True, False, True],
+        )
+
+    def test_reused_file_is_not_collected(self):
+        name = self.save(b'shared', 48)
+        # Upload trùng nội dung dùng lại file cũ: mtime mới nên chưa bị xóa dù chưa có tham chiếu
+        self.assertEqual(self.storage.save('meals/y.webp', ContentFile(b'shared')), name)
+        self.assertIn('Đã xóa 0 file', self.gc())
+        self.assertTrue(self.storage.exists(name))
+
+
+class CloudinaryOpenTests(SimpleTestCase):
+    name = 'image/upload/v1700000000/qlsk/abc.webp'
+
+    def setUp(self):
+        self.storage = CloudinaryStorage(cloud_name='demo')
+
+    def response(self, status, content=b''):
+        response = mock.MagicMock(status_code=status, headers={'Content-Length': str(len(content))})
+        response.__enter__.return_value = response
+        response.iter_content.return_value = [content[:3], content[3:]]
+        response.raise_for_status.side_effect = None if status < 400 else requests.HTTPError(status)
+        return response
+
+    def test_open_downloads_from_delivery_url(self):
+        with mock.patch('requests.request', return_value=self.response(200, b'webp-bytes')) as request:
+            with self.storage.open(self.name) as f:
+                self.assertEqual(f.read(), b'webp-bytes')
+        self.assertEqual(request.call_args.args[1], self.storage.url(self.name))
+        with mock.patch('requests.request', return_value=self.response(200, b'webp-bytes')):
+            self.assertEqual(self.storage.size(self.name), 10)
+
+    def test_missing_or_failed_download_raises_os_error(self):
+        with mock.patch('requests.request', return_value=self.response(404)):
+            with self.assertRaises(FileNotFoundError):
+                self.storage.open(self.name)
+        with mock.patch('requests.request', return_value=self.response(503)):
+            with self.assertRaises(OSError):
+                self.storage.open(self.name)
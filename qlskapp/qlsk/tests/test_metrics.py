@@ -0,0 +1,22 @@
+"""
+/metrics chỉ đọc được với METRICS_TOKEN; chưa đặt token thì chỉ mở khi DEBUG.
+"""
+from django.test import TestCase, override_settings
+
+
+class MetricsViewTests(TestCase):
+    @override_settings(METRICS_TOKEN='secret')
+    def test_requires_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'qlsk_http_request_duration_seconds', response.content)
+
+    @override_settings(METRICS_TOKEN=None, DEBUG=False)
+    def test_hidden_without_token_outside_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICS_TOKEN=None, DEBUG=True)
+    def test_open_without_token_in_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
@@ -0,0 +1,108 @@
+"""
+OTP đặt lại mật khẩu: giới hạn tần suất, tra cứu user, xóa mã OTP khỏi hàng đợi email.
+"""
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..emails import REDACTED_BODY, send_pending_emails
+from ..models import EmailOutbox, User
+from ..ratelimit import TokenBucket
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_limit_and_retry_after(self):
+        bucket = TokenBucket('test', 3, 10)
+        now = 1000.0
+        self.assertEqual([bucket.allow('k', now)[0] for _ in range(4)], [True, True, True, False])
+        self.assertEqual(bucket.allow('k', now + 4), (False, 6))
+        # Hồi 1 token sau 10 giây
+        self.assertEqual([bucket.allow('k', now + 10)[0] for _ in range(2)], [True, False])
+        self.assertTrue(bucket.allow('other', now)[0])
+
+    def test_no_double_burst(self):
+        # Bộ đếm theo cửa sổ cho 3 lần ở cuối cửa sổ và 3 lần ngay đầu cửa sổ sau
+        bucket = TokenBucket('test', 3, 10)
+        results = [bucket.allow('k', 29.9)[0] for _ in range(3)]
+        results += [bucket.allow('k', 30.1)[0] for _ in range(3)]
+        self.assertEqual(results.count(True), 3)
+        self.assertEqual(sum(bucket.allow('k', 60)[0] for _ in range(4)), 3)
+
+    def test_reset(self):
+        bucket = TokenBucket('test', 1, 60)
+        bucket.allow('k')
+        self.assertFalse(bucket.allow('k')[0])
+        bucket.reset('k')
+        self.assertTrue(bucket.allow('k')[0])
+
+    def test_concurrent_requests_never_exceed_capacity(self):
+        bucket = TokenBucket('test', 5, 60)
+        barrier = threading.Barrier(20)
+        results = []
+
+        def hit():
+            barrier.wait()
+            results.append(bucket.allow('k')[0])
+
+        threads = [threading.Thread(target=hit) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results.count(True), 5)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PasswordResetFlowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='otp-user', email='otp.user@example.com', password='old')
+
+    def request_otp(self, email):
+        self.assertEqual(self.client.post('/api/auth/password/send-otp/', {'email': email}).status_code, 200)
+        return EmailOutbox.objects.latest('id')
+
+    def test_confirm_with_differently_cased_email(self):
+        outbox = self.request_otp('OTP.User@Example.com ')
+        otp = outbox.body.rsplit(' ', 1)[-1]
+        response = self.client.post(
+            '/api/auth/password/confirm-otp/', {'email': 'Otp.User@EXAMPLE.com', 'otp': otp, 'new_password': 'new-pass'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-pass'))
+
+    def test_non_string_fields_rejected(self):
+        for email in [123, ['a@example.com'], {'email': 'a@example.com'}]:
+            response = self.client.post('/api/auth/password/send-otp/', {'email': email}, format='json')
+            self.assertEqual(response.status_code, 400, email)
+            response = self.client.post(
+                '/api/auth/password/confirm-otp/', {'email': email, 'otp': '123456', 'new_password': 'x'}, format='json',
+            )
+            self.assertEqual(response.status_code, 400, email)
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    def test_otp_removed_from_outbox_after_send(self):
+        outbox = self.request_otp(self.user.email)
+        self.assertTrue(outbox.sensitive)
+        self.assertEqual(send_pending_emails(), (1, 0))
+        outbox.refresh_from_db()
+        self.assertEqual((outbox.status, outbox.body), ('sent', REDACTED_BODY))
+
+    def test_purge_redacts_expired_unsent_otps(self):
+        outbox = self.request_otp(self.user.email)
+        EmailOutbox.objects.filter(pk=outbox.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        call_command('purge_expired_otps', stdout=StringIO())
+        outbox.refresh_from_db()
+        self.assertEqual((outbox.status, outbox.body), ('failed', REDACTED_BODY))
+        self.assertEqual(send_pending_emails(), (0, 0))
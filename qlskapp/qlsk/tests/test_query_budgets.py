@@ -0,0 +1,396 @@
+"""
+Ngân sách số câu SQL cho mọi API khai báo trong qlsk/urls.py.
+
+Mỗi API được gọi với dữ liệu mẫu ở nhiều quy mô (SCALES dòng mỗi bảng cho mỗi user):
+số câu SQL phải như nhau ở mọi quy mô (không có N+1) và không vượt ngân sách trong
+query_budgets.json. Khi lỗi, thông báo liệt kê các câu SQL (fingerprint) tăng theo dữ liệu.
+
+Cập nhật bảng ngân sách sau khi thay đổi có chủ ý:
+    UPDATE_QUERY_BUDGETS=1 python manage.py test qlsk.tests.test_query_budgets
+"""
+import json
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import time, timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import URLResolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .. import urls as qlsk_urls
+from ..metrics import query_fingerprint
+from ..models import (
+    DietGoal, Exercise, HealthJournal, HealthMetricsHistory, Meal, MealPlan, RecurringTrainingSchedule,
+    Reminder, TrainingSchedule, TrainingSession, User, WaterSession, WorkoutExercise, WorkoutSession,
+    WorkoutTemplate, WorkoutTemplateExercise,
+)
+from ..otp import create_otp
+
+BUDGETS_PATH = Path(__file__).with_name('query_budgets.json')
+# Số dòng mỗi bảng cho mỗi user
+SCALES = (10, 100, 1000)
+# Số bài tập trong mỗi buổi tập/mẫu và số bữa mỗi thực đơn: cố định, không đổi theo quy mô
+ITEMS_PER_PARENT = 3
+API_PREFIX = '/api/'
+_GROUP_RE = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+_CONVERTER_RE = re.compile(r'<\w+:(\w+)>')
+# Kết quả giả của generate_nutrition_plan (không gọi AI khi đo số câu SQL)
+FAKE_MEAL_PLAN = """Thực đơn giảm cân
+Thực đơn ít tinh bột, nhiều rau.
+Calo: 1800, Protein: 120g, Carbs: 150g, Fat: 60g
+Bữa sáng
+- Tên món: Yến mạch
+- Calo: 400
+Bữa trưa
+- Tên món: Cơm gạo lứt
+- Calo: 600
+Bữa tối
+- Tên món: Salad gà
+- Calo: 500
+Bữa phụ
+- Tên món: Sữa chua
+- Calo: 300
+"""
+
+
+def route_key(method, route):
+    return f'{method} {route}'
+
+
+def normalize_route(pattern):
+    """'^users/(?P<pk>[^/.]+)/$' -> 'users/<pk>/', 'meal-plans/<int:pk>/' -> 'meal-plans/<pk>/'"""
+    route = _CONVERTER_RE.sub(r'<\1>', _GROUP_RE.sub(r'<\1>', str(pattern)))
+    return route.lstrip('^').rstrip('$')
+
+
+def api_routes(patterns=None, prefix=''):
+    """
+    (key, route, method) cho mọi API DRF trong qlsk/urls.py, gồm cả các route của router.
+    Bỏ qua URLconf của thư viện (oauth2_provider, dj_rest_auth, allauth), api-root và
+    các route có hậu tố định dạng (.json).
+    """
+    for pattern in qlsk_urls.urlpatterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            # include(router.urls) là list; include('app.urls') là URLconf của thư viện
+            if isinstance(pattern.urlconf_name, list):
+                yield from api_routes(pattern.url_patterns, prefix + normalize_route(pattern.pattern))
+            continue
+        route = prefix + normalize_route(pattern.pattern)
+        callback = pattern.callback
+        view_class = getattr(callback, 'cls', None)
+        if view_class is None or '<format>' in route or pattern.name == 'api-root':
+            continue
+        # ViewSet: các method trong actions (DRF tự thêm head); APIView: các handler được định nghĩa
+        actions = getattr(callback, 'actions', None)
+        methods = list(actions) if actions else [m for m in view_class.http_method_names if hasattr(view_class, m)]
+        for method in methods:
+            if method in ('head', 'options'):
+                continue
+            yield route_key(method.upper(), route), route, method
+
+
+@contextmanager
+def capture_sql():
+    """
+    Ghi lại mọi câu SQL qua execute_wrapper. Không dùng CaptureQueriesContext vì
+    connection.queries_log chỉ giữ 9000 câu (đầy sau khi tạo dữ liệu mẫu lớn).
+    """
+    captured = []
+
+    def wrapper(execute, sql, params, many, context):
+        captured.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield captured
+
+
+def load_budgets():
+    if not BUDGETS_PATH.exists():
+        return {}
+    return json.loads(BUDGETS_PATH.read_text(encoding='utf-8'))
+
+
+class Fixture:
+    """Dữ liệu mẫu: một user thường (client của expert), mỗi bảng `scale` dòng"""
+
+    def __init__(self, scale):
+        today = timezone.now().date()
+        now = timezone.now()
+        self.scale = scale
+        self.expert = User.objects.create_user('budget-expert', 'budget-expert@example.com', 'pass', role='expert')
+        self.user = User.objects.create_user(
+            'budget-user', 'budget-user@example.com', 'pass',
+            expert=self.expert, height=170, weight=65, age=30,
+        )
+        # Các user khác cùng chuyên gia (danh sách user, my-clients, new-linked-users)
+        User.objects.bulk_create(
+            User(username=f'budget-client-{i}', email=f'budget-client-{i}@example.com', expert=self.expert)
+            for i in range(scale)
+        )
+        Exercise.objects.bulk_create(
+            Exercise(name=f'Bài tập {i}', description='', duration=10, calories_burned=50, met=4,
+                     is_custom=i % 2 == 0, user=self.user if i % 2 == 0 else None)
+            for i in range(scale)
+        )
+        exercises = list(Exercise.objects.order_by('id')[:ITEMS_PER_PARENT])
+        self.exercise = Exercise.objects.filter(user=self.user).first()
+
+        RecurringTrainingSchedule.objects.bulk_create(
+            RecurringTrainingSchedule(user=self.user, time=time(6, i % 60), weekdays=0b1111111, start_date=today)
+            for i in range(scale)
+        )
+        self.recurrence = RecurringTrainingSchedule.objects.filter(user=self.user).first()
+        TrainingSchedule.objects.bulk_create(
+            TrainingSchedule(user=self.user, date=today + timedelta(days=i % 30), time=time(7))
+            for i in range(scale)
+        )
+        schedules = list(TrainingSchedule.objects.filter(user=self.user))
+        self.schedule = schedules[0]
+        TrainingSession.objects.bulk_create(
+            TrainingSession(schedule=schedule, exercise=exercises[0], duration=20) for schedule in schedules
+        )
+        self.training_session = TrainingSession.objects.filter(schedule__user=self.user).first()
+        Reminder.objects.bulk_create(
+            Reminder(user=self.user, reminder_type='water', time=time(8), message=f'Uống nước {i}')
+            for i in range(scale)
+        )
+        self.reminder = Reminder.objects.filter(user=self.user).first()
+
+        WorkoutSession.objects.bulk_create(WorkoutSession(user=self.user, total_calories=100) for _ in range(scale))
+        sessions = list(WorkoutSession.objects.filter(user=self.user))
+        # Trải đều các buổi tập trong 30 ngày gần đây (start_time là auto_now_add)
+        for i, session in enumerate(sessions):
+            session.start_time = now - timedelta(days=i % 30)
+        WorkoutSession.objects.bulk_update(sessions, ['start_time'])
+        WorkoutExercise.objects.bulk_create(
+            WorkoutExercise(workout_session=session, exercise=exercise, duration=600, calories_burned=30)
+            for session in sessions for exercise in exercises
+        )
+        self.workout_session = sessions[0]
+        WorkoutTemplate.objects.bulk_create(
+            WorkoutTemplate(user=self.user, name=f'Mẫu {i}', exercise_count=ITEMS_PER_PARENT) for i in range(scale)
+        )
+        templates = list(WorkoutTemplate.objects.filter(user=self.user))
+        WorkoutTemplateExercise.objects.bulk_create(
+            WorkoutTemplateExercise(template=template, exercise=exercise, order=order)
+            for template in templates for order, exercise in enumerate(exercises)
+        )
+        self.template = templates[0]
+
+        HealthJournal.objects.bulk_create(
+            HealthJournal(user=self.user, content=f'<p>Chạy bộ buổi sáng {i}</p>', search_text=f'chay bo buoi sang {i}',
+                          excerpt=f'Chạy bộ buổi sáng {i}', word_count=5)
+            for i in range(scale)
+        )
+        self.journal = HealthJournal.objects.filter(user=self.user).first()
+        HealthMetricsHistory.objects.bulk_create(
+            HealthMetricsHistory(user=self.user, date=today - timedelta(days=i), water_intake=1.5, steps=5000, heart_rate=70)
+            for i in range(scale)
+        )
+        WaterSession.objects.bulk_create(
+            WaterSession(user=self.user, date=today - timedelta(days=i % 30), amount=0.25) for i in range(scale)
+        )
+
+        DietGoal.objects.bulk_create(
+            DietGoal(user=self.user, goal_type='weight_loss', target_weight=60) for _ in range(scale)
+        )
+        self.diet_goal = DietGoal.objects.filter(user=self.user).first()
+        MealPlan.objects.bulk_create(
+            MealPlan(user=self.user, diet_goal=self.diet_goal, title=f'Thực đơn {i}', description='',
+                     total_calories=1800, protein=100, carbs=200, fat=60)
+            for i in range(scale)
+        )
+        plans = list(MealPlan.objects.filter(user=self.user))
+        Meal.objects.bulk_create(
+            Meal(meal_plan=plan, meal_type='lunch', name='Cơm', description='', calories=600, protein=30,
+                 carbs=80, fat=15, ingredients='Gạo', instructions='Nấu')
+            for plan in plans for _ in range(ITEMS_PER_PARENT)
+        )
+        self.meal_plan = plans[0]
+
+
+def facebook_session(email):
+    session = mock.Mock()
+    session.get.return_value.json.return_value = {'id': '1', 'name': 'Budget', 'email': email}
+    return mock.patch('qlsk.views.http_session', return_value=session)
+
+
+# Cách gọi từng API: user ('user' hoặc 'expert'; None = không đăng nhập), tham số đường dẫn
+# (kwargs), query string (params), body (data), format ('json'/'multipart') và mock (patch).
+# Các API không có trong bảng: GET bằng user thường, không tham số.
+CASES = {
+    'GET users/': {'user': None},
+    'GET users/my-clients/': {'user': 'expert'},
+    'GET users/new-linked-users/': {'user': 'expert'},
+    'POST users/link_expert/': {'data': lambda f: {'expert_id': f.expert.id}},
+    'PUT users/profile/': {'data': lambda f: {'age': 31}},
+    'POST users/register/': {'user': None, 'data': lambda f: {
+        'username': 'budget-new', 'email': 'budget-new@example.com', 'password': 'pass', 'password2': 'pass', 'role': 'user',
+    }},
+    'GET users/<pk>/': {'kwargs': lambda f: {'pk': f.user.id}},
+    'POST exercises/': {'format': 'multipart', 'data': lambda f: {
+        'name': 'Plank', 'description': 'Giữ thẳng người', 'duration': 5, 'calories_burned': 20,
+    }},
+    'GET exercises/<pk>/': {'kwargs': lambda f: {'pk': f.exercise.id}},
+    'PUT exercises/<pk>/': {'format': 'multipart', 'kwargs': lambda f: {'pk': f.exercise.id}, 'data': lambda f: {'duration': 15}},
+    'DELETE exercises/<pk>/': {'kwargs': lambda f: {'pk': f.exercise.id}},
+    'POST training-schedules/': {'data': lambda f: {'user': f.user.id, 'date': str(timezone.now().date()), 'time': '07:00'}},
+    'GET training-schedules/<pk>/': {'kwargs': lambda f: {'pk': f.schedule.id}},
+    'POST recurring-training-schedules/': {'data': lambda f: {
+        'time': '06:00', 'weekdays': [0, 2, 4], 'start_date': str(timezone.now().date()),
+    }},
+    'GET recurring-training-schedules/<pk>/': {'kwargs': lambda f: {'pk': f.recurrence.id}},
+    'PUT recurring-training-schedules/<pk>/': {'kwargs': lambda f: {'pk': f.recurrence.id}, 'data': lambda f: {'weekdays': [1, 3]}},
+    'DELETE recurring-training-schedules/<pk>/': {'kwargs': lambda f: {'pk': f.recurrence.id}},
+    'POST training-sessions/': {'format': 'multipart', 'data': lambda f: {
+        'recurrence': f.recurrence.id, 'date': str(timezone.now().date()), 'custom_exercise_name': 'Chạy bộ', 'duration': 30,
+    }},
+    'GET training-sessions/<pk>/': {'kwargs': lambda f: {'pk': f.training_session.id}},
+    'PUT training-sessions/<pk>/': {'format': 'multipart', 'kwargs': lambda f: {'pk': f.training_session.id}, 'data': lambda f: {'duration': 25}},
+    'POST training-sessions/<pk>/add_feedback/': {
+        'format': 'multipart', 'kwargs': lambda f: {'pk': f.training_session.id}, 'data': lambda f: {'feedback': 'Tốt'},
+    },
+    'POST reminders/': {'data': lambda f: {'reminder_type': 'water', 'time': '09:00', 'message': 'Uống nước'}},
+    'GET reminders/<pk>/': {'kwargs': lambda f: {'pk': f.reminder.id}},
+    'PUT reminders/<pk>/': {'kwargs': lambda f: {'pk': f.reminder.id}, 'data': lambda f: {'enabled': False}},
+    'DELETE reminders/<pk>/': {'kwargs': lambda f: {'pk': f.reminder.id}},
+    'POST reminders/flexible/': {'data': lambda f: {'reminder_type': 'water', 'time': '10:00', 'message': 'Uống nước'}},
+    'POST workout-sessions/': {'data': lambda f: {'exercises': [{'id': f.exercise.id}, {'id': f.exercise.id}]}},
+    'GET workout-sessions/<pk>/': {'kwargs': lambda f: {'pk': f.workout_session.id}},
+    'POST workout-sessions/<pk>/complete_exercise/': {
+        'kwargs': lambda f: {'pk': f.workout_session.id},
+        'data': lambda f: {'exercise_id': f.workout_session.exercises.first().id, 'duration': 300},
+    },
+    'POST workout-sessions/<pk>/complete-exercises/': {
+        'kwargs': lambda f: {'pk': f.workout_session.id},
+        'data': lambda f: {'exercises': [
+            {'exercise_id': ex_id, 'duration': 300} for ex_id in f.workout_session.exercises.values_list('id', flat=True)
+        ], 'complete_workout': True},
+    },
+    'POST workout-sessions/<pk>/complete_workout/': {'kwargs': lambda f: {'pk': f.workout_session.id}},
+    'POST workout-templates/': {'data': lambda f: {'name': 'Mẫu mới', 'exercises': [f.exercise.id, f.exercise.id]}},
+    'GET workout-templates/<pk>/': {'kwargs': lambda f: {'pk': f.template.id}},
+    'DELETE workout-templates/<pk>/': {'kwargs': lambda f: {'pk': f.template.id}},
+    'POST workout-templates/<pk>/start/': {'kwargs': lambda f: {'pk': f.template.id}},
+    'POST journals/': {'data': lambda f: {'content': '<p>Hôm nay chạy 5km</p>'}},
+    'GET journals/search/': {'params': {'q': 'chạy bộ'}},
+    'GET journals/<pk>/': {'kwargs': lambda f: {'pk': f.journal.id}},
+    'POST register/': {'user': None, 'data': lambda f: {
+        'username': 'budget-new', 'email': 'budget-new@example.com', 'password': 'pass', 'password2': 'pass', 'role': 'user',
+    }},
+    'PUT auth/profile/': {'data': lambda f: {'age': 31}},
+    'POST auth/jwt/token/': {'user': None, 'data': lambda f: {'username': 'budget-user', 'password': 'pass'}},
+    'POST auth/jwt/token/refresh/': {'user': None, 'data': lambda f: {'refresh': str(RefreshToken.for_user(f.user))}},
+    'POST auth/jwt/token/verify/': {'user': None, 'data': lambda f: {'token': str(RefreshToken.for_user(f.user).access_token)}},
+    'POST auth/password/send-otp/': {'user': None, 'data': lambda f: {'email': f.user.email}},
+    'POST auth/password/confirm-otp/': {'user': None, 'data': lambda f: {
+        'email': f.user.email, 'otp': create_otp(f.user.email), 'new_password': 'new-pass',
+    }},
+    'POST auth/google-login/': {
+        'user': None, 'data': lambda f: {'access_token': 'token'},
+        'patch': lambda f: mock.patch('qlsk.views.verify_google_id_token', return_value={'email': f.user.email}),
+    },
+    'POST auth/facebook-login/': {
+        'user': None, 'data': lambda f: {'access_token': 'token'}, 'patch': lambda f: facebook_session(f.user.email),
+    },
+    'GET users/<user_id>/statistics/': {'kwargs': lambda f: {'user_id': f.user.id}},
+    'POST health-metrics/water/': {'data': lambda f: {'amount': 0.25}},
+    'POST health-metrics/steps/': {'data': lambda f: {'steps': 8000}},
+    'POST health-metrics/heart-rate/': {'data': lambda f: {'heart_rate': 72}},
+    'POST health-metrics/bmi/': {'data': lambda f: {'bmi': 22.5}},
+    'GET training-history/': {'params': {'days': 30}},
+    'GET training-statistics/': {'params': {'mode': 'month'}},
+    'POST water-sessions/': {'data': lambda f: {'amount': 0.25}},
+    'GET water/analytics/': {'params': {'window': '30d'}},
+    'GET calendar/': {'params': {'to': str(timezone.now().date() + timedelta(days=29))}},
+    'POST diet-goals/': {'data': lambda f: {'goal_type': 'weight_loss', 'target_weight': 60}},
+    'POST meal-plans/generate/': {
+        'patch': lambda f: mock.patch('qlsk.views.generate_nutrition_plan', return_value=FAKE_MEAL_PLAN),
+    },
+    'GET meal-plans/<pk>/': {'kwargs': lambda f: {'pk': f.meal_plan.id}},
+}
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    CALENDAR_QUERY_WORKERS=1,
+)
+class QueryBudgetTests(TestCase):
+    maxDiff = None
+
+    def test_every_route_has_budget(self):
+        budgets = load_budgets()
+        missing = [key for key, _, _ in api_routes() if key not in budgets]
+        stale = sorted(set(budgets) - {key for key, _, _ in api_routes()})
+        self.assertEqual(missing, [], f'Thêm ngân sách cho các API mới vào {BUDGETS_PATH.name}')
+        self.assertEqual(stale, [], f'Xóa các API không còn tồn tại khỏi {BUDGETS_PATH.name}')
+
+    def call(self, fixture, route, method):
+        case = CASES.get(route_key(method.upper(), route), {})
+        client = APIClient()
+        role = case.get('user', 'user')
+        if role:
+            token = RefreshToken.for_user(getattr(fixture, role)).access_token
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        path = route
+        for name, value in (case['kwargs'](fixture) if 'kwargs' in case else {}).items():
+            path = path.replace(f'<{name}>', str(value))
+        data = case['data'](fixture) if 'data' in case else None
+        if method == 'get':
+            data = case.get('params')
+        patcher = case['patch'](fixture) if 'patch' in case else nullcontext()
+        # Cache rỗng trước mỗi lần gọi để số câu SQL không phụ thuộc lần gọi trước
+        cache.clear()
+        with patcher, capture_sql() as queries:
+            response = getattr(client, method)(API_PREFIX + path, data, format=case.get('format', 'json'))
+        self.assertLess(
+            response.status_code, 400,
+            f'{method.upper()} {path}: {response.status_code} {getattr(response, "data", "")}',
+        )
+        return queries
+
+    def measure(self, scale):
+        """Số câu SQL của từng API ở một quy mô; mỗi lần gọi chạy trong savepoint rồi rollback"""
+        results = {}
+        with transaction.atomic():
+            fixture = Fixture(scale)
+            for key, route, method in api_routes():
+                with transaction.atomic():
+                    results[key] = self.call(fixture, route, method)
+                    transaction.set_rollback(True)
+            transaction.set_rollback(True)
+        return results
+
+    def test_query_counts_are_constant_and_within_budget(self):
+        by_scale = {scale: self.measure(scale) for scale in SCALES}
+        smallest, largest = by_scale[SCALES[0]], by_scale[SCALES[-1]]
+        if os.getenv('UPDATE_QUERY_BUDGETS') == '1':
+            budgets = {key: len(queries) for key, queries in sorted(largest.items())}
+            BUDGETS_PATH.write_text(json.dumps(budgets, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        budgets = load_budgets()
+        for key in smallest:
+            with self.subTest(key):
+                counts = {scale: len(results[key]) for scale, results in by_scale.items()}
+                if len(set(counts.values())) > 1:
+                    self.fail(f'{key}: số câu SQL tăng theo dữ liệu {counts}\n' + self.grown_queries(smallest[key], largest[key]))
+                if key in budgets and counts[SCALES[0]] > budgets[key]:
+                    self.fail(
+                        f'{key}: {counts[SCALES[0]]} câu SQL, ngân sách {budgets[key]}\n'
+                        + '\n'.join(f'  {n} x {fp}' for fp, n in Counter(map(query_fingerprint, largest[key])).most_common())
+                    )
+
+    @staticmethod
+    def grown_queries(small, large):
+        small, large = Counter(map(query_fingerprint, small)), Counter(map(query_fingerprint, large))
+        return '\n'.join(
+            f'  {small[fp]} -> {n} x {fp}' for fp, n in large.most_common() if n != small[fp]
+        )
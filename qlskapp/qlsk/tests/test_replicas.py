@@ -0,0 +1,113 @@
+"""
+Đọc từ replica với hai database SQLite riêng: danh sách đọc replica, sau khi ghi đọc primary
+(kể cả client không giữ cookie), và bắt buộc cache chung khi bật replica.
+"""
+import copy
+import shutil
+import tempfile
+import warnings
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from .. import replicas
+from ..checks import check_replica_cache, replica_cache_error
+from ..models import HealthJournal, User
+
+REPLICA = 'replica'
+
+
+def instrumented_cache(backend):
+    return {'default': {'BACKEND': 'qlsk.metrics.InstrumentedCache', 'OPTIONS': {'BACKEND': backend}}}
+
+
+class ReplicaCacheCheckTests(SimpleTestCase):
+    databases_with_replica = {DEFAULT_DB_ALIAS: {}, REPLICA: {}}
+
+    def test_local_cache_rejected_with_replica(self):
+        for backend in ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache'):
+            self.assertIsNotNone(replica_cache_error(self.databases_with_replica, instrumented_cache(backend), REPLICA))
+
+    def test_shared_cache_accepted_with_replica(self):
+        caches = instrumented_cache('django.core.cache.backends.redis.RedisCache')
+        self.assertIsNone(replica_cache_error(self.databases_with_replica, caches, REPLICA))
+
+    def test_local_cache_allowed_without_replica(self):
+        caches = instrumented_cache('django.core.cache.backends.locmem.LocMemCache')
+        self.assertIsNone(replica_cache_error({DEFAULT_DB_ALIAS: {}}, caches, REPLICA))
+        with override_settings(CACHES=caches):
+            self.assertEqual(check_replica_cache(None), [])
+
+
+class TwoDatabaseReplicaTests(TransactionTestCase):
+    """
+    Replica là một database SQLite thứ hai (không có replication): dữ liệu chỉ có trên
+    replica cho biết request đã đọc từ đâu. Alias replica chỉ được thêm khi lớp test này chạy
+    (test runner chạy system check với các alias trong databases trước khi tạo database test).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        replica = copy.deepcopy(connections.settings[DEFAULT_DB_ALIAS])
+        replica['TEST'] = {**replica['TEST'], 'MIRROR': None, 'NAME': None}
+        cls._settings = override_settings(
+            DATABASES={**settings.DATABASES, REPLICA: replica},
+            DATABASE_REPLICA_ALIAS=REPLICA,
+            # Cache chung giữa các tiến trình như Redis khi chạy thật
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cls.cache_dir,
+            }},
+        )
+        with warnings.catch_warnings():
+            # Chỉ thêm alias, các alias có sẵn không đổi
+            warnings.filterwarnings('ignore', 'Overriding setting DATABASES')
+            cls._settings.enable()
+        connections.settings[REPLICA] = replica
+        cls._old_replica_name = connections[REPLICA].creation.create_test_db(verbosity=0, serialize=False)
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].creation.destroy_test_db(cls._old_replica_name, verbosity=0)
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        cls._settings.disable()
+        shutil.rmtree(cls.cache_dir)
+
+    def setUp(self):
+        replicas._replica_health.clear()
+        self.user = User.objects.create(username='replica-user')
+        User.objects.using(REPLICA).create(pk=self.user.pk, username='replica-user')
+        HealthJournal.objects.using(REPLICA).create(user_id=self.user.pk, content='<p>Bản trên replica</p>')
+
+    def client_for(self, user):
+        # Client dùng token: mỗi request là một client mới, không giữ cookie
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def list_excerpts(self):
+        response = self.client_for(self.user).get('/api/journals/')
+        self.assertEqual(response.status_code, 200)
+        return [journal['excerpt'] for journal in response.json()]
+
+    def test_list_reads_from_replica(self):
+        self.assertEqual(self.list_excerpts(), ['Bản trên replica'])
+
+    def test_reads_primary_after_write_without_cookie(self):
+        response = self.client_for(self.user).post('/api/journals/', {'content': '<p>Vừa ghi</p>'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.cookies[settings.REPLICA_STICKY_COOKIE].value)
+        self.assertEqual(HealthJournal.objects.using(REPLICA).filter(content='<p>Vừa ghi</p>').count(), 0)
+        # Đánh dấu nằm trong cache chung nên request sau thấy dữ liệu vừa ghi dù không gửi cookie
+        self.assertEqual(self.list_excerpts(), ['Vừa ghi'])
+
+    def test_writes_go_to_primary(self):
+        self.client_for(self.user).post('/api/journals/', {'content': '<p>Ghi</p>'}, format='json')
+        self.assertEqual(HealthJournal.objects.using(DEFAULT_DB_ALIAS).count(), 1)
+        self.assertEqual(HealthJournal.objects.using(REPLICA).count(), 1)
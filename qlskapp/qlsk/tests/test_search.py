@@ -0,0 +1,64 @@
+"""
+Tìm nhật ký: từ tiếng Việt 2 chữ (ăn, da, ...) phải tìm được; migration backfill theo lô.
+"""
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ..models import HealthJournal, User
+from ..search import mysql_match_terms, starts_word
+
+
+class JournalSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='journal-user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        contents = ['<p>Hôm nay ăn cơm gạo lứt</p>', '<p>Làn da khô vì thiếu nước</p>', '<p>Đi bộ 5km</p>']
+        self.journals = [HealthJournal.objects.create(user=self.user, content=content) for content in contents]
+
+    def search(self, query):
+        response = self.client.get('/api/journals/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_two_letter_terms(self):
+        eat, skin, walk = self.journals
+        self.assertEqual(self.search('ăn'), [eat.id])
+        self.assertEqual(self.search('da'), [skin.id])
+        self.assertEqual(self.search('Đi bộ'), [walk.id])
+        self.assertEqual(self.search('ăn cơm'), [eat.id])
+
+    def test_short_terms_filtered_by_word_prefix(self):
+        # Đường LIKE dùng cho từ ngắn trên MySQL: khớp đầu từ, không khớp giữa từ ("lan" không khớp "an")
+        eat, skin, walk = self.journals
+        matches = HealthJournal.objects.filter(user=self.user)
+        self.assertEqual(list(matches.filter(starts_word('an')).values_list('id', flat=True)), [eat.id])
+        self.assertEqual(list(matches.filter(starts_word('di')).values_list('id', flat=True)), [walk.id])
+
+    @override_settings(SEARCH_MYSQL_MIN_TOKEN_SIZE=3)
+    def test_mysql_terms_below_min_token_size_use_like(self):
+        self.assertEqual(mysql_match_terms(['an', 'com', 'gao', 'da']), ('+com* +gao*', ['an', 'da']))
+        self.assertEqual(mysql_match_terms(['an']), ('', ['an']))
+
+
+class SearchBackfillMigrationTests(TestCase):
+    def test_backfill_in_batches(self):
+        user = User.objects.create(username='journal-backfill')
+        # bulk_create không gọi save() nên search_text/excerpt còn trống như dữ liệu cũ
+        HealthJournal.objects.bulk_create(
+            HealthJournal(user=user, content=f'<p>Ăn sáng lần {i}</p>') for i in range(5)
+        )
+        search_text = import_module('qlsk.migrations.0039_healthjournal_search_text')
+        summary = import_module('qlsk.migrations.0040_healthjournal_excerpt_word_count')
+        with mock.patch.object(search_text, 'BATCH_SIZE', 2), mock.patch.object(summary, 'BATCH_SIZE', 2):
+            search_text.fill_search_text(apps, None)
+            summary.fill_summary(apps, None)
+        rows = HealthJournal.objects.filter(user=user).order_by('id')
+        self.assertEqual(
+            [(j.search_text, j.excerpt, j.word_count) for j in rows],
+            [(f'an sang lan {i}', f'Ăn sáng lần {i}', 4) for i in range(5)],
+        )
@@ -0,0 +1,141 @@
+"""
+Hàng đợi ảnh upload: xử lý ngoài transaction, file gốc xóa sau commit, ảnh gốc không lộ qua /media/.
+Storage là ContentAddressedStorage trên thư mục tạm (thay cho Cloudinary).
+"""
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from .. import uploads
+from ..models import Exercise, ImageUpload
+from ..uploads import claim_pending_uploads, process_pending_uploads
+
+
+class UploadTestMixin:
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.media_root = os.path.join(root, 'media')
+        self.pending_dir = os.path.join(root, 'pending')
+        os.makedirs(self.pending_dir)
+        settings = override_settings(
+            MEDIA_ROOT=self.media_root,
+            IMAGE_UPLOAD_PENDING_DIR=self.pending_dir,
+            IMAGE_UPLOAD_IN_PROCESS_WORKER=False,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+                'media': {'BACKEND': 'qlsk.storage.ContentAddressedStorage'},
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Pillow chạy trong luồng thay vì process pool (spawn chậm khi chạy test)
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        patcher = mock.patch.object(uploads, 'get_process_pool', return_value=executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.exercise = Exercise.objects.create(name='Push-up', description='', duration=10, calories_burned=50)
+
+    def queue(self, content=None):
+        path = os.path.join(self.pending_dir, f'{ImageUpload.objects.count()}.png')
+        if content is None:
+            Image.new('RGB', (64, 48), 'red').save(path, 'PNG')
+        else:
+            with open(path, 'wb') as f:
+                f.write(content)
+        upload = ImageUpload.objects.create(
+            model='qlsk.exercise', object_id=self.exercise.pk, field_name='image', path=path,
+        )
+        return upload
+
+
+class ProcessUploadsTests(UploadTestMixin, TestCase):
+    def test_source_removed_only_after_commit(self):
+        upload = self.queue()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(process_pending_uploads(), (1, 0))
+            self.assertTrue(os.path.exists(upload.path))
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(os.path.exists(upload.path))
+        upload.refresh_from_db()
+        self.exercise.refresh_from_db()
+        self.assertEqual((upload.status, upload.attempts), ('done', 1))
+        self.assertTrue(self.exercise.image.name.startswith('cas/'))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, self.exercise.thumbnail.name)))
+        # Ảnh WebP trung gian không còn trong thư mục chờ
+        self.assertEqual(os.listdir(self.pending_dir), [])
+
+    def test_failed_render_keeps_source_for_retry(self):
+        upload = self.queue(content=b'not an image')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(process_pending_uploads(), (0, 1))
+        self.assertEqual(callbacks, [])
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.attempts), ('pending', 1))
+        self.assertGreater(upload.next_attempt_at, timezone.now())
+        self.assertTrue(os.path.exists(upload.path))
+
+    def test_source_removed_after_last_attempt(self):
+        upload = self.queue(content=b'not an image')
+        self.assertEqual(process_pending_uploads(max_attempts=1), (0, 1))
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.attempts), ('failed', 1))
+        self.assertFalse(os.path.exists(upload.path))
+
+    def test_reclaimed_upload_not_overwritten_by_stale_worker(self):
+        self.queue()
+        (upload,), lease_until = claim_pending_uploads(10)
+        # Worker khác nhận lại ảnh sau khi hạn thuê của lần nhận này hết
+        ImageUpload.objects.filter(pk=upload.pk).update(next_attempt_at=lease_until + timedelta(seconds=1))
+        with self.captureOnCommitCallbacks() as callbacks:
+            uploads._mark_done(upload, {'image': 'cas/stale.webp'}, lease_until)
+        self.assertEqual(callbacks, [])
+        self.exercise.refresh_from_db()
+        self.assertFalse(self.exercise.image)
+        self.assertEqual(ImageUpload.objects.get(pk=upload.pk).status, 'processing')
+
+
+class ProcessUploadsTransactionTests(UploadTestMixin, TransactionTestCase):
+    def test_storage_io_runs_outside_transaction(self):
+        upload = self.queue()
+        in_atomic = []
+        store_variants = uploads._store_variants
+
+        def recording_store(*args):
+            in_atomic.append(connection.in_atomic_block)
+            return store_variants(*args)
+
+        with mock.patch.object(uploads, '_store_variants', recording_store):
+            self.assertEqual(process_pending_uploads(), (1, 0))
+        self.assertEqual(in_atomic, [False])
+        self.assertFalse(os.path.exists(upload.path))
+
+
+class ServeMediaTests(UploadTestMixin, TestCase):
+    def write(self, directory, name):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(b'image')
+
+    def test_pending_uploads_not_served(self):
+        self.write(os.path.join(self.media_root, 'pending'), 'old.jpg')
+        self.write(os.path.join(self.media_root, 'exercises'), 'ok.jpg')
+        self.assertEqual(self.client.get('/media/pending/old.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/exercises/ok.jpg').status_code, 200)
+
+    def test_pending_dir_configured_inside_media_root_not_served(self):
+        pending_dir = os.path.join(self.media_root, 'queue')
+        self.write(pending_dir, 'raw.jpg')
+        with override_settings(IMAGE_UPLOAD_PENDING_DIR=pending_dir):
+            self.assertEqual(self.client.get('/media/queue/raw.jpg').status_code, 404)
@@ -0,0 +1,108 @@
+"""
+Hoàn thành bài tập trong buổi tập: chọn đúng dòng khi bài tập trùng, tổng calo đúng khi đồng thời.
+"""
+import threading
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from rest_framework.test import APIClient
+
+from ..models import Exercise, User, WorkoutExercise, WorkoutSession
+
+
+def make_session(user, exercise, count):
+    session = WorkoutSession.objects.create(user=user)
+    rows = WorkoutExercise.objects.bulk_create(
+        [WorkoutExercise(workout_session=session, exercise=exercise) for _ in range(count)]
+    )
+    return session, sorted(rows, key=lambda row: row.pk)
+
+
+class CompleteExerciseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='workout-user', weight=70)
+        self.exercise = Exercise.objects.create(name='Squat', description='', duration=10, calories_burned=50, met=5.0)
+        self.session, self.rows = make_session(self.user, self.exercise, 2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def complete(self, **data):
+        return self.client.post(
+            f'/api/workout-sessions/{self.session.pk}/complete_exercise/', {'duration': 600, **data}, format='json',
+        )
+
+    def test_duplicate_exercise_addressed_by_workout_exercise_id(self):
+        first, second = self.rows
+        response = self.complete(workout_exercise_id=second.pk, exercise_id=self.exercise.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['workout_exercise']['id'], second.pk)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.duration, second.duration), (0, 600))
+
+    def test_exercise_id_only_updates_first_row(self):
+        response = self.complete(exercise_id=self.exercise.pk)
+        self.assertEqual(response.json()['workout_exercise']['id'], self.rows[0].pk)
+
+    def test_workout_exercise_of_another_session_not_found(self):
+        other_session, (other_row,) = make_session(self.user, self.exercise, 1)
+        self.assertEqual(self.complete(workout_exercise_id=other_row.pk).status_code, 404)
+
+    def test_complete_exercises_by_workout_exercise_id(self):
+        first, second = self.rows
+        response = self.client.post(
+            f'/api/workout-sessions/{self.session.pk}/complete-exercises/',
+            {'exercises': [
+                {'workout_exercise_id': second.pk, 'duration': 300},
+                {'exercise_id': self.exercise.pk, 'duration': 600},
+            ]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        # Bài tập chỉ có exercise_id ghép với dòng còn lại, không ghi đè dòng đã chỉ định
+        self.assertEqual((first.duration, second.duration), (600, 300))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.total_calories, first.calories_burned + second.calories_burned)
+
+
+# SQLite (DB test trong bộ nhớ) khóa cả bảng khi ghi đồng thời: chỉ chạy trên MySQL/PostgreSQL
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentCompleteExerciseTests(TransactionTestCase):
+    THREADS = 6
+
+    def test_concurrent_completions_keep_total_calories(self):
+        user = User.objects.create(username='workout-concurrent', weight=70)
+        exercise = Exercise.objects.create(name='Plank', description='', duration=5, calories_burned=20, met=4.0)
+        session, rows = make_session(user, exercise, self.THREADS)
+        barrier = threading.Barrier(self.THREADS)
+        statuses = []
+
+        def complete(row, duration):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                response = client.post(
+                    f'/api/workout-sessions/{session.pk}/complete_exercise/',
+                    {'workout_exercise_id': row.pk, 'duration': duration}, format='json',
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=complete, args=(row, 60 * (i + 1))) for i, row in enumerate(rows)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(statuses, [200] * self.THREADS)
+        session.refresh_from_db()
+        calories = list(WorkoutExercise.objects.filter(workout_session=session).values_list('calories_burned', flat=True))
+        self.assertTrue(all(calories))
+        # Mỗi request cộng phần chênh lệch của mình: không request nào làm mất phần của request khác
+        self.assertEqual(session.total_calories, sum(calories))
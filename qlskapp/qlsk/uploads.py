@@ -0,0 +1,179 @@
+"""
+Đường xử lý ảnh upload.
+
+1. Request: multipart đã được ghi ra file tạm (TemporaryFileUploadHandler), view chỉ
+   chuyển file sang IMAGE_UPLOAD_PENDING_DIR và thêm một dòng ImageUpload.
+2. Worker (luồng nền trong tiến trình web hoặc lệnh process_image_uploads):
+   nhận một lô job trong transaction ngắn, tạo ảnh WebP và thumbnail trong process
+   pool, lưu qua storage của ImageField (qlsk.storage: ổ đĩa theo sha256 hoặc
+   Cloudinary) rồi cập nhật đối tượng và job; file gốc bị xóa sau khi commit.
+
+IMAGE_UPLOAD_PENDING_DIR nằm ngoài MEDIA_ROOT: ảnh gốc chưa xử lý không được phục vụ qua /media/.
+"""
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .imaging import render_webp_variants
+from .job_queue import LeasedQueue
+from .models import ImageUpload
+
+MAX_ATTEMPTS = 5
+LEASE_SECONDS = 600  # Ảnh 'processing' quá thời gian này được coi như worker đã chết
+
+upload_queue = LeasedQueue(ImageUpload, 'processing', LEASE_SECONDS)
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+# Một luồng nền duy nhất để các lần kích hoạt không chạy chồng lên nhau
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-upload')
+
+
+def get_process_pool():
+    """Process pool cho Pillow, dùng spawn để tiến trình con không kế thừa kết nối DB"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _process_pool
+
+
+def queue_image_upload(instance, field_name, uploaded_file):
+    """
+    Giữ file upload trên ổ đĩa và tạo job xử lý. Chỉ tốn thời gian di chuyển file,
+    ảnh sẽ được gán vào instance.field_name khi worker xử lý xong.
+    """
+    os.makedirs(settings.IMAGE_UPLOAD_PENDING_DIR, exist_ok=True)
+    extension = os.path.splitext(uploaded_file.name)[1].lower()[:10]
+    path = os.path.join(settings.IMAGE_UPLOAD_PENDING_DIR, f'{uuid.uuid4().hex}{extension}')
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        file_move_safe(uploaded_file.temporary_file_path(), path)
+    else:
+        with open(path, 'wb') as destination:
+            for chunk in uploaded_file.chunks():
+                destination.write(chunk)
+    upload = ImageUpload.objects.create(
+        model=instance._meta.label_lower,
+        object_id=instance.pk,
+        field_name=field_name,
+        path=path,
+    )
+    if settings.IMAGE_UPLOAD_IN_PROCESS_WORKER:
+        transaction.on_commit(lambda: _background.submit(_run_in_background))
+    return upload
+
+
+def _run_in_background():
+    close_old_connections()
+    try:
+        process_pending_uploads()
+    finally:
+        close_old_connections()
+
+
+def claim_pending_uploads(batch_size, now=None):
+    """Nhận một lô ảnh đến hạn (chuyển sang 'processing'), trả về (danh sách ảnh, hạn thuê)"""
+    return upload_queue.claim(batch_size, now)
+
+
+def process_pending_uploads(batch_size=10, max_attempts=MAX_ATTEMPTS):
+    """
+    Xử lý một lô ảnh đến hạn: Pillow chạy song song trong process pool, sau đó
+    đẩy từng ảnh lên nơi lưu trữ. Xử lý và upload chạy ngoài transaction (không giữ
+    khóa dòng), mỗi ảnh được ghi kết quả riêng. Trả về (số ảnh xong, số ảnh lỗi).
+    """
+    now = timezone.now()
+    batch, lease_until = claim_pending_uploads(batch_size, now)
+    if not batch:
+        return 0, 0
+    pool = get_process_pool()
+    futures = [
+        pool.submit(
+            render_webp_variants, upload.path,
+            settings.IMAGE_MAX_DIMENSION, settings.IMAGE_THUMBNAIL_SIZE,
+        )
+        for upload in batch
+    ]
+    done, failed = 0, 0
+    for upload, future in zip(batch, futures):
+        try:
+            full_path, thumbnail_path = future.result()
+            try:
+                changes = _store_variants(upload, full_path, thumbnail_path)
+            finally:
+                for path in (full_path, thumbnail_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+        except Exception as e:
+            _mark_failed(upload, e, max_attempts, now, lease_until)
+            failed += 1
+        else:
+            _mark_done(upload, changes, lease_until)
+            done += 1
+    return done, failed
+
+
+def _mark_done(upload, changes, lease_until):
+    """Gán ảnh vào đối tượng cùng transaction với trạng thái; file gốc chỉ bị xóa sau khi commit"""
+    upload.status = 'done'
+    upload.attempts += 1
+    upload.last_error = None
+    upload.processed_at = timezone.now()
+    with transaction.atomic():
+        claimed = upload_queue.update_claimed(
+            upload, lease_until,
+            status='done', attempts=F('attempts') + 1, last_error=None, processed_at=upload.processed_at,
+        )
+        if not claimed:
+            return
+        if changes:
+            apps.get_model(upload.model).objects.filter(pk=upload.object_id).update(**changes)
+        transaction.on_commit(lambda: _remove_file(upload.path))
+
+
+def _mark_failed(upload, error, max_attempts, now, lease_until):
+    """Hẹn xử lý lại; hết lượt thì xóa luôn file gốc vì không còn lần xử lý nào dùng đến"""
+    claimed = upload_queue.mark_failed(upload, error, max_attempts, now, lease_until)
+    if claimed and upload.status == 'failed':
+        _remove_file(upload.path)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _store_variants(upload, full_path, thumbnail_path):
+    """
+    Đẩy ảnh và thumbnail lên nơi lưu trữ, trả về các trường cần gán vào đối tượng
+    (None nếu đối tượng đã bị xóa)
+    """
+    model = apps.get_model(upload.model)
+    instance = model.objects.filter(pk=upload.object_id).first()
+    if instance is None:
+        return None
+    field = model._meta.get_field(upload.field_name)
+    name = f'{uuid.uuid4().hex}.webp'
+    with open(full_path, 'rb') as f:
+        value = field.storage.save(field.generate_filename(instance, name), File(f))
+    changes = {upload.field_name: value}
+    if any(f.name == 'thumbnail' for f in model._meta.fields):
+        thumbnail_field = model._meta.get_field('thumbnail')
+        with open(thumbnail_path, 'rb') as f:
+            changes['thumbnail'] = thumbnail_field.storage.save(thumbnail_field.generate_filename(instance, name), File(f))
+    return changes
@@ -1,9 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    UserViewSet, ExerciseViewSet, TrainingScheduleViewSet,
-    TrainingSessionViewSet, ReminderViewSet, HealthJournalViewSet, UserStatisticsView, FlexibleReminderView, SendOTPView, ConfirmOTPView, GoogleLoginAPIView, FacebookLoginAPIView, WorkoutSessionViewSet, HealthMetricsViewSet,
-    TrainingHistoryView, TrainingStatisticsView, WaterSessionListCreateView,
+    UserViewSet, ExerciseViewSet, TrainingScheduleViewSet, RecurringTrainingScheduleViewSet,
+    TrainingSessionViewSet, ReminderViewSet, HealthJournalViewSet, UserStatisticsView, FlexibleReminderView, SendOTPView, ConfirmOTPView, GoogleLoginAPIView, FacebookLoginAPIView, WorkoutSessionViewSet, WorkoutTemplateViewSet, HealthMetricsViewSet,
+    TrainingHistoryView, TrainingStatisticsView, WaterSessionListCreateView, CalendarView, WaterAnalyticsView,
     create_diet_goal, get_diet_goals, generate_meal_plan, get_meal_plans, MealPlanDetailView,
 )
 from rest_framework.authtoken.views import obtain_auth_token
@@ -18,13 +18,17 @@ router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'exercises', ExerciseViewSet, basename='exercise')
 router.register(r'training-schedules', TrainingScheduleViewSet, basename='trainingschedule')
+router.register(r'recurring-training-schedules', RecurringTrainingScheduleViewSet, basename='recurringtrainingschedule')
 router.register(r'training-sessions', TrainingSessionViewSet, basename='trainingsession')
 router.register(r'reminders', ReminderViewSet, basename='reminder')
 router.register(r'workout-sessions', WorkoutSessionViewSet, basename='workoutsession')
+router.register(r'workout-templates', WorkoutTemplateViewSet, basename='workouttemplate')
 router.register(r'journals', HealthJournalViewSet, basename='journal')
 router.register(r'health-metrics', HealthMetricsViewSet, basename='health-metrics')
 
 urlpatterns = [
+    # Đặt trước router: reminders/<pk>/ của router cũng khớp với 'flexible'
+    path('reminders/flexible/', FlexibleReminderView.as_view(), name='flexible-reminder'),
     path('', include(router.urls)),
     path('register/', UserViewSet.as_view({'post': 'register'}), name='register'),
     
@@ -57,7 +61,6 @@ urlpatterns = [
     
     # Other URLs
     path('users/<int:user_id>/statistics/', UserStatisticsView.as_view(), name='user-statistics'),    
-    path('reminders/flexible/', FlexibleReminderView.as_view(), name='flexible-reminder'),
     
     path('health-metrics/get/', HealthMetricsViewSet.as_view({'get': 'get_health_metrics'}), name='get-health-metrics'),
     path('health-metrics/water/', HealthMetricsViewSet.as_view({'post': 'update_water_intake'}), name='update-water-intake'),
@@ -68,6 +71,8 @@ urlpatterns = [
     path('training-history/', TrainingHistoryView.as_view(), name='training-history'),
     path('training-statistics/', TrainingStatisticsView.as_view(), name='training-statistics'),
     path('water-sessions/', WaterSessionListCreateView.as_view(), name='water-session-list-create'),
+    path('water/analytics/', WaterAnalyticsView.as_view(), name='water-analytics'),
+    path('calendar/', CalendarView.as_view(), name='calendar'),
     
     # Nutrition URLs
     path('diet-goals/', create_diet_goal, name='create-diet-goal'),
@@ -1,37 +1,54 @@
 from rest_framework import viewsets, permissions, status, parsers
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from .models import User, Exercise, TrainingSchedule, TrainingSession, Reminder, HealthJournal, PasswordResetOTP, WorkoutSession, WorkoutExercise, HealthMetricsHistory, WaterSession, DietGoal, MealPlan, Meal
+from .models import User, Exercise, TrainingSchedule, TrainingSession, Reminder, HealthJournal, WorkoutSession, WorkoutExercise, HealthMetricsHistory, WaterSession, DietGoal, MealPlan, Meal, WorkoutTemplate, WorkoutTemplateExercise, RecurringTrainingSchedule
 from .serializers import (
-    UserSerializer, ExerciseSerializer, TrainingScheduleSerializer,
-    TrainingSessionSerializer, ReminderSerializer, HealthJournalSerializer,
-    RegisterSerializer, WorkoutSessionSerializer, WorkoutExerciseSerializer, HealthMetricsHistorySerializer, WaterSessionSerializer, DietGoalSerializer, MealPlanSerializer, MealSerializer, MealPlanDetailSerializer
+    UserSerializer, UserListSerializer, ExerciseSerializer, TrainingScheduleSerializer,
+    TrainingSessionSerializer, ReminderSerializer, HealthJournalSerializer, HealthJournalListSerializer,
+    RegisterSerializer, WorkoutSessionSerializer, WorkoutExerciseSerializer, HealthMetricsHistorySerializer, WaterSessionSerializer, DietGoalSerializer, MealPlanSerializer, MealSerializer, MealPlanDetailSerializer,
+    WorkoutTemplateSerializer, WorkoutTemplateDetailSerializer, RecurringTrainingScheduleSerializer
 )
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, datetime, time, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import json
+import logging
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import action, api_view, permission_classes
 from .permissions import IsOwnerOrReadOnly, IsExpert, IsOwnerOrExpert
-import random
-from django.core.mail import send_mail
+from .emails import queue_email
+from .otp import create_otp, consume_otp, normalize_email, send_otp_email_bucket, send_otp_ip_bucket, confirm_otp_bucket
+from .ratelimit import get_client_ip
+from .authentication import invalidate_cached_users
 from django.contrib.auth import get_user_model
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from .google_auth import http_session, verify_google_id_token
+from .calories import exercise_calories, session_calories_sum
+from .water import record_water, set_daily_metrics, water_analytics, ANALYTICS_WINDOWS
+from .search import search_journals, make_snippet, query_terms
+from .uploads import queue_image_upload
+from .replicas import ReplicaReadMixin, reads_from_replica
+from .metrics import instrument_queries, track_http
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.db import models
-from django.db.models import Sum, Count
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Sum, Count, F, Q
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import generics
-import openai
 from django.conf import settings
-from openai import OpenAI
-import requests
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 import os
 import re
 
+logger = logging.getLogger(__name__)
+
 # User ViewSet (chỉ đăng ký, lấy/cập nhật profile)
-class UserViewSet(viewsets.GenericViewSet):
+class UserViewSet(ReplicaReadMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
+    replica_actions = ('list', 'experts', 'my_clients')
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
@@ -42,12 +59,31 @@ class UserViewSet(viewsets.GenericViewSet):
             queryset = queryset.filter(role=role)
         return queryset
 
+    def get_user_list_serializer(self, queryset):
+        """
+        Serializer cho các API trả về danh sách user.
+        Mặc định chỉ trả về id, username, email, role; dùng ?fields=profile để lấy
+        đầy đủ hoặc ?fields=id,username,bmi để chọn từng trường.
+        Chỉ SELECT các cột cần thiết thay vì toàn bộ bảng User.
+        """
+        fields_param = self.request.query_params.get('fields')
+        if not fields_param:
+            return UserListSerializer(queryset.only(*UserListSerializer.Meta.fields), many=True)
+        if fields_param == 'profile':
+            fields = list(UserSerializer.Meta.fields)
+        else:
+            fields = [f for f in fields_param.split(',') if f in UserSerializer.Meta.fields] or ['id']
+        if 'num_clients' in fields:
+            queryset = queryset.annotate(num_clients_count=Count('clients'))
+        queryset = queryset.only('id', *[f for f in fields if f != 'num_clients'])
+        return UserSerializer(queryset, many=True, fields=fields)
+
     @action(detail=False, methods=['post'])
     def register(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            return Response({"message": "Đăng ký thành công", "user": UserSerializer(user).data}, status=status.HTTP_201_CREATED)
+            return Response({"message": "Đăng ký thành công", "user": UserListSerializer(user).data}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['get', 'put'], permission_classes=[permissions.IsAuthenticated])
@@ -77,14 +113,14 @@ class UserViewSet(viewsets.GenericViewSet):
 
     def list(self, request):
         queryset = self.get_queryset()
-        serializer = UserSerializer(queryset, many=True)
+        serializer = self.get_user_list_serializer(queryset)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def experts(self, request):
         """API lấy danh sách chuyên gia"""
         experts = User.objects.filter(role='expert')
-        serializer = UserSerializer(experts, many=True)
+        serializer = self.get_user_list_serializer(experts)
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
@@ -106,25 +142,26 @@ class UserViewSet(viewsets.GenericViewSet):
         """API cho chuyên gia lấy danh sách user mới liên kết (chưa thông báo)"""
         if request.user.role != 'expert':
             return Response({'detail': 'Chỉ chuyên gia mới có quyền.'}, status=403)
-        new_users = request.user.clients.filter(notified_expert=False)
-        serializer = UserSerializer(new_users, many=True)
+        new_users = User.objects.filter(expert=request.user, notified_expert=False)
+        serializer = self.get_user_list_serializer(new_users)
+        data = serializer.data
         # Đánh dấu đã thông báo
         new_users.update(notified_expert=True)
-        return Response(serializer.data)
+        invalidate_cached_users([u.id for u in serializer.instance])
+        return Response(data)
 
     @action(detail=False, methods=['get'], url_path='my-clients', permission_classes=[permissions.IsAuthenticated])
     def my_clients(self, request):
         try:
-            print("User:", request.user)
-            print("Role:", getattr(request.user, 'role', None))
-            print("Clients:", getattr(request.user, 'clients', None))
+            logger.debug('my_clients', extra={'user_id': request.user.id, 'role': request.user.role, 'sample_rate': 0.1})
             if request.user.role != 'expert':
                 return Response({'detail': 'Chỉ chuyên gia mới có quyền xem danh sách này.'}, status=403)
-            clients = request.user.clients.all()
-            serializer = UserSerializer(clients, many=True)
+            # Không dùng request.user.clients: related manager đọc expert_id (bị only() bỏ qua) từng dòng
+            clients = User.objects.filter(expert=request.user)
+            serializer = self.get_user_list_serializer(clients)
             return Response(serializer.data)
         except Exception as e:
-            print("Error in my_clients:", str(e))
+            logger.exception('Lỗi my_clients', extra={'user_id': request.user.id})
             return Response({'detail': str(e)}, status=400)
 
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
@@ -143,7 +180,7 @@ class UserViewSet(viewsets.GenericViewSet):
             if pk_int <= 0:
                 raise ValueError()
         except Exception:
-            print("Lỗi retrieve user, pk nhận được:", pk)
+            logger.info('retrieve user: pk không hợp lệ', extra={'pk': pk, 'sample_rate': 0.1})
             return Response({'detail': 'Invalid user id.'}, status=400)
         try:
             user = User.objects.get(pk=pk)
@@ -153,8 +190,9 @@ class UserViewSet(viewsets.GenericViewSet):
         return Response(serializer.data)
 
 # Exercise ViewSet (chỉ list, retrieve)
-class ExerciseViewSet(viewsets.ViewSet):
+class ExerciseViewSet(ReplicaReadMixin, viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('list',)
     parser_classes = [parsers.MultiPartParser]
     def list(self, request):
         # Bài tập hệ thống hoặc bài tập cá nhân của user
@@ -174,11 +212,17 @@ class ExerciseViewSet(viewsets.ViewSet):
         return Response(serializer.data)
     def create(self, request):
         # Chỉ cho phép user tạo bài tập cá nhân
-        data = request.data.copy()
+        # dict() thay vì copy(): copy() deepcopy cả file upload (file tạm không deepcopy được)
+        data = request.data.dict()
         data['is_custom'] = True
         serializer = ExerciseSerializer(data=data)
         if serializer.is_valid():
-            serializer.save(user=request.user, is_custom=True)
+            # Ảnh được xử lý và upload ở worker nền, request không chờ lưu ảnh
+            image = serializer.validated_data.pop('image', None)
+            with transaction.atomic():
+                exercise = serializer.save(user=request.user, is_custom=True)
+                if image:
+                    queue_image_upload(exercise, 'image', image)
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
     def update(self, request, pk=None):
@@ -187,21 +231,65 @@ class ExerciseViewSet(viewsets.ViewSet):
             return Response({"detail": "Not found or permission denied."}, status=404)
         serializer = ExerciseSerializer(exercise, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
-            serializer.save()
+            image = serializer.validated_data.pop('image', None)
+            with transaction.atomic():
+                serializer.save()
+                if image:
+                    queue_image_upload(exercise, 'image', image)
+            if 'duration' in serializer.validated_data or 'calories_burned' in serializer.validated_data:
+                # Cập nhật tóm tắt của các mẫu buổi tập có bài tập này
+                WorkoutTemplate.refresh_summaries(
+                    list(WorkoutTemplate.objects.filter(items__exercise=exercise).values_list('id', flat=True).distinct())
+                )
             return Response(serializer.data)
         return Response(serializer.errors, status=400)
     def destroy(self, request, pk=None):
         exercise = Exercise.objects.filter(pk=pk, user=request.user, is_custom=True).first()
         if not exercise:
             return Response({"detail": "Not found or permission denied."}, status=404)
+        template_ids = list(WorkoutTemplate.objects.filter(items__exercise=exercise).values_list('id', flat=True).distinct())
         exercise.delete()
+        WorkoutTemplate.refresh_summaries(template_ids)
         return Response(status=204)
 
+def get_date_range(request, default_days=30, max_days=366):
+    """Đọc ?from=YYYY-MM-DD&to=YYYY-MM-DD, mặc định từ hôm nay đến default_days ngày sau"""
+    try:
+        start = date.fromisoformat(request.query_params['from']) if request.query_params.get('from') else timezone.now().date()
+        end = date.fromisoformat(request.query_params['to']) if request.query_params.get('to') else start + timedelta(days=default_days - 1)
+    except ValueError:
+        raise ValidationError({'detail': 'Ngày không hợp lệ, định dạng YYYY-MM-DD.'})
+    if end < start:
+        raise ValidationError({'detail': 'Ngày kết thúc phải sau ngày bắt đầu.'})
+    if (end - start).days + 1 > max_days:
+        raise ValidationError({'detail': f'Khoảng thời gian tối đa {max_days} ngày.'})
+    return start, end
+
+def expand_training_schedules(user, start, end):
+    """
+    Lịch tập trong [start, end]: các dòng TrainingSchedule đã có cộng với các lần tập
+    sinh từ lịch lặp lại (chưa lưu, id = None). Chi phí chỉ phụ thuộc độ dài khoảng ngày.
+    """
+    schedules = list(TrainingSchedule.objects.filter(user=user, date__range=[start, end]))
+    materialized = {(s.recurrence_id, s.date) for s in schedules if s.recurrence_id}
+    rules = RecurringTrainingSchedule.objects.filter(user=user, start_date__lte=end).filter(
+        models.Q(end_date__isnull=True) | models.Q(end_date__gte=start)
+    )
+    for rule in rules:
+        for day in rule.occurrences(start, end):
+            if (rule.id, day) not in materialized:
+                schedules.append(TrainingSchedule(user_id=user.id, date=day, time=rule.time, recurrence=rule))
+    schedules.sort(key=lambda s: (s.date, s.time))
+    return schedules
+
 # Training Schedule ViewSet (list, create, retrieve)
-class TrainingScheduleViewSet(viewsets.ViewSet):
+class TrainingScheduleViewSet(ReplicaReadMixin, viewsets.ViewSet):
     permission_classes = [IsOwnerOrReadOnly]
+    replica_actions = ('list',)
     def list(self, request):
-        schedules = TrainingSchedule.objects.filter(user=request.user)
+        # Chỉ trả về lịch trong khoảng ?from=&to= (mặc định 30 ngày tới)
+        start, end = get_date_range(request)
+        schedules = expand_training_schedules(request.user, start, end)
         serializer = TrainingScheduleSerializer(schedules, many=True)
         return Response(serializer.data)
     def create(self, request):
@@ -217,18 +305,83 @@ class TrainingScheduleViewSet(viewsets.ViewSet):
         serializer = TrainingScheduleSerializer(schedule)
         return Response(serializer.data)
 
+# Recurring Training Schedule ViewSet (list, create, retrieve, update, destroy)
+class RecurringTrainingScheduleViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('list',)
+    def list(self, request):
+        rules = RecurringTrainingSchedule.objects.filter(user=request.user)
+        serializer = RecurringTrainingScheduleSerializer(rules, many=True)
+        return Response(serializer.data)
+    def create(self, request):
+        serializer = RecurringTrainingScheduleSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(user=request.user)
+            return Response(serializer.data, status=201)
+        return Response(serializer.errors, status=400)
+    def retrieve(self, request, pk=None):
+        rule = RecurringTrainingSchedule.objects.filter(pk=pk, user=request.user).first()
+        if not rule:
+            return Response({"detail": "Not found."}, status=404)
+        serializer = RecurringTrainingScheduleSerializer(rule)
+        return Response(serializer.data)
+    def update(self, request, pk=None):
+        rule = RecurringTrainingSchedule.objects.filter(pk=pk, user=request.user).first()
+        if not rule:
+            return Response({"detail": "Not found."}, status=404)
+        serializer = RecurringTrainingScheduleSerializer(rule, data=request.data, partial=True)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data)
+        return Response(serializer.errors, status=400)
+    def destroy(self, request, pk=None):
+        # Các lần tập đã có buổi tập (TrainingSchedule) vẫn được giữ lại
+        deleted, _ = RecurringTrainingSchedule.objects.filter(pk=pk, user=request.user).delete()
+        if not deleted:
+            return Response({"detail": "Not found."}, status=404)
+        return Response(status=204)
+
+def materialize_occurrence(user, recurrence_id, day):
+    """Tạo (hoặc lấy) TrainingSchedule cho một lần tập của lịch lặp lại"""
+    try:
+        day = date.fromisoformat(str(day))
+        rule = RecurringTrainingSchedule.objects.filter(pk=int(recurrence_id), user=user).first()
+    except (TypeError, ValueError):
+        return None, 'Dữ liệu không hợp lệ.'
+    if not rule:
+        return None, 'Không tìm thấy lịch lặp lại.'
+    if next(rule.occurrences(day, day), None) is None:
+        return None, 'Ngày này không thuộc lịch lặp lại.'
+    schedule, _ = TrainingSchedule.objects.get_or_create(
+        recurrence=rule, date=day, defaults={'user': user, 'time': rule.time}
+    )
+    return schedule, None
+
 # Training Session ViewSet (list, create, retrieve, add feedback)
-class TrainingSessionViewSet(viewsets.ViewSet):
+class TrainingSessionViewSet(ReplicaReadMixin, viewsets.ViewSet):
     permission_classes = [IsOwnerOrReadOnly]
+    replica_actions = ('list',)
     parser_classes = [parsers.MultiPartParser]
     def list(self, request):
         sessions = TrainingSession.objects.filter(schedule__user=request.user)
         serializer = TrainingSessionSerializer(sessions, many=True)
         return Response(serializer.data)
     def create(self, request):
-        serializer = TrainingSessionSerializer(data=request.data)
+        data = request.data
+        if not data.get('schedule') and data.get('recurrence') and data.get('date'):
+            # Gắn buổi tập vào một lần của lịch lặp lại: lúc này mới tạo dòng TrainingSchedule
+            schedule, error = materialize_occurrence(request.user, data.get('recurrence'), data.get('date'))
+            if error:
+                return Response({'detail': error}, status=400)
+            data = data.dict() if hasattr(data, 'dict') else dict(data)
+            data['schedule'] = schedule.id
+        serializer = TrainingSessionSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
+            image = serializer.validated_data.pop('image', None)
+            with transaction.atomic():
+                session = serializer.save()
+                if image:
+                    queue_image_upload(session, 'image', image)
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
     def retrieve(self, request, pk=None):
@@ -243,7 +396,11 @@ class TrainingSessionViewSet(viewsets.ViewSet):
             return Response({"detail": "Not found."}, status=404)
         serializer = TrainingSessionSerializer(session, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            image = serializer.validated_data.pop('image', None)
+            with transaction.atomic():
+                serializer.save()
+                if image:
+                    queue_image_upload(session, 'image', image)
             return Response(serializer.data)
         return Response(serializer.errors, status=400)
     @action(detail=True, methods=['post'])
@@ -257,8 +414,9 @@ class TrainingSessionViewSet(viewsets.ViewSet):
         return Response({'detail': 'Feedback is required or session not found.'}, status=400)
 
 # Reminder ViewSet (CRUD)
-class ReminderViewSet(viewsets.ViewSet):
+class ReminderViewSet(ReplicaReadMixin, viewsets.ViewSet):
     permission_classes = [IsOwnerOrReadOnly]
+    replica_actions = ('list',)
     def list(self, request):
         reminders = Reminder.objects.filter(user=request.user)
         serializer = ReminderSerializer(reminders, many=True)
@@ -291,12 +449,25 @@ class ReminderViewSet(viewsets.ViewSet):
         reminder.delete()
         return Response(status=204)
 
-# Health Journal ViewSet (list, create)
-class HealthJournalViewSet(viewsets.ViewSet):
+class JournalSearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+# Health Journal ViewSet (list, retrieve, create, search)
+class HealthJournalViewSet(ReplicaReadMixin, viewsets.ViewSet):
     permission_classes = [IsOwnerOrReadOnly]
+    replica_actions = ('list', 'search')
     def list(self, request):
-        journals = HealthJournal.objects.filter(user=request.user)
-        serializer = HealthJournalSerializer(journals, many=True)
+        # Không tải nội dung HTML (có thể rất dài), chỉ trả về đoạn trích
+        journals = HealthJournal.objects.filter(user=request.user).defer('content', 'search_text')
+        serializer = HealthJournalListSerializer(journals, many=True)
+        return Response(serializer.data)
+    def retrieve(self, request, pk=None):
+        journal = HealthJournal.objects.filter(pk=pk, user=request.user).defer('search_text').first()
+        if not journal:
+            return Response({"detail": "Not found."}, status=404)
+        serializer = HealthJournalSerializer(journal)
         return Response(serializer.data)
     def create(self, request):
         serializer = HealthJournalSerializer(data=request.data)
@@ -304,9 +475,27 @@ class HealthJournalViewSet(viewsets.ViewSet):
             serializer.save(user=request.user)
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Tìm nhật ký theo ?q= (không phân biệt dấu), trả về đoạn trích theo độ liên quan"""
+        query = request.query_params.get('q', '').strip()
+        if not query_terms(query):
+            return Response({'detail': 'Thiếu từ khóa tìm kiếm.'}, status=400)
+        paginator = JournalSearchPagination()
+        page = paginator.paginate_queryset(search_journals(request.user, query), request, view=self)
+        results = [
+            {
+                'id': journal.id,
+                'date': journal.date,
+                'workout_session': journal.workout_session_id,
+                'snippet': make_snippet(journal.content, query),
+            }
+            for journal in page
+        ]
+        return paginator.get_paginated_response(results)
 
 # Các API custom giữ nguyên
-class UserStatisticsView(APIView):
+class UserStatisticsView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request, user_id=None):
         if request.user.role == 'user' and request.user.id != user_id:
@@ -410,13 +599,24 @@ class SendOTPView(APIView):
         email = request.data.get('email')
         if not email:
             return Response({'error': 'Email là bắt buộc'}, status=400)
-        otp = str(random.randint(100000, 999999))
-        PasswordResetOTP.objects.create(email=email, otp=otp)
-        send_mail(
+        if not isinstance(email, str):
+            return Response({'error': 'Email không hợp lệ'}, status=400)
+        # Giới hạn theo IP và theo email để tránh spam bảng OTP và máy chủ mail
+        for bucket, key in ((send_otp_ip_bucket, get_client_ip(request)), (send_otp_email_bucket, normalize_email(email))):
+            allowed, retry_after = bucket.allow(key)
+            if not allowed:
+                return Response(
+                    {'error': 'Bạn đã yêu cầu quá nhiều lần, vui lòng thử lại sau'},
+                    status=429, headers={'Retry-After': str(retry_after)}
+                )
+        otp = create_otp(email)
+        # Đưa vào hàng đợi, worker send_queued_emails sẽ gửi qua SMTP
+        queue_email(
             'Mã OTP đặt lại mật khẩu',
             f'Mã OTP của bạn là: {otp}',
+            email,
             'no-reply@yourdomain.com',
-            [email],
+            sensitive=True,
         )
         return Response({'message': 'OTP đã được gửi về email'}, status=200)
 
@@ -428,28 +628,32 @@ class ConfirmOTPView(APIView):
         new_password = request.data.get('new_password')
         if not all([email, otp, new_password]):
             return Response({'error': 'Thiếu thông tin'}, status=400)
-        try:
-            otp_obj = PasswordResetOTP.objects.filter(email=email, otp=otp, is_used=False).latest('created_at')
-        except PasswordResetOTP.DoesNotExist:
-            return Response({'error': 'OTP không hợp lệ'}, status=400)
-        if timezone.now() - otp_obj.created_at > timedelta(minutes=10):
-            return Response({'error': 'OTP đã hết hạn'}, status=400)
-        User = get_user_model()
-        try:
-            user = User.objects.get(email=email)
-            user.set_password(new_password)
-            user.save()
-            otp_obj.is_used = True
-            otp_obj.save()
-            return Response({'message': 'Đổi mật khẩu thành công'}, status=200)
-        except User.DoesNotExist:
+        if not isinstance(email, str) or not isinstance(new_password, str):
+            return Response({'error': 'Thông tin không hợp lệ'}, status=400)
+        # Chặn dò mã OTP 6 số
+        allowed, retry_after = confirm_otp_bucket.allow(normalize_email(email))
+        if not allowed:
+            return Response(
+                {'error': 'Bạn đã nhập sai quá nhiều lần, vui lòng thử lại sau'},
+                status=429, headers={'Retry-After': str(retry_after)}
+            )
+        if not consume_otp(email, str(otp)):
+            return Response({'error': 'OTP không hợp lệ hoặc đã hết hạn'}, status=400)
+        # OTP được cấp theo email đã chuẩn hóa: tìm user không phân biệt hoa thường
+        user = get_user_model().objects.filter(email__iexact=normalize_email(email)).order_by('id').first()
+        if user is None:
             return Response({'error': 'Không tìm thấy user'}, status=404)
+        user.set_password(new_password)
+        user.save()
+        confirm_otp_bucket.reset(normalize_email(email))
+        return Response({'message': 'Đổi mật khẩu thành công'}, status=200)
 
 class GoogleLoginAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
     def post(self, request):
         token = request.data.get('access_token')
         try:
-            idinfo = id_token.verify_oauth2_token(token, requests.Request())
+            idinfo = verify_google_id_token(token)
             email = idinfo['email']
             user, created = User.objects.get_or_create(email=email)
             refresh = RefreshToken.for_user(user)
@@ -461,6 +665,7 @@ class GoogleLoginAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 class FacebookLoginAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
     def post(self, request):
         token = request.data.get('access_token')
         if not token:
@@ -468,7 +673,8 @@ class FacebookLoginAPIView(APIView):
         try:
             # Xác thực access token với Facebook Graph API
             fb_url = f'https://graph.facebook.com/me?fields=id,name,email&access_token={token}'
-            fb_response = requests.get(fb_url)
+            with track_http('facebook'):
+                fb_response = http_session().get(fb_url, timeout=10)
             fb_data = fb_response.json()
             if 'error' in fb_data or 'email' not in fb_data:
                 return Response({'error': 'Token Facebook không hợp lệ hoặc không lấy được email'}, status=status.HTTP_400_BAD_REQUEST)
@@ -485,12 +691,46 @@ class FacebookLoginAPIView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+def create_workout_session(user, exercises):
+    """
+    Tạo buổi tập với danh sách Exercise (đúng thứ tự, cho phép trùng) trong một transaction.
+    Các bài tập được gắn sẵn vào session để serialize không cần query lại.
+    """
+    with transaction.atomic():
+        session = WorkoutSession.objects.create(user=user)
+        workout_exercises = [
+            WorkoutExercise(
+                workout_session=session,
+                exercise=exercise,
+                duration=0,  # Giá trị mặc định
+                calories_burned=0  # Giá trị mặc định
+            )
+            for exercise in exercises
+        ]
+        WorkoutExercise.objects.bulk_create(workout_exercises)
+        if workout_exercises and workout_exercises[0].pk is None:
+            # MySQL không trả về ID sau bulk_create, ID tự tăng theo thứ tự insert
+            ids = WorkoutExercise.objects.filter(workout_session=session).order_by('id').values_list('id', flat=True)
+            for workout_exercise, we_id in zip(workout_exercises, ids):
+                workout_exercise.pk = we_id
+    session._prefetched_objects_cache = {'workoutexercise_set': workout_exercises}
+    return session
+
 # Workout Session ViewSet
-class WorkoutSessionViewSet(viewsets.ViewSet):
+class WorkoutSessionViewSet(ReplicaReadMixin, viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('list',)
+
+    def get_queryset(self):
+        # Kèm user và bài tập của từng buổi tập để serialize không query theo từng dòng
+        return (
+            WorkoutSession.objects.filter(user=self.request.user)
+            .select_related('user')
+            .prefetch_related(models.Prefetch('workoutexercise_set', queryset=WorkoutExercise.objects.select_related('exercise').order_by('id')))
+        )
     
     def list(self, request):
-        sessions = WorkoutSession.objects.filter(user=request.user).order_by('-start_time')
+        sessions = self.get_queryset().order_by('-start_time')
         serializer = WorkoutSessionSerializer(sessions, many=True)
         return Response(serializer.data)
     
@@ -504,73 +744,44 @@ class WorkoutSessionViewSet(viewsets.ViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Tạo buổi tập mới
-            session = WorkoutSession.objects.create(
-                user=request.user,
-                start_time=timezone.now()
-            )
-
-            # Lấy danh sách ID bài tập
+            # Lấy danh sách ID bài tập (giữ thứ tự và các bài tập trùng)
             exercise_ids = []
             for ex in exercises:
                 try:
                     ex_id = int(ex.get('id', 0))
                     if ex_id > 0:
                         exercise_ids.append(ex_id)
-                except (ValueError, TypeError):
+                except (ValueError, TypeError, AttributeError):
                     continue
-            
+
             # Kiểm tra xem có ID bài tập hợp lệ không
             if not exercise_ids:
-                session.delete()
                 return Response(
                     {"error": "No valid exercise IDs provided."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Lấy các bài tập từ database
-            exercises = Exercise.objects.filter(id__in=exercise_ids)
-            
-            # Kiểm tra xem có tìm thấy bài tập nào không
-            if not exercises.exists():
-                session.delete()
+            # Một query lấy tất cả bài tập, bỏ qua ID không tồn tại
+            found = Exercise.objects.in_bulk(set(exercise_ids))
+            selected = [found[ex_id] for ex_id in exercise_ids if ex_id in found]
+            if not selected:
                 return Response(
                     {"error": "No valid exercises found."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Tạo các bài tập cho buổi tập
-            workout_exercises = []
-            for exercise in exercises:
-                workout_exercise = WorkoutExercise(
-                    workout_session=session,
-                    exercise=exercise,
-                    duration=0,  # Giá trị mặc định
-                    calories_burned=0  # Giá trị mặc định
-                )
-                workout_exercises.append(workout_exercise)
-            
-            # Lưu tất cả các bài tập cùng một lúc
-            WorkoutExercise.objects.bulk_create(workout_exercises)
-
-            # Lấy lại session với các bài tập đã tạo
-            session.refresh_from_db()
-
-            # Serialize và trả về kết quả
+            session = create_workout_session(request.user, selected)
             serializer = WorkoutSessionSerializer(session, context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         except Exception as e:
-            # Nếu có lỗi, xóa buổi tập nếu đã tạo
-            if 'session' in locals():
-                session.delete()
             return Response(
                 {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
-    
+
     def retrieve(self, request, pk=None):
-        session = WorkoutSession.objects.filter(pk=pk, user=request.user).first()
+        session = self.get_queryset().filter(pk=pk).first()
         if not session:
             return Response({'detail': 'Not found.'}, status=404)
             
@@ -580,110 +791,269 @@ class WorkoutSessionViewSet(viewsets.ViewSet):
     @action(detail=True, methods=['post'])
     def complete_exercise(self, request, pk=None):
         try:
-            print(f"Received data: {request.data}")  # Log dữ liệu nhận được
-            
-            session = WorkoutSession.objects.filter(pk=pk, user=request.user).first()
-            if not session:
-                return Response({'detail': 'Không tìm thấy buổi tập.'}, status=404)
-                
+            # workout_exercise_id: dòng bài tập trong buổi tập (phân biệt các bài tập trùng);
+            # client cũ chỉ gửi exercise_id -> dòng đầu tiên của bài tập đó
+            workout_exercise_id = request.data.get('workout_exercise_id')
             exercise_id = request.data.get('exercise_id')
             duration = request.data.get('duration')
             calories_burned = request.data.get('calories_burned')
-            
-            print(f"Exercise ID: {exercise_id}, Duration: {duration}, Calories: {calories_burned}")  # Log dữ liệu đã parse
-            
+            heart_rate = request.data.get('heart_rate')
+
             # Kiểm tra dữ liệu đầu vào
-            if not exercise_id:
+            if not workout_exercise_id and not exercise_id:
                 return Response({'detail': 'Thiếu ID bài tập.'}, status=400)
-            
+
             try:
-                exercise_id = int(exercise_id)
+                workout_exercise_id = int(workout_exercise_id) if workout_exercise_id else None
+                exercise_id = int(exercise_id) if exercise_id else None
                 duration = int(duration) if duration else 0
                 calories_burned = int(calories_burned) if calories_burned else 0
+                heart_rate = int(heart_rate) if heart_rate else None
             except (ValueError, TypeError):
                 return Response({'detail': 'Dữ liệu không hợp lệ.'}, status=400)
-            
-            # Kiểm tra bài tập có tồn tại không
-            exercise = Exercise.objects.filter(id=exercise_id).first()
-            if not exercise:
-                return Response({'detail': 'Không tìm thấy bài tập.'}, status=404)
-            
-            # Kiểm tra bài tập đã được thêm vào buổi tập chưa
-            workout_exercise = WorkoutExercise.objects.filter(
-                workout_session=session,
-                exercise=exercise
-            ).first()
-            
-            if not workout_exercise:
-                return Response({'detail': 'Bài tập chưa được thêm vào buổi tập.'}, status=400)
-            
-            # Cập nhật thông tin bài tập
-            workout_exercise.duration = duration
-            workout_exercise.calories_burned = calories_burned
-            workout_exercise.save()
-            
-            print(f"Updated workout exercise: {workout_exercise.id}, Calories: {workout_exercise.calories_burned}")  # Log sau khi cập nhật
-            
-            # Tính lại tổng calo của buổi tập
-            workout_exercises = WorkoutExercise.objects.filter(workout_session=session)
-            total_calories = sum(ex.calories_burned for ex in workout_exercises)
-            
-            print(f"Total calories before update: {session.total_calories}")  # Log tổng calo trước khi cập nhật
-            print(f"Calculated total calories: {total_calories}")  # Log tổng calo đã tính
-            
-            session.total_calories = total_calories
-            session.save()
-            
-            print(f"Updated session total calories: {session.total_calories}")  # Log tổng calo sau khi cập nhật
-            
+
+            # Chỉ khóa dòng bài tập và buổi tập, không khóa bảng Exercise dùng chung (nếu DB hỗ trợ)
+            lock_of = ('self', 'workout_session') if connection.features.has_select_for_update_of else ()
+            with transaction.atomic():
+                # Một query: khóa bài tập trong buổi tập và buổi tập, kèm thông tin Exercise để serialize
+                rows = (
+                    WorkoutExercise.objects
+                    .select_related('workout_session', 'exercise')
+                    .select_for_update(of=lock_of)
+                    .filter(workout_session_id=pk, workout_session__user=request.user)
+                )
+                if workout_exercise_id:
+                    rows = rows.filter(pk=workout_exercise_id)
+                else:
+                    rows = rows.filter(exercise_id=exercise_id)
+                workout_exercise = rows.order_by('id').first()
+                if not workout_exercise:
+                    if not WorkoutSession.objects.filter(pk=pk, user=request.user).exists():
+                        return Response({'detail': 'Không tìm thấy buổi tập.'}, status=404)
+                    if workout_exercise_id:
+                        return Response({'detail': 'Không tìm thấy bài tập trong buổi tập.'}, status=404)
+                    if not Exercise.objects.filter(id=exercise_id).exists():
+                        return Response({'detail': 'Không tìm thấy bài tập.'}, status=404)
+                    return Response({'detail': 'Bài tập chưa được thêm vào buổi tập.'}, status=400)
+
+                # Calo tính phía server theo MET/nhịp tim, thiếu dữ liệu thì dùng giá trị client gửi
+                calories_burned = exercise_calories(
+                    workout_exercise.exercise, request.user, duration,
+                    heart_rate=heart_rate, reported=calories_burned,
+                )
+                # Cộng phần chênh lệch vào tổng calo thay vì tính lại toàn bộ buổi tập
+                delta = calories_burned - workout_exercise.calories_burned
+                workout_exercise.duration = duration
+                workout_exercise.calories_burned = calories_burned
+                workout_exercise.heart_rate = heart_rate
+                WorkoutExercise.objects.filter(pk=workout_exercise.pk).update(
+                    duration=duration, calories_burned=calories_burned, heart_rate=heart_rate
+                )
+                session = workout_exercise.workout_session
+                if delta:
+                    WorkoutSession.objects.filter(pk=session.pk).update(total_calories=F('total_calories') + delta)
+                total_calories = session.total_calories + delta
+
             return Response({
                 'detail': 'Hoàn thành bài tập.',
                 'workout_exercise': WorkoutExerciseSerializer(workout_exercise).data,
                 'total_calories': total_calories
             }, status=200)
-            
+
         except Exception as e:
-            print(f"Error in complete_exercise: {str(e)}")  # Log lỗi
+            logger.exception('Lỗi complete_exercise', extra={'user_id': request.user.id, 'pk': pk})
             return Response({
                 'detail': f'Lỗi khi hoàn thành bài tập: {str(e)}'
             }, status=400)
-    
+
+    @action(detail=True, methods=['post'], url_path='complete-exercises')
+    def complete_exercises(self, request, pk=None):
+        """
+        Hoàn thành nhiều bài tập cùng lúc (đồng bộ cả buổi tập offline).
+        Body: {"exercises": [{"workout_exercise_id" hoặc "exercise_id", "duration", "calories_burned", "heart_rate"}, ...],
+               "complete_workout": true}
+        Số query không phụ thuộc số bài tập.
+        """
+        items = request.data if isinstance(request.data, list) else request.data.get('exercises')
+        if not items or not isinstance(items, list):
+            return Response({'detail': 'Thiếu danh sách bài tập.'}, status=400)
+        try:
+            items = [
+                {
+                    'workout_exercise_id': int(item['workout_exercise_id']) if item.get('workout_exercise_id') else None,
+                    'exercise_id': int(item['exercise_id']) if item.get('exercise_id') else None,
+                    'duration': int(item.get('duration') or 0),
+                    'calories_burned': int(item.get('calories_burned') or 0),
+                    'heart_rate': int(item['heart_rate']) if item.get('heart_rate') else None,
+                }
+                for item in items
+            ]
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return Response({'detail': 'Dữ liệu không hợp lệ.'}, status=400)
+        if any(not item['workout_exercise_id'] and not item['exercise_id'] for item in items):
+            return Response({'detail': 'Thiếu ID bài tập.'}, status=400)
+        complete_workout = request.data.get('complete_workout', False) if isinstance(request.data, dict) else False
+
+        with transaction.atomic():
+            session = WorkoutSession.objects.select_for_update().filter(pk=pk, user=request.user).first()
+            if not session:
+                return Response({'detail': 'Không tìm thấy buổi tập.'}, status=404)
+
+            rows = list(
+                WorkoutExercise.objects.select_related('exercise')
+                .filter(workout_session=session)
+                .filter(
+                    Q(pk__in={item['workout_exercise_id'] for item in items if item['workout_exercise_id']})
+                    | Q(exercise_id__in={item['exercise_id'] for item in items if not item['workout_exercise_id']})
+                )
+                .order_by('id')
+            )
+            rows_by_id = {row.pk: row for row in rows}
+            # Dòng được chỉ định theo workout_exercise_id không được ghép lại theo exercise_id
+            addressed = {item['workout_exercise_id'] for item in items if item['workout_exercise_id']}
+            # Gom các bài tập còn lại theo exercise_id (giữ thứ tự để xử lý bài tập trùng)
+            rows_by_exercise = {}
+            for row in rows:
+                if row.pk not in addressed:
+                    rows_by_exercise.setdefault(row.exercise_id, []).append(row)
+
+            # Lần xuất hiện thứ n của một exercise_id ứng với dòng thứ n trong buổi tập
+            updated_rows = []
+            missing = []
+            for item in items:
+                if item['workout_exercise_id']:
+                    row = rows_by_id.get(item['workout_exercise_id'])
+                else:
+                    candidates = rows_by_exercise.get(item['exercise_id'])
+                    row = candidates.pop(0) if candidates else None
+                if row is None:
+                    missing.append(item['workout_exercise_id'] or item['exercise_id'])
+                    continue
+                row.duration = item['duration']
+                row.heart_rate = item['heart_rate']
+                row.calories_burned = exercise_calories(
+                    row.exercise, request.user, item['duration'],
+                    heart_rate=item['heart_rate'], reported=item['calories_burned'],
+                )
+                updated_rows.append(row)
+            if missing:
+                return Response(
+                    {'detail': 'Bài tập chưa được thêm vào buổi tập.', 'exercise_ids': missing},
+                    status=400
+                )
+
+            WorkoutExercise.objects.bulk_update(updated_rows, ['duration', 'calories_burned', 'heart_rate'])
+            session_updates = {'total_calories': session_calories_sum()}
+            if complete_workout:
+                session_updates.update(end_time=timezone.now(), is_completed=True)
+            WorkoutSession.objects.filter(pk=session.pk).update(**session_updates)
+            session.refresh_from_db(fields=['total_calories', 'is_completed'])
+
+        return Response({
+            'detail': 'Hoàn thành bài tập.',
+            'workout_exercises': WorkoutExerciseSerializer(updated_rows, many=True).data,
+            'total_calories': session.total_calories,
+            'is_completed': session.is_completed,
+        }, status=200)
+
     @action(detail=True, methods=['post'])
     def complete_workout(self, request, pk=None):
         try:
-            session = WorkoutSession.objects.filter(pk=pk, user=request.user).first()
-            if not session:
+            # Đối soát tổng calo bằng SUM phía database trong cùng câu UPDATE
+            updated = WorkoutSession.objects.filter(pk=pk, user=request.user).update(
+                end_time=timezone.now(),
+                is_completed=True,
+                total_calories=session_calories_sum(),
+            )
+            if not updated:
                 return Response({'detail': 'Không tìm thấy buổi tập.'}, status=404)
-            
-            print(f"Completing workout session: {session.id}")  # Log ID buổi tập
-            
-            # Tính lại tổng calo trước khi hoàn thành
-            workout_exercises = WorkoutExercise.objects.filter(workout_session=session)
-            total_calories = sum(ex.calories_burned for ex in workout_exercises)
-            
-            print(f"Current total calories: {session.total_calories}")  # Log tổng calo hiện tại
-            print(f"Calculated total calories: {total_calories}")  # Log tổng calo đã tính
-            
-            session.end_time = timezone.now()
-            session.is_completed = True
-            session.total_calories = total_calories
-            session.save()
-            
-            print(f"Final total calories: {session.total_calories}")  # Log tổng calo cuối cùng
-            
+            total_calories = WorkoutSession.objects.filter(pk=pk).values_list('total_calories', flat=True).first()
+
             return Response({
                 'detail': 'Hoàn thành buổi tập.',
                 'total_calories': total_calories
             }, status=200)
-            
+
         except Exception as e:
-            print(f"Error in complete_workout: {str(e)}")  # Log lỗi
+            logger.exception('Lỗi complete_workout', extra={'user_id': request.user.id, 'pk': pk})
             return Response({
                 'detail': f'Lỗi khi hoàn thành buổi tập: {str(e)}'
             }, status=400)
 
-class HealthMetricsViewSet(viewsets.ViewSet):
+# Workout Template ViewSet (mẫu buổi tập)
+class WorkoutTemplateViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('list',)
+
+    def list(self, request):
+        # Chỉ đọc các cột tóm tắt của mẫu, không join bài tập
+        templates = WorkoutTemplate.objects.filter(user=request.user)
+        serializer = WorkoutTemplateSerializer(templates, many=True, context={'request': request})
+        return Response(serializer.data)
+
+    def retrieve(self, request, pk=None):
+        template = WorkoutTemplate.objects.filter(pk=pk, user=request.user).prefetch_related(
+            models.Prefetch('items', queryset=WorkoutTemplateExercise.objects.select_related('exercise'))
+        ).first()
+        if not template:
+            return Response({'detail': 'Not found.'}, status=404)
+        serializer = WorkoutTemplateDetailSerializer(template, context={'request': request})
+        return Response(serializer.data)
+
+    def create(self, request):
+        name = request.data.get('name')
+        exercise_ids = request.data.get('exercises', [])
+        if not name or not exercise_ids:
+            return Response({'detail': 'Thiếu tên mẫu hoặc danh sách bài tập.'}, status=400)
+        try:
+            exercise_ids = [int(ex_id) for ex_id in exercise_ids]
+        except (ValueError, TypeError):
+            return Response({'detail': 'Dữ liệu không hợp lệ.'}, status=400)
+        # Bài tập hệ thống hoặc bài tập cá nhân của user
+        found = Exercise.objects.filter(
+            models.Q(is_custom=False) | models.Q(user=request.user)
+        ).in_bulk(set(exercise_ids))
+        missing = [ex_id for ex_id in exercise_ids if ex_id not in found]
+        if missing:
+            return Response({'detail': 'Không tìm thấy bài tập.', 'exercise_ids': missing}, status=400)
+        exercises = [found[ex_id] for ex_id in exercise_ids]
+        with transaction.atomic():
+            template = WorkoutTemplate.objects.create(
+                user=request.user,
+                name=name,
+                exercise_count=len(exercises),
+                total_duration=sum(ex.duration for ex in exercises),
+                base_calories=sum(ex.calories_burned for ex in exercises),
+            )
+            WorkoutTemplateExercise.objects.bulk_create([
+                WorkoutTemplateExercise(template=template, exercise=exercise, order=i)
+                for i, exercise in enumerate(exercises)
+            ])
+        serializer = WorkoutTemplateSerializer(template, context={'request': request})
+        return Response(serializer.data, status=201)
+
+    def destroy(self, request, pk=None):
+        deleted, _ = WorkoutTemplate.objects.filter(pk=pk, user=request.user).delete()
+        if not deleted:
+            return Response({'detail': 'Not found.'}, status=404)
+        return Response(status=204)
+
+    @action(detail=True, methods=['post'])
+    def start(self, request, pk=None):
+        """Bắt đầu buổi tập mới từ mẫu"""
+        items = list(
+            WorkoutTemplateExercise.objects.filter(template_id=pk, template__user=request.user)
+            .select_related('exercise')
+        )
+        if not items:
+            return Response({'detail': 'Không tìm thấy mẫu buổi tập.'}, status=404)
+        session = create_workout_session(request.user, [item.exercise for item in items])
+        serializer = WorkoutSessionSerializer(session, context={'request': request})
+        return Response(serializer.data, status=201)
+
+class HealthMetricsViewSet(ReplicaReadMixin, viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('get_health_history',)
 
     def get_health_metrics(self, request):
         """Lấy các chỉ số sức khỏe hiện tại của người dùng"""
@@ -697,16 +1067,9 @@ class HealthMetricsViewSet(viewsets.ViewSet):
     def update_water_intake(self, request):
         """Cập nhật lượng nước uống"""
         try:
-            amount = float(request.data.get('amount', 0))  # Lượng nước uống thêm (lít)
-            today = timezone.now().date()
-            # Lấy hoặc tạo bản ghi HealthMetricsHistory cho hôm nay
-            history, created = HealthMetricsHistory.objects.get_or_create(
-                user=request.user,
-                date=today,
-                defaults={'water_intake': 0}
-            )
-            history.water_intake += amount
-            history.save()
+            amount = request.data.get('amount', 0)  # Lượng nước uống thêm (lít)
+            session = record_water(request.user, amount)
+            history = HealthMetricsHistory.objects.get(user=request.user, date=session.date)
             return Response(HealthMetricsHistorySerializer(history).data)
         except ValueError:
             return Response({"detail": "Invalid amount value."}, status=400)
@@ -717,14 +1080,7 @@ class HealthMetricsViewSet(viewsets.ViewSet):
         """Cập nhật số bước đi trong ngày"""
         try:
             steps = int(request.data.get('steps', 0))
-            today = timezone.now().date()
-            history, created = HealthMetricsHistory.objects.get_or_create(
-                user=request.user,
-                date=today,
-                defaults={'steps': 0}
-            )
-            history.steps = steps
-            history.save()
+            history = set_daily_metrics(request.user, timezone.now().date(), steps=steps)
             return Response(HealthMetricsHistorySerializer(history).data)
         except Exception as e:
             return Response({"detail": str(e)}, status=400)
@@ -733,14 +1089,7 @@ class HealthMetricsViewSet(viewsets.ViewSet):
         """Cập nhật nhịp tim trong ngày"""
         try:
             heart_rate = int(request.data.get('heart_rate', 0))
-            today = timezone.now().date()
-            history, created = HealthMetricsHistory.objects.get_or_create(
-                user=request.user,
-                date=today,
-                defaults={'heart_rate': 0}
-            )
-            history.heart_rate = heart_rate
-            history.save()
+            history = set_daily_metrics(request.user, timezone.now().date(), heart_rate=heart_rate)
             return Response(HealthMetricsHistorySerializer(history).data)
         except Exception as e:
             return Response({"detail": str(e)}, status=400)
@@ -782,31 +1131,38 @@ class HealthMetricsViewSet(viewsets.ViewSet):
         except Exception as e:
             return Response({"detail": str(e)}, status=400)
 
-class TrainingHistoryView(APIView):
+class TrainingHistoryView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
         user = request.user
+        # Số ngày cần lấy (?days=7..365, mặc định 7)
+        try:
+            days = int(request.query_params.get('days', 7))
+        except (TypeError, ValueError):
+            return Response({'detail': 'days phải là số nguyên.'}, status=400)
+        days = min(max(days, 7), 365)
         end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=6)
-        # Lấy lịch tập của user trong 7 ngày gần nhất
-        schedules = TrainingSchedule.objects.filter(user=user, date__range=[start_date, end_date])
-        # Lấy các session theo schedule
-        sessions = TrainingSession.objects.filter(schedule__in=schedules)
-        # Gom nhóm theo ngày
+        start_date = end_date - timedelta(days=days - 1)
+        # Một query gom nhóm theo ngày: TrainingSession -> TrainingSchedule -> Exercise
+        rows = (
+            TrainingSession.objects
+            .filter(schedule__user=user, schedule__date__range=[start_date, end_date])
+            .values('schedule__date')
+            .annotate(session_count=Count('id'), total_calories=Sum('exercise__calories_burned'))
+        )
+        by_date = {row['schedule__date']: row for row in rows}
         result = []
-        for i in range(7):
+        for i in range(days):
             day = start_date + timedelta(days=i)
-            day_sessions = sessions.filter(schedule__date=day)
-            session_count = day_sessions.count()
-            total_calories = sum([s.exercise.calories_burned if s.exercise else 0 for s in day_sessions])
+            row = by_date.get(day)
             result.append({
                 'date': str(day),
-                'session_count': session_count,
-                'total_calories': total_calories
+                'session_count': row['session_count'] if row else 0,
+                'total_calories': (row['total_calories'] or 0) if row else 0
             })
         return Response(result)
 
-class TrainingStatisticsView(APIView):
+class TrainingStatisticsView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
         user = request.user
@@ -862,7 +1218,116 @@ class TrainingStatisticsView(APIView):
                 })
         return Response(data)
 
-class WaterSessionListCreateView(generics.ListCreateAPIView):
+calendar_executor = ThreadPoolExecutor(
+    max_workers=max(settings.CALENDAR_QUERY_WORKERS, 1), thread_name_prefix='calendar'
+)
+
+def run_in_thread(func):
+    """
+    Chạy query trong luồng phụ. Mỗi luồng của pool giữ kết nối DB riêng và dùng lại giữa
+    các request như luồng xử lý request: chỉ đóng khi lỗi hoặc quá CONN_MAX_AGE
+    (với qlsk.dbpool, CONN_MAX_AGE=0 nên kết nối được trả về pool sau mỗi lần dùng).
+    """
+    close_old_connections()
+    try:
+        # Kết nối của luồng phụ cũng cần execute_wrapper để SQL được tính vào request
+        with instrument_queries():
+            return func()
+    finally:
+        close_old_connections()
+
+def run_queries(funcs):
+    """Chạy các hàm query song song bằng thread pool, trả về kết quả theo đúng thứ tự"""
+    # Trong transaction, luồng khác không thấy dữ liệu chưa commit -> chạy tuần tự
+    if settings.CALENDAR_QUERY_WORKERS <= 1 or connection.in_atomic_block:
+        return [func() for func in funcs]
+    # copy_context để luồng phụ đọc cùng database (primary/replica) với request
+    futures = [calendar_executor.submit(contextvars.copy_context().run, run_in_thread, func) for func in funcs]
+    return [future.result() for future in futures]
+
+class CalendarView(ReplicaReadMixin, APIView):
+    """
+    Lịch tổng hợp theo ngày trong khoảng ?from=&to= (mặc định 7 ngày từ hôm nay):
+    lịch tập, buổi tập theo lịch, buổi tập luyện, lượt uống nước và chỉ số sức khỏe.
+    Mỗi model một query theo index (user, ngày), chạy song song; kết quả trả về dạng stream.
+    """
+    permission_classes = [IsAuthenticated]
+    SECTIONS = ['training_schedules', 'training_sessions', 'workout_sessions', 'water_sessions', 'health_metrics']
+
+    def get(self, request):
+        start, end = get_date_range(request, default_days=7, max_days=93)
+        user = request.user
+
+        def training_schedules():
+            return [
+                {
+                    'id': s.id, 'date': s.date, 'time': s.time, 'recurrence': s.recurrence_id,
+                }
+                for s in expand_training_schedules(user, start, end)
+            ]
+
+        def training_sessions():
+            return list(
+                TrainingSession.objects.filter(schedule__user=user, schedule__date__range=[start, end])
+                .order_by('schedule__date', 'schedule__time', 'id')
+                .values(
+                    'id', 'schedule', 'exercise', 'custom_exercise_name', 'repetitions', 'duration',
+                    'feedback', date=F('schedule__date'),
+                )
+            )
+
+        def workout_sessions():
+            # Lọc theo khoảng datetime (không dùng __date) để dùng được index (user, start_time)
+            rows = list(
+                WorkoutSession.objects.filter(
+                    user=user,
+                    start_time__gte=datetime.combine(start, time.min),
+                    start_time__lt=datetime.combine(end + timedelta(days=1), time.min),
+                )
+                .order_by('start_time')
+                .values('id', 'start_time', 'end_time', 'total_calories', 'is_completed')
+            )
+            for row in rows:
+                row['date'] = row['start_time'].date()
+            return rows
+
+        def water_sessions():
+            return list(
+                WaterSession.objects.filter(user=user, date__range=[start, end])
+                .order_by('date', 'time')
+                .values('id', 'date', 'time', 'amount')
+            )
+
+        def health_metrics():
+            return list(
+                HealthMetricsHistory.objects.filter(user=user, date__range=[start, end])
+                .order_by('date', 'time')
+                .values('id', 'date', 'time', 'water_intake', 'steps', 'heart_rate')
+            )
+
+        results = run_queries([training_schedules, training_sessions, workout_sessions, water_sessions, health_metrics])
+        days = {}
+        for section, rows in zip(self.SECTIONS, results):
+            for row in rows:
+                days.setdefault(row.pop('date'), {}).setdefault(section, []).append(row)
+
+        def stream():
+            yield '{"from": "%s", "to": "%s", "days": [' % (start, end)
+            day = start
+            first = True
+            while day <= end:
+                sections = days.get(day, {})
+                item = {'date': day}
+                for section in self.SECTIONS:
+                    item[section] = sections.get(section, [])
+                yield ('' if first else ',') + json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False)
+                first = False
+                day += timedelta(days=1)
+            yield ']}'
+
+        return StreamingHttpResponse(stream(), content_type='application/json')
+
+class WaterSessionListCreateView(ReplicaReadMixin, generics.ListCreateAPIView):
     serializer_class = WaterSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -870,21 +1335,20 @@ class WaterSessionListCreateView(generics.ListCreateAPIView):
         return WaterSession.objects.filter(user=self.request.user).order_by('-date', '-time')
 
     def perform_create(self, serializer):
-        today = timezone.now().date()
-        # Lưu session mới
-        instance = serializer.save(user=self.request.user, date=today)
-        # Tính tổng nước trong ngày
-        total = WaterSession.objects.filter(
-            user=self.request.user, date=today
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
-        # Cập nhật hoặc tạo HealthMetricsHistory
-        health, created = HealthMetricsHistory.objects.get_or_create(
-            user=self.request.user, date=today,
-            defaults={'water_intake': total}
-        )
-        if not created:
-            health.water_intake = total
-            health.save()
+        # Thêm session và cộng dồn tổng nước trong ngày (cùng đường với health-metrics/water/)
+        try:
+            serializer.instance = record_water(self.request.user, serializer.validated_data['amount'])
+        except ValueError as e:
+            raise ValidationError({'amount': str(e)})
+
+class WaterAnalyticsView(ReplicaReadMixin, APIView):
+    """Thống kê uống nước theo ?window=7d|30d|365d"""
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        window = request.query_params.get('window', '7d')
+        if window not in ANALYTICS_WINDOWS:
+            return Response({'detail': 'window phải là một trong: ' + ', '.join(ANALYTICS_WINDOWS)}, status=400)
+        return Response(water_analytics(request.user, window))
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -897,6 +1361,7 @@ def create_diet_goal(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@reads_from_replica
 def get_diet_goals(request):
     goals = DietGoal.objects.filter(user=request.user, is_active=True)
     serializer = DietGoalSerializer(goals, many=True)
@@ -915,14 +1380,18 @@ def safe_float(s):
         return 0
 
 def generate_nutrition_plan(prompt):
+    # SDK openai import mất ~0.5 giây nên chỉ import khi thật sự gọi
+    import openai
+
     client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "Bạn là một chuyên gia dinh dưỡng."},
-            {"role": "user", "content": prompt}
-        ]
-    )
+    with track_http('openai'):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "Bạn là một chuyên gia dinh dưỡng."},
+                {"role": "user", "content": prompt}
+            ]
+        )
     return response.choices[0].message.content
 
 @api_view(['POST'])
@@ -990,8 +1459,9 @@ Chỉ trả về text thuần, không markdown, không ký tự đặc biệt nh
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@reads_from_replica
 def get_meal_plans(request):
-    meal_plans = MealPlan.objects.filter(user=request.user, is_active=True)
+    meal_plans = MealPlan.objects.filter(user=request.user, is_active=True).prefetch_related('meals')
     serializer = MealPlanSerializer(meal_plans, many=True)
     return Response(serializer.data)
 
@@ -1004,8 +1474,7 @@ class MealPlanDetailView(generics.RetrieveAPIView):
         return MealPlan.objects.filter(user=self.request.user)
 
 def parse_chatgpt_response(response_text):
-    print("== RESPONSE TEXT FROM CHATGPT ==")
-    print(response_text)
+    logger.debug('Phản hồi ChatGPT', extra={'response_text': response_text, 'sample_rate': 0.1})
     try:
         lines = [line.strip() for line in response_text.split('\n') if line.strip()]
         title = lines[0] if lines else ''
@@ -1091,7 +1560,7 @@ def parse_chatgpt_response(response_text):
             'meals': meals
         }
     except Exception as e:
-        print(f"Error parsing ChatGPT response: {str(e)}")
+        logger.warning('Không đọc được phản hồi ChatGPT', exc_info=True, extra={'response_text': response_text})
         # Trả về dữ liệu mẫu nếu có lỗi
         return {
             'title': 'Thực đơn mẫu',
@@ -1115,7 +1584,7 @@ def parse_chatgpt_response(response_text):
             ]
         }
 
-class UserMealPlanListView(generics.ListAPIView):
+class UserMealPlanListView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = MealPlanSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -0,0 +1,227 @@
+import math
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from .models import HealthMetricsHistory, WaterSession
+
+
+def _increment_daily_total(user, day, amount):
+    """UPDATE ... SET water_intake = water_intake + amount, chưa có dòng thì INSERT"""
+    updated = HealthMetricsHistory.objects.filter(user=user, date=day).update(
+        water_intake=F('water_intake') + amount
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            HealthMetricsHistory.objects.create(user=user, date=day, water_intake=amount)
+    except IntegrityError:
+        # Request khác vừa tạo dòng của ngày này (unique user, date) -> cộng dồn
+        HealthMetricsHistory.objects.filter(user=user, date=day).update(
+            water_intake=F('water_intake') + amount
+        )
+
+
+def set_daily_metrics(user, day, **values):
+    """
+    Ghi các chỉ số (steps, heart_rate) của dòng (user, ngày) bằng UPDATE chỉ các cột đó,
+    chưa có dòng thì INSERT. Không đọc-rồi-ghi cả dòng nên không ghi đè water_intake
+    vừa được _increment_daily_total cộng dồn. Trả về dòng sau khi ghi.
+    """
+    updated = HealthMetricsHistory.objects.filter(user=user, date=day).update(**values)
+    if not updated:
+        try:
+            with transaction.atomic():
+                return HealthMetricsHistory.objects.create(user=user, date=day, **values)
+        except IntegrityError:
+            # Request khác (uống nước, bước chân) vừa tạo dòng của ngày này
+            HealthMetricsHistory.objects.filter(user=user, date=day).update(**values)
+    return HealthMetricsHistory.objects.get(user=user, date=day)
+
+
+def record_water(user, amount):
+    """
+    Đường ghi nhận uống nước duy nhất: thêm WaterSession và cộng vào tổng nước
+    của ngày trong cùng một transaction, không đọc lại tổng các lượt uống.
+    """
+    amount = float(amount)
+    # float() nhận cả 'nan', 'inf', '1e308': NaN lọt qua mọi phép so sánh và làm hỏng tổng của ngày
+    if not math.isfinite(amount) or amount <= 0:
+        raise ValueError('amount phải là số lớn hơn 0')
+    if amount > settings.WATER_MAX_SESSION_LITERS:
+        raise ValueError(f'amount không được vượt quá {settings.WATER_MAX_SESSION_LITERS} lít')
+    today = timezone.now().date()
+    with transaction.atomic():
+        session = WaterSession.objects.create(user=user, date=today, amount=amount)
+        _increment_daily_total(user, today, amount)
+        transaction.on_commit(lambda: invalidate_water_analytics(user.id, today))
+    return session
+
+
+def find_water_mismatches(start_date=None, user_id=None):
+    """
+    So sánh tổng WaterSession theo (user, ngày) với HealthMetricsHistory.water_intake, gồm cả
+    các ngày có tổng nước nhưng không có WaterSession (dữ liệu cũ trước khi có WaterSession).
+    Trả về danh sách (user_id, date, tổng đã lưu, tổng WaterSession).
+    """
+    sessions = WaterSession.objects.all()
+    totals = HealthMetricsHistory.objects.all()
+    if start_date:
+        sessions = sessions.filter(date__gte=start_date)
+        totals = totals.filter(date__gte=start_date)
+    if user_id:
+        sessions = sessions.filter(user_id=user_id)
+        totals = totals.filter(user_id=user_id)
+    expected = {
+        (row['user_id'], row['date']): row['total']
+        for row in sessions.values('user_id', 'date').annotate(total=Sum('amount'))
+    }
+    stored = {
+        (owner_id, day): water_intake
+        for owner_id, day, water_intake in totals.values_list('user_id', 'date', 'water_intake')
+    }
+    mismatches = []
+    for key in sorted(expected.keys() | {key for key, value in stored.items() if value}):
+        current, total = stored.get(key), expected.get(key, 0)
+        if current is None or abs(current - total) > 1e-6:
+            mismatches.append((*key, current, total))
+    return mismatches
+
+
+def fix_water_mismatches(mismatches):
+    """
+    Sửa các dòng lệch mà không làm mất dữ liệu; trả về (số dòng nâng tổng, số WaterSession bù).
+    - Tổng WaterSession lớn hơn tổng đã lưu: nâng tổng đã lưu lên (thiếu lượt cộng dồn).
+    - Tổng đã lưu lớn hơn: lượng nước ghi trước khi có WaterSession, không hạ tổng xuống
+      mà thêm một WaterSession bù phần chênh lệch, giờ lấy theo giờ của dòng tổng.
+    """
+    raised = backfilled = 0
+    for user_id, day, current, total in mismatches:
+        with transaction.atomic():
+            if current is None or current < total:
+                updated = HealthMetricsHistory.objects.filter(user_id=user_id, date=day).update(water_intake=total)
+                if not updated:
+                    HealthMetricsHistory.objects.create(user_id=user_id, date=day, water_intake=total)
+                raised += 1
+            else:
+                row = HealthMetricsHistory.objects.get(user_id=user_id, date=day)
+                session = WaterSession.objects.create(user_id=user_id, date=day, amount=current - total)
+                # time là auto_now_add nên chỉ đặt lại được bằng UPDATE
+                WaterSession.objects.filter(pk=session.pk).update(time=row.time)
+                backfilled += 1
+        transaction.on_commit(lambda user_id=user_id, day=day: invalidate_water_analytics(user_id, day))
+    return raised, backfilled
+
+
+# Các khoảng thời gian hỗ trợ của /api/water/analytics/ (số ngày)
+ANALYTICS_WINDOWS = {'7d': 7, '30d': 30, '365d': 365}
+ROLLING_DAYS = 7
+
+
+def analytics_cache_key(user_id, window, day):
+    return f'water-analytics:{user_id}:{window}:{day}'
+
+
+def invalidate_water_analytics(user_id, day):
+    cache.delete_many([analytics_cache_key(user_id, window, day) for window in ANALYTICS_WINDOWS])
+
+
+def daily_water_goal(user):
+    """Mục tiêu nước mỗi ngày (lít)"""
+    if user.weight:
+        return round(user.weight * settings.WATER_GOAL_LITERS_PER_KG, 2)
+    return settings.WATER_DAILY_GOAL_LITERS
+
+
+def water_analytics(user, window='7d'):
+    """
+    Thống kê uống nước của `window` ngày gần nhất, cache theo (user, window, ngày).
+    Cache bị xóa khi user ghi nhận thêm nước trong ngày.
+    """
+    today = timezone.now().date()
+    key = analytics_cache_key(user.id, window, today)
+    data = cache.get(key)
+    if data is None:
+        data = compute_water_analytics(user, ANALYTICS_WINDOWS[window], today)
+        data['window'] = window
+        # Giữ đến hết ngày hôm nay
+        seconds_left = (datetime.combine(today + timedelta(days=1), time.min) - timezone.now()).total_seconds()
+        cache.set(key, data, max(int(seconds_left), 1))
+    return data
+
+
+def compute_water_analytics(user, days, today):
+    """
+    Hai query gom nhóm (tổng theo ngày, tổng theo giờ) rồi xử lý vector hóa bằng NumPy:
+    trung bình trượt 7 ngày, tỉ lệ đạt mục tiêu, chuỗi ngày đạt mục tiêu.
+    """
+    # NumPy chỉ cần cho thống kê nên không import lúc khởi động
+    import numpy as np
+
+    start = today - timedelta(days=days - 1)
+    # Lấy thêm 6 ngày trước để tính trung bình trượt cho những ngày đầu
+    history_start = start - timedelta(days=ROLLING_DAYS - 1)
+    size = days + ROLLING_DAYS - 1
+
+    # Tổng nước theo ngày đã được cộng dồn sẵn trong HealthMetricsHistory (unique user, date)
+    rows = HealthMetricsHistory.objects.filter(
+        user=user, date__range=[history_start, today]
+    ).values_list('date', 'water_intake')
+    totals = np.zeros(size)
+    for day, water_intake in rows:
+        totals[(day - history_start).days] = water_intake
+
+    cumulative = np.concatenate(([0.0], np.cumsum(totals)))
+    rolling = (cumulative[ROLLING_DAYS:] - cumulative[:-ROLLING_DAYS]) / ROLLING_DAYS
+    totals = totals[ROLLING_DAYS - 1:]
+
+    goal = daily_water_goal(user)
+    goal_met = totals >= goal
+    # Chuỗi ngày liên tiếp đạt mục tiêu tính đến hôm nay (hôm nay chưa đạt thì tính đến hôm qua)
+    streak_days = goal_met if goal_met[-1] else goal_met[:-1]
+    missed = np.flatnonzero(~streak_days)
+    current_streak = int(len(streak_days) - (missed[-1] + 1 if len(missed) else 0))
+
+    hours = np.zeros(24)
+    counts = np.zeros(24, dtype=np.int64)
+    hourly = (
+        WaterSession.objects.filter(user=user, date__range=[start, today])
+        .annotate(hour=ExtractHour('time'))
+        .values('hour')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    for row in hourly:
+        hours[row['hour']] = row['total']
+        counts[row['hour']] = row['count']
+
+    totals = np.round(totals, 3)
+    rolling = np.round(rolling, 3)
+    dates = [start + timedelta(days=i) for i in range(days)]
+    best = int(np.argmax(totals))
+    return {
+        'start': str(start),
+        'end': str(today),
+        'goal': goal,
+        'days': [
+            {'date': str(day), 'total': total, 'rolling_avg_7d': avg, 'goal_met': met}
+            for day, total, avg, met in zip(dates, totals.tolist(), rolling.tolist(), goal_met.tolist())
+        ],
+        'summary': {
+            'total': round(float(totals.sum()), 3),
+            'average': round(float(totals.mean()), 3),
+            'goal_days': int(goal_met.sum()),
+            'goal_rate': round(float(goal_met.mean()), 3),
+            'current_streak': current_streak,
+            'best_day': {'date': str(dates[best]), 'total': float(totals[best])} if totals[best] > 0 else None,
+        },
+        'hourly': [
+            {'hour': hour, 'total': round(total, 3), 'count': count}
+            for hour, (total, count) in enumerate(zip(hours.tolist(), counts.tolist()))
+        ],
+    }
@@ -0,0 +1,13 @@
+"""
+Chọn cấu hình theo biến môi trường DJANGO_ENV:
+- dev (mặc định): DEBUG bật, chạy local với runserver
+- prod: DEBUG tắt, bắt buộc SECRET_KEY, ALLOWED_HOSTS và METRICS_TOKEN từ môi trường, cache chung khi bật replica
+
+Có thể trỏ thẳng DJANGO_SETTINGS_MODULE=qlskapp.settings.prod (hoặc .dev).
+"""
+import os
+
+if os.getenv('DJANGO_ENV', 'dev') == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    from .dev import *  # noqa: F401,F403
@@ -0,0 +1,444 @@
+"""
+Django settings for qlskapp project.
+
+Generated by 'django-admin startproject' using Django 5.1.6.
+
+Cấu hình chung cho mọi môi trường, đọc từ biến môi trường/.env.
+dev.py và prod.py ghi đè phần riêng của từng môi trường (xem __init__.py).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.1/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.1/ref/settings/
+"""
+
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Load biến môi trường từ file .env
+load_dotenv()
+
+INSECURE_SECRET_KEY = 'django-insecure-g8q7vd#z@ye4(yx^(%*@if=h9&0=1_0su=)pb=3$sbk#4oca(('
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.getenv('SECRET_KEY', INSECURE_SECRET_KEY)
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = os.getenv('DEBUG', 'False') == 'True'
+
+MEDIA_ROOT = f'{BASE_DIR}/qlsk/media/'
+MEDIA_URL = '/media/'
+
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+
+ALLOWED_HOSTS = [host for host in os.getenv('ALLOWED_HOSTS', '*').split(',') if host]
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'qlsk.apps.AuthenticationConfig',
+
+    'rest_framework',
+    'rest_framework.authtoken',
+    'corsheaders',
+    'oauth2_provider',
+    'ckeditor',
+    'ckeditor_uploader',
+    'drf_yasg',
+
+    'django.contrib.sites',  # Cần thiết cho django-allauth
+
+    'dj_rest_auth',
+
+    #Đăng nhập bằng tài khoản google, facebook
+    'allauth',
+    'allauth.account',
+    'allauth.socialaccount',
+    'allauth.socialaccount.providers.google',
+    'allauth.socialaccount.providers.facebook',
+    
+    #Hình ảnh
+]
+
+CKEDITOR_UPLOAD_PATH = "ckeditor/images/"
+
+SITE_ID = 2
+
+AUTH_USER_MODEL = 'qlsk.User'
+
+MIDDLEWARE = [
+    # Đặt đầu tiên để đo toàn bộ thời gian xử lý request (xem qlsk/metrics.py)
+    'qlsk.metrics.RequestMetricsMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'qlsk.replicas.ReplicaStickinessMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'allauth.account.middleware.AccountMiddleware',  # Middleware của Allauth
+]
+
+AUTHENTICATION_BACKENDS = [
+    'django.contrib.auth.backends.ModelBackend',  # Backend mặc định của Django
+    'allauth.account.auth_backends.AuthenticationBackend',  # Backend của Allauth
+]
+
+# LOGIN_REDIRECT_URL = '/'
+
+# ACCOUNT_LOGIN_METHODS = {'username', 'email'}
+# ACCOUNT_SIGNUP_FIELDS = ['email*', 'username*', 'password1*', 'password2*']
+
+
+CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_CREDENTIALS = True
+
+
+ROOT_URLCONF = 'qlskapp.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'qlskapp.wsgi.application'
+
+# Database
+# https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        # Backend MySQL của Django chạy trên PyMySQL, chỉ import khi mở kết nối (xem qlsk/mysql)
+        'ENGINE': 'qlsk.mysql',
+        'NAME': os.getenv('DB_NAME'),
+        'USER': os.getenv('DB_USER'),
+        'PASSWORD': os.getenv('DB_PASSWORD'),
+        'HOST': os.getenv('DB_HOST'),
+        'PORT': '',
+        # Giữ kết nối giữa các request (giây, 0: mở mới mỗi request) thay vì bắt tay TCP + xác thực lại
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # Ping kết nối cũ trước khi dùng lại ở đầu request, tránh lỗi "MySQL server has gone away"
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+    }
+}
+# Pool kết nối dùng chung giữa các luồng (nên bật khi chạy ASGI), xem qlsk/dbpool
+if os.getenv('DB_POOL', 'False') == 'True':
+    DATABASES['default'].update({
+        'ENGINE': 'qlsk.dbpool',
+        # Kết nối được trả về pool cuối mỗi request
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'RECYCLE': float(os.getenv('DB_POOL_RECYCLE', 3600)),
+        },
+    })
+
+# Replica chỉ đọc cho các API thống kê/danh sách (xem qlsk/replicas.py), bật khi có DB_REPLICA_HOST
+DATABASE_REPLICA_ALIAS = 'replica'
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        # Khi chạy test, replica dùng chung database test với default
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['qlsk.replicas.ReplicaRouter']
+# Replica trễ hơn số giây này thì đọc từ primary; kết quả kiểm tra được nhớ REPLICA_LAG_CHECK_SECONDS
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_LAG_CHECK_SECONDS = 10
+# Sau khi user ghi dữ liệu, đọc từ primary trong bấy nhiêu giây (nên lớn hơn REPLICA_MAX_LAG_SECONDS)
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 15))
+REPLICA_STICKY_COOKIE = 'qlsk_read_primary'
+
+# Password validation
+# https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.1/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'Asia/Ho_Chi_Minh'
+
+USE_I18N = True
+
+USE_TZ = False
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.1/howto/static-files/
+
+STATIC_URL = 'static/'
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+REST_FRAMEWORK = {
+    # Chọn JWT / OAuth2 / Session theo header Authorization (xem qlsk/authentication.py)
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'qlsk.authentication.SchemeAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+}
+
+# JWT Settings
+from datetime import timedelta
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'ROTATE_REFRESH_TOKENS': False,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'ALGORITHM': 'HS256',
+    'SIGNING_KEY': SECRET_KEY,
+    'VERIFYING_KEY': None,
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'USER_ID_FIELD': 'id',
+    'USER_ID_CLAIM': 'user_id',
+    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_TYPE_CLAIM': 'token_type',
+}
+
+# Thời gian (giây) giữ thông tin user đã xác thực trong cache
+AUTH_USER_CACHE_TTL = 60
+# TTL khi cache chỉ sống trong từng tiến trình (LocMemCache): tín hiệu xóa cache khi User
+# thay đổi không tới được các worker khác, nên thay đổi chỉ trễ tối đa chừng này giây
+AUTH_USER_LOCAL_CACHE_TTL = 5
+
+
+# OAuth2 Settings
+OAUTH2_PROVIDER = {
+    'SCOPES': {
+        'read': 'Read scope',
+        'write': 'Write scope',
+        'groups': 'Access to your groups',
+        'user': 'Access to your user data',
+    },
+    'ACCESS_TOKEN_EXPIRE_SECONDS': 3600,
+    'REFRESH_TOKEN_EXPIRE_SECONDS': 86400,
+    'ROTATE_REFRESH_TOKEN': True,
+}
+
+CLIENT_ID_GOOGLE = os.getenv('GOOGLE_CLIENT_ID')
+CLIENT_SECRET_GOOGLE = os.getenv('GOOGLE_CLIENT_SECRET')
+
+# Chứng chỉ dùng để xác thực Google ID token (được cache theo Cache-Control)
+GOOGLE_CERTS_URL = os.getenv('GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
+# aud mà ID token phải khớp; mặc định là CLIENT_ID_GOOGLE
+GOOGLE_ID_TOKEN_AUDIENCE = os.getenv('GOOGLE_ID_TOKEN_AUDIENCE')
+
+CLIENT_ID_FACEBOOK = os.getenv('FACEBOOK_CLIENT_ID')
+CLIENT_SECRET_FACEBOOK = os.getenv('FACEBOOK_CLIENT_SECRET')
+
+#Fb ko cho đăng nhập bằng http -> https 
+#Ta cấu hình https -> ngrok http 8000
+
+#Settings cho Login with Google, Facebook
+SOCIALACCOUNT_PROVIDERS = {
+    'google': {
+        'APP': {
+            'client_id': CLIENT_ID_GOOGLE,
+            'secret': CLIENT_SECRET_GOOGLE,
+        },
+        'SCOPE': [
+            'profile',
+            'email',
+        ],
+        'AUTH_PARAMS': {'access_type': 'online'},
+        'METHOD': 'oauth2',
+        'VERIFIED_EMAIL': True,
+    },
+    'facebook': {
+        'APP': {
+            'client_id': CLIENT_ID_FACEBOOK,  # Thay thế bằng Client ID của Facebook
+            'secret': CLIENT_SECRET_FACEBOOK,  # Thay thế bằng Client Secret của Facebook
+        },
+        'METHOD': 'oauth2',
+        'SCOPE': ['email', 'public_profile'],
+        'AUTH_PARAMS': {'auth_type': 'reauthenticate'},
+        'INIT_PARAMS': {'cookie': True},
+        'FIELDS': [
+            'id',
+            'email',
+            'name',
+            'first_name',
+            'last_name',
+            'verified',
+            'locale',
+            'timezone',
+            'link',
+            'gender',
+            'updated_time',
+        ],
+        'EXCHANGE_TOKEN': True,
+        'VERIFIED_EMAIL': True,
+    }
+}
+
+SOCIALACCOUNT_STORE_TOKENS = True
+
+# Cấu hình Allauth
+ACCOUNT_EMAIL_REQUIRED = True
+ACCOUNT_USERNAME_REQUIRED = True
+ACCOUNT_AUTHENTICATION_METHOD = 'username_email'
+ACCOUNT_EMAIL_VERIFICATION = 'mandatory'
+ACCOUNT_UNIQUE_EMAIL = True
+ACCOUNT_LOGOUT_ON_GET = True
+SOCIALACCOUNT_LOGIN_ON_GET = True
+
+# Cấu hình URL
+LOGIN_URL = '/accounts/login/'
+LOGIN_REDIRECT_URL = '/callback/'
+LOGOUT_REDIRECT_URL = '/'
+
+#Cấu hình email
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = 'smtp.gmail.com'
+EMAIL_PORT = 587
+EMAIL_USE_TLS = True
+EMAIL_HOST_USER = os.getenv('EMAIL_USER')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_PASSWORD_APP')
+DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+DOMAIN = os.getenv('IP')
+
+# Cache (dùng cho giới hạn tần suất); mặc định bộ nhớ cục bộ của tiến trình.
+# Production chạy nhiều worker phải dùng cache chung (Redis/Memcached), nếu không mỗi
+# worker đếm riêng và giới hạn OTP bị nhân lên (manage.py check --deploy sẽ cảnh báo)
+# InstrumentedCache chỉ bọc backend thật (OPTIONS['BACKEND']) để đếm hit/miss theo request
+CACHES = {
+    'default': {
+        'BACKEND': 'qlsk.metrics.InstrumentedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        'OPTIONS': {
+            'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        },
+    }
+}
+
+# Đo hiệu năng (qlsk/metrics.py): request chậm hơn ngưỡng này (ms) được ghi log kèm các câu SQL
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 500))
+# /metrics chỉ trả về khi có header Authorization: Bearer <METRICS_TOKEN>; chưa đặt thì chỉ mở khi DEBUG
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+# Tỉ lệ giữ lại log INFO/DEBUG (0..1); WARNING trở lên luôn được ghi
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 1.0))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'qlsk.log.JsonFormatter'},
+    },
+    'filters': {
+        'sampling': {'()': 'qlsk.log.SamplingFilter', 'rate': LOG_SAMPLE_RATE},
+    },
+    'handlers': {
+        'json': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+            'filters': ['sampling'],
+        },
+    },
+    'loggers': {
+        'qlsk': {'handlers': ['json'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
+
+# OTP đặt lại mật khẩu
+OTP_EXPIRY_MINUTES = 10
+# (số lần tối đa, số giây hồi 1 lần)
+OTP_SEND_RATE_PER_EMAIL = (3, 120)
+OTP_SEND_RATE_PER_IP = (10, 60)
+OTP_CONFIRM_RATE_PER_EMAIL = (5, 60)
+# Bật khi chạy sau proxy (ngrok, nginx) để lấy IP thật của client
+RATELIMIT_TRUST_X_FORWARDED_FOR = os.getenv('RATELIMIT_TRUST_X_FORWARDED_FOR', 'False') == 'True'
+
+
+# Nơi lưu ảnh (xem qlsk/storage.py): 'local' lưu trên ổ đĩa theo sha256 nội dung,
+# 'cloudinary' đẩy lên Cloudinary. Mặc định dùng Cloudinary nếu có CLOUD_NAME.
+MEDIA_STORAGE_BACKEND = os.getenv('MEDIA_STORAGE_BACKEND', 'cloudinary' if os.getenv('CLOUD_NAME') else 'local')
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'media': {'BACKEND': 'qlsk.storage.ContentAddressedStorage'},
+}
+if MEDIA_STORAGE_BACKEND == 'cloudinary':
+    STORAGES['media'] = {
+        'BACKEND': 'qlsk.storage.CloudinaryStorage',
+        'OPTIONS': {
+            'cloud_name': os.getenv('CLOUD_NAME'),
+            'api_key': os.getenv('CLOUD_API_KEY'),
+            'api_secret': os.getenv('CLOUD_API_SECRET'),
+        },
+    }
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Số luồng chạy song song các query của /api/calendar/ (<= 1: chạy tuần tự)
+CALENDAR_QUERY_WORKERS = int(os.getenv('CALENDAR_QUERY_WORKERS', 5))
+
+# Tìm nhật ký trên MySQL (qlsk/search.py): FULLTEXT chỉ lập chỉ mục các từ có ít nhất
+# innodb_ft_min_token_size ký tự (mặc định 3, chỉ đổi được trong my.cnf rồi khởi động lại và tạo lại
+# chỉ mục). Nhiều âm tiết tiếng Việt chỉ có 1-2 chữ (ăn, đi, da, ...) nên từ ngắn hơn được lọc bằng LIKE.
+# Đặt đúng bằng giá trị innodb_ft_min_token_size của server.
+SEARCH_MYSQL_MIN_TOKEN_SIZE = int(os.getenv('SEARCH_MYSQL_MIN_TOKEN_SIZE', 3))
+
+# Mục tiêu uống nước mỗi ngày: theo cân nặng (lít/kg), nếu chưa có cân nặng thì dùng mức mặc định (lít)
+WATER_GOAL_LITERS_PER_KG = 0.033
+WATER_DAILY_GOAL_LITERS = 2.0
+# Lượng nước tối đa của một lần ghi nhận (lít), lớn hơn là nhập sai
+WATER_MAX_SESSION_LITERS = 5.0
+
+# Upload ảnh: multipart được ghi thẳng ra file tạm thay vì giữ trong bộ nhớ
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+FILE_UPLOAD_TEMP_DIR = os.getenv('FILE_UPLOAD_TEMP_DIR') or None
+# Thư mục chứa ảnh gốc chờ worker xử lý (nên cùng ổ đĩa với FILE_UPLOAD_TEMP_DIR để chỉ cần đổi tên file).
+# Phải nằm ngoài MEDIA_ROOT: ảnh gốc chưa xử lý (còn EXIF, GPS) không được phục vụ qua /media/
+IMAGE_UPLOAD_PENDING_DIR = os.getenv('IMAGE_UPLOAD_PENDING_DIR', f'{BASE_DIR}/upload_pending/')
+IMAGE_MAX_DIMENSION = 1600
+IMAGE_THUMBNAIL_SIZE = 320
+IMAGE_PROCESS_WORKERS = int(os.getenv('IMAGE_PROCESS_WORKERS', 2))
+# Xử lý hàng đợi ảnh ngay trong tiến trình web (luồng nền); tắt nếu chạy worker process_image_uploads riêng
+IMAGE_UPLOAD_IN_PROCESS_WORKER = os.getenv('IMAGE_UPLOAD_IN_PROCESS_WORKER', 'True') == 'True'
@@ -0,0 +1,28 @@
+from django.core.exceptions import ImproperlyConfigured
+
+from qlsk.checks import replica_cache_error
+
+from .base import *  # noqa: F401,F403
+
+# DEBUG giữ lại mọi câu SQL đã chạy trong connection.queries và hiện trang lỗi chi tiết
+DEBUG = False
+
+if SECRET_KEY == INSECURE_SECRET_KEY:
+    raise ImproperlyConfigured('Cần đặt biến môi trường SECRET_KEY khi chạy với DJANGO_ENV=prod')
+
+ALLOWED_HOSTS = [host for host in os.getenv('ALLOWED_HOSTS', '').split(',') if host]
+if not ALLOWED_HOSTS:
+    raise ImproperlyConfigured('Cần đặt ALLOWED_HOSTS (ngăn cách bởi dấu phẩy) khi chạy với DJANGO_ENV=prod')
+
+# /metrics lộ lưu lượng và độ trễ theo route: chỉ Prometheus có token mới đọc được
+if not METRICS_TOKEN:
+    raise ImproperlyConfigured('Cần đặt METRICS_TOKEN khi chạy với DJANGO_ENV=prod')
+
+# Cookie chỉ gửi qua HTTPS (tắt bằng SECURE_COOKIES=False nếu chạy sau proxy không có TLS)
+SESSION_COOKIE_SECURE = os.getenv('SECURE_COOKIES', 'True') == 'True'
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
+
+# Gunicorn không chạy system check: dừng ngay khi bật replica mà cache không dùng chung (xem qlsk.E001)
+_replica_cache_error = replica_cache_error(DATABASES, CACHES, DATABASE_REPLICA_ALIAS)
+if _replica_cache_error:
+    raise ImproperlyConfigured(_replica_cache_error)
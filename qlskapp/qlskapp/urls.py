@@ -19,8 +19,8 @@ from django.urls import path, re_path, include
 from django.views.generic.base import RedirectView
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
-from django.conf import settings
-from django.conf.urls.static import static
+from qlsk.media import serve_media
+from qlsk.metrics import metrics_view
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -42,8 +42,8 @@ urlpatterns = [
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     path("accounts/", include("allauth.urls")),
+    # File media (ảnh lưu local theo sha256, ảnh ckeditor) có ETag/Range, chạy cả khi DEBUG=False
+    re_path(r'^media/(?P<path>.+)$', serve_media, name='media'),
+    # Số liệu Prometheus (qlsk/metrics.py)
+    path('metrics', metrics_view, name='metrics'),
 ]
-
-# Bổ sung cấu hình phục vụ file media
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)